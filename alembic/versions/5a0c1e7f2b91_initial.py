@@ -0,0 +1,75 @@
+"""initial
+
+Revision ID: 5a0c1e7f2b91
+Revises: 
+Create Date: 2023-03-01 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a0c1e7f2b91'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('is_disabled', sa.Boolean(), nullable=False),
+        sa.Column('scopes', sa.String(), nullable=False),
+        sa.Column('registered_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_name'), 'users', ['name'], unique=True)
+
+    op.create_table(
+        'telegram_auth',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tg_user_id', sa.String(), nullable=False),
+        sa.Column('tg_username', sa.String(), nullable=False),
+        sa.Column('tg_first_name', sa.String(), nullable=False),
+        sa.Column('tg_last_name', sa.String(), nullable=True),
+        sa.Column('tg_photo_url', sa.String(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_telegram_auth_id'), 'telegram_auth', ['id'], unique=False)
+    op.create_index(op.f('ix_telegram_auth_tg_user_id'), 'telegram_auth', ['tg_user_id'], unique=True)
+
+    op.create_table(
+        'email_auth',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('is_verified', sa.Boolean(), nullable=False),
+        sa.Column('password_hash', sa.String(), nullable=False),
+        sa.Column('password_updated_with_token', sa.String(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id', 'email'),
+        sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_email_auth_id'), 'email_auth', ['id'], unique=False)
+    op.create_index(op.f('ix_email_auth_email'), 'email_auth', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_email_auth_email'), table_name='email_auth')
+    op.drop_index(op.f('ix_email_auth_id'), table_name='email_auth')
+    op.drop_table('email_auth')
+
+    op.drop_index(op.f('ix_telegram_auth_tg_user_id'), table_name='telegram_auth')
+    op.drop_index(op.f('ix_telegram_auth_id'), table_name='telegram_auth')
+    op.drop_table('telegram_auth')
+
+    op.drop_index(op.f('ix_users_name'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
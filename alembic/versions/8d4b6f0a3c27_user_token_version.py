@@ -0,0 +1,34 @@
+"""user token version
+
+Revision ID: 8d4b6f0a3c27
+Revises: 5a0c1e7f2b91
+Create Date: 2023-03-20 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4b6f0a3c27'
+down_revision = '5a0c1e7f2b91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+    # Token versions map loads only users with revoked tokens.
+    op.create_index(
+        'ix_users_revoked_token_version',
+        'users',
+        ['id', 'token_version'],
+        unique=False,
+        postgresql_where=sa.text('token_version > 0')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_revoked_token_version', table_name='users')
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,43 @@
+"""user scopes array
+
+Revision ID: c4e8a2f6d913
+Revises: b73e91d5a604
+Create Date: 2023-04-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f6d913'
+down_revision = 'b73e91d5a604'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Table is rewritten once, space separated strings are converted in place.
+    op.alter_column(
+        'users',
+        'scopes',
+        type_=postgresql.ARRAY(sa.Text()),
+        server_default=sa.text("'{}'"),
+        postgresql_using="CASE WHEN btrim(scopes) = '' THEN '{}'::text[] "
+                         "ELSE regexp_split_to_array(btrim(scopes), '\\s+') END"
+    )
+
+    # Used by users search by scope (array containment).
+    op.create_index('ix_users_scopes', 'users', ['scopes'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_scopes', table_name='users', postgresql_using='gin')
+    op.alter_column(
+        'users',
+        'scopes',
+        type_=sa.String(),
+        server_default=None,
+        postgresql_using="array_to_string(scopes, ' ')"
+    )
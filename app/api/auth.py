@@ -5,6 +5,7 @@ from fastapi.security import OAuth2PasswordBearer
 
 from app.core import exc
 from app.core.auth_tokens import AuthTokensService
+from app.core.scopes import scope_registry
 from app.core.security import AuthenticatedUser, AuthorizedUser
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/tg/login")
@@ -38,13 +39,17 @@ def get_authorized_user(scopes: list[str] = None) -> Callable:
     if scopes is None:
         scopes = []
 
+    # Compiled once per endpoint.
+    required_mask = scope_registry.compile(scopes)
+
     def wrapped_func(auth_user: AuthenticatedUser = Depends(get_authenticated_user)) -> AuthorizedUser:
-        if not auth_user.is_permitted(scopes):
+        if not auth_user.is_permitted_mask(required_mask):
             raise HTTPException(403, "User is not permitted")
 
         return AuthorizedUser(
             name=auth_user.name,
             scopes=auth_user.scopes,
+            scopes_mask=auth_user.scopes_mask,
             user=auth_user.user
         )
 
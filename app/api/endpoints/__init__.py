@@ -1,2 +1,6 @@
 from .telegram import tg_router
 from .tokens import tokens_router
+from .users import users_router
+from .jwks import jwks_router
+from .metrics import metrics_router
+from .debug import debug_router
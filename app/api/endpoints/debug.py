@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, confloat
+
+from app.api.auth import get_authorized_user
+from app.core.timing import configure_server_timing, get_server_timing_settings
+
+debug_router = APIRouter(
+    tags=["debug"]
+)
+
+
+class ServerTimingSettingsSchema(BaseModel):
+    header: bool
+    log_sample_rate: confloat(ge=0, le=1)
+
+
+@debug_router.put(
+    path="/debug/server-timing",
+    status_code=200,
+    description="Switch Server-Timing header and sampled timing logs of the worker process "
+                "that handles the request. Requires admin scope",
+    dependencies=[Depends(get_authorized_user(["admin"]))],
+    responses={
+        401: {"description": "Invalid token"},
+        403: {"description": "User is not permitted"}
+    }
+)
+async def set_server_timing(body: ServerTimingSettingsSchema) -> ServerTimingSettingsSchema:
+    configure_server_timing(body.header, body.log_sample_rate)
+
+    settings = get_server_timing_settings()
+    return ServerTimingSettingsSchema(header=settings.header, log_sample_rate=settings.log_sample_rate)
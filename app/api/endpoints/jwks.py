@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+
+from app.config import Config, get_config
+from app.core.crypto import KeyRing, get_access_key_ring
+
+jwks_router = APIRouter(
+    tags=["tokens"]
+)
+
+
+@jwks_router.get(
+    path="/.well-known/jwks.json",
+    status_code=200,
+    description="Return public keys verifying access tokens (JWKS)",
+    responses={
+        304: {"description": "Keys are not changed"},
+        404: {"description": "Access tokens are signed with shared secret"}
+    }
+)
+async def get_jwks(
+        if_none_match: str | None = Header(default=None),
+        config: Config = Depends(get_config),
+        key_ring: KeyRing | None = Depends(get_access_key_ring)
+) -> Response:
+    if key_ring is None:
+        raise HTTPException(404, "access tokens are signed with shared secret")
+
+    headers = {
+        "Cache-Control": f"public, max-age={config.oauth.jwks_max_age}",
+        "ETag": key_ring.jwks_etag
+    }
+
+    if if_none_match == key_ring.jwks_etag:
+        return Response(status_code=304, headers=headers)
+
+    # Serialized once on keys loading.
+    return Response(key_ring.jwks_json, media_type="application/json", headers=headers)
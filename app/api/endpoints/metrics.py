@@ -0,0 +1,63 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.crypto import get_password_hashing_stats, get_jwt_cache_stats
+from app.core.metrics import Counter, Gauge, add_collect_hook, render_metrics
+from app.core.repos import get_user_cache_stats
+from app.db import get_pool_stats
+from app.mail_outbox import get_outbox_stats
+
+metrics_router = APIRouter(
+    tags=["metrics"]
+)
+
+_POOL_CONNECTIONS = Gauge(
+    "users_db_pool_connections",
+    "Connections of the primary DB pool by state",
+    ("state",)
+)
+_CACHE_LOOKUPS = Counter(
+    "users_cache_lookups_total",
+    "Lookups of in-process caches by result",
+    ("cache", "result")
+)
+_PASSWORD_HASHING_CALLS = Gauge(
+    "users_password_hashing_calls",
+    "Password hashing calls waiting for a free slot and running in process pool",
+    ("state",)
+)
+_OUTBOX_PENDING = Gauge(
+    "users_email_outbox_pending",
+    "Pending messages of email outbox (if worker runs in this process)"
+)
+
+
+def _collect_stats():
+    pool = get_pool_stats()
+    _POOL_CONNECTIONS.set("in_use", value=pool.in_use)
+    _POOL_CONNECTIONS.set("idle", value=pool.idle)
+
+    for cache, stats in (("user", get_user_cache_stats()), ("jwt", get_jwt_cache_stats())):
+        _CACHE_LOOKUPS.set(cache, "hit", value=stats.hits)
+        _CACHE_LOOKUPS.set(cache, "miss", value=stats.misses)
+
+    hashing = get_password_hashing_stats()
+    _PASSWORD_HASHING_CALLS.set("waiting", value=hashing.waiting)
+    _PASSWORD_HASHING_CALLS.set("running", value=hashing.running)
+
+    if (outbox := get_outbox_stats()) is not None:
+        _OUTBOX_PENDING.set(value=outbox.pending)
+
+
+add_collect_hook(_collect_stats)
+
+
+@metrics_router.get(
+    path="/metrics",
+    status_code=200,
+    description="Return metrics of this worker process in Prometheus text format",
+    response_class=PlainTextResponse,
+    include_in_schema=False
+)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
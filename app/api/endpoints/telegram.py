@@ -6,6 +6,7 @@ from app.api.schemas import username_constr, UserSchema, AuthTokensSchema
 from app.core import exc
 from app.core.auth_tokens import AuthTokensService
 from app.core.register import RegistrationService
+from app.core.repos import UserRepo, UnitOfWork
 from app.core.security import AuthorizedUser
 from app.core.auth_strategies import TelegramAuthStrategy, TelegramCredentials, TelegramAddAccountData
 
@@ -35,22 +36,16 @@ async def tg_register(
 ) -> UserSchema:
     try:
         user_from_db = await reg_service.register(
+            body.name,
             auth_strategy,
             TelegramAddAccountData(
-                name=body.name,
                 token=body.token
             )
         )
     except (exc.InvalidAuthData, exc.AlreadyExists) as e:
         raise HTTPException(400, str(e))
 
-    return UserSchema(
-        id=user_from_db.id,
-        name=user_from_db.name,
-        is_disabled=user_from_db.is_disabled,
-        scopes=user_from_db.scopes,
-        registered_at=user_from_db.registered_at
-    )
+    return UserSchema.from_model(user_from_db)
 
 
 class TelegramLoginSchema(BaseModel):
@@ -95,21 +90,30 @@ class TelegramAddStrategySchema(BaseModel):
 @tg_router.post(
     path="/tg/add",
     status_code=204,
-    description="Add Telegram authentication to user's account. Requires scope",
+    description="Add Telegram authentication to user's account. Requires users:tg:add scope",
     responses={
-        400: {"description": "Invalid auth data. Or Telegram user is already attached"}
+        400: {"description": "Invalid auth data. Or Telegram user is already attached"},
+        403: {"description": "User is not permitted"}
     }
 )
 async def tg_add_to_user(
         body: TelegramAddStrategySchema,
-        auth_user: AuthorizedUser = Depends(get_authorized_user()),
-        auth_strategy: TelegramAuthStrategy = Depends()
+        auth_user: AuthorizedUser = Depends(get_authorized_user(["users:tg:add"])),
+        auth_strategy: TelegramAuthStrategy = Depends(),
+        user_repo: UserRepo = Depends(),
+        uow: UnitOfWork = Depends()
 ):
+    # Authorized user holds only auth info, so model is loaded to attach account to it.
+    if (user := await user_repo.get_by_id(auth_user.user.id)) is None:
+        raise HTTPException(401, str(exc.InvalidAuthData()))
+
     try:
-        await auth_strategy.add_auth_account_to_user(auth_user.user, TelegramAddAccountData(
-            name=auth_user.name,
-            token=body.token
-        ))
+        # Account and user changes are committed together.
+        async with uow:
+            await auth_strategy.add_auth_account_to_user(user, TelegramAddAccountData(
+                token=body.token
+            ))
+            await user_repo.update(user)
     except exc.InvalidAuthData as e:
         raise HTTPException(400, str(e))
     except exc.AlreadyExists:
@@ -133,7 +137,7 @@ async def tg_get_account(
         auth_user: AuthorizedUser = Depends(get_authorized_user()),
         auth_strategy: TelegramAuthStrategy = Depends()
 ) -> TelegramAccountSchema | None:
-    data = await auth_strategy.get_auth_method_data(auth_user.user)
+    data = await auth_strategy.get_auth_method_data(auth_user.user.id)
 
     if data is None:
         return None
@@ -3,6 +3,7 @@ from pydantic import BaseModel
 
 from app.api.auth import get_authenticated_user
 from app.api.schemas import AuthTokensSchema
+from app.config import Config, get_config
 from app.core import exc
 from app.core.auth_tokens import AuthTokensService
 from app.core.security import AuthenticatedUser
@@ -58,3 +59,39 @@ async def get_user_from_tokens(
         name=auth_user.name,
         scopes=auth_user.scopes
     )
+
+
+class IntrospectTokensSchema(BaseModel):
+    tokens: list[str]
+
+
+class TokenIntrospectionSchema(BaseModel):
+    active: bool
+    name: str | None = None
+    scopes: list[str] | None = None
+    error: str | None = None
+
+
+@tokens_router.post(
+    path="/tokens/introspect",
+    status_code=200,
+    description="Return authenticated user data for every access token in the same order",
+    responses={
+        400: {"description": "Too many tokens"}
+    }
+)
+async def introspect_tokens(
+        body: IntrospectTokensSchema,
+        config: Config = Depends(get_config),
+        auth_service: AuthTokensService = Depends()
+) -> list[TokenIntrospectionSchema]:
+    if len(body.tokens) > config.oauth.introspect_max_tokens:
+        raise HTTPException(400, f"at most {config.oauth.introspect_max_tokens} tokens are allowed")
+
+    results = await auth_service.introspect_access_tokens(body.tokens)
+
+    return [
+        TokenIntrospectionSchema(active=False, error=str(result)) if isinstance(result, Exception)
+        else TokenIntrospectionSchema(active=True, name=result.name, scopes=result.scopes)
+        for result in results
+    ]
@@ -0,0 +1,60 @@
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app import db
+from app.api.auth import get_authorized_user
+from app.api.schemas import UserSchema, username_constr
+from app.core.register import RegistrationService
+from app.core.repos import UserRepo
+
+users_router = APIRouter(
+    tags=["users"]
+)
+
+
+async def _users_to_ndjson(session_maker: async_sessionmaker[AsyncSession]) -> AsyncIterator[str]:
+    # Body is streamed after the endpoint returns and dependency sessions may be closed by then,
+    # so the generator holds its own session.
+    async with session_maker() as session:
+        async for user in UserRepo(session, session).stream_many():
+            yield UserSchema.from_model(user).json() + "\n"
+
+
+@users_router.get(
+    path="/users",
+    status_code=200,
+    description="Stream all users as newline delimited JSON ordered by id. Requires admin scope",
+    dependencies=[Depends(get_authorized_user(["admin"]))],
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        401: {"description": "Invalid token"},
+        403: {"description": "User is not permitted"}
+    }
+)
+async def stream_users() -> StreamingResponse:
+    return StreamingResponse(_users_to_ndjson(db.get_read_session_maker()), media_type="application/x-ndjson")
+
+
+class NameAvailabilitySchema(BaseModel):
+    name: str
+    available: bool
+
+
+@users_router.get(
+    path="/users/available",
+    status_code=200,
+    description="Check that name is not taken. Name still may be taken by the time of registration"
+)
+async def check_name_available(
+        name: username_constr = Query(),
+        reg_service: RegistrationService = Depends()
+) -> NameAvailabilitySchema:
+    return NameAvailabilitySchema(
+        name=name,
+        available=await reg_service.is_name_available(name)
+    )
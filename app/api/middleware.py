@@ -0,0 +1,124 @@
+import json
+import logging
+import random
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.core.metrics import REQUEST_SECONDS, STATEMENTS_PER_REQUEST
+from app.core.timing import get_server_timing_settings, start_request_timing
+from app.query_stats import get_query_budget, start_request_query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """
+    Observes processing time of every HTTP request (streamed response body included).
+    Requests are labeled by route path template, so path parameters don't multiply series.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Set by the router on match.
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status)
+            )
+
+
+class ServerTimingMiddleware:
+    """
+    Times phases of requests (see app.core.timing). Breakdown is sent in Server-Timing header
+    (phases finished before response start) and logged for sampled requests (all phases).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        settings = get_server_timing_settings()
+        if scope["type"] != "http" or not settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timing = start_request_timing()
+        sampled = random.random() < settings.log_sample_rate
+        status = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.header:
+                    MutableHeaders(scope=message).append("Server-Timing", timing.to_header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if sampled:
+                # Logged as warning like query budget overruns, uvicorn doesn't configure app loggers,
+                # so info records are dropped. Sampling is enabled only for debugging anyway.
+                logger.warning("Request timing %s", json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "total_ms": round(timing.elapsed() * 1000, 3),
+                    "phases_ms": {name: round(duration * 1000, 3) for name, duration in timing.phases.items()},
+                    "counts": timing.counts
+                }))
+
+
+class QueryStatsMiddleware:
+    """
+    Counts SQL statements of every HTTP request (see app.query_stats).
+    Sampled requests over the statements budget are logged with repeated statements (likely N+1 queries).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_request_query_stats()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            STATEMENTS_PER_REQUEST.observe(stats.statements)
+
+            budget = get_query_budget()
+            if stats.statements > budget.statements and random.random() < budget.log_sample_rate:
+                logger.warning("Request is over query budget %s", json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "statements": stats.statements,
+                    "budget": budget.statements,
+                    "db_ms": round(stats.duration * 1000, 3),
+                    "repeated": stats.get_repeated(budget.n_plus_one_threshold)
+                }))
@@ -2,6 +2,8 @@ from datetime import datetime
 
 from pydantic import BaseModel
 
+from app.core.models import User
+
 
 class UserSchema(BaseModel):
     id: int
@@ -9,3 +11,13 @@ class UserSchema(BaseModel):
     is_disabled: bool
     scopes: list[str]
     registered_at: datetime
+
+    @staticmethod
+    def from_model(user: User) -> "UserSchema":
+        return UserSchema(
+            id=user.id,
+            name=user.name,
+            is_disabled=user.is_disabled,
+            scopes=user.scopes,
+            registered_at=user.registered_at
+        )
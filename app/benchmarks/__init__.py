@@ -0,0 +1,3 @@
+"""
+Benchmarks of the service hot paths. Every module is runnable with `python -m app.benchmarks.<name>`.
+"""
@@ -0,0 +1,124 @@
+"""
+Compares N calls of GET /tokens/user (one HTTP request and one user query per token) with one
+POST /tokens/introspect call. App is called in process, network and DB latencies are emulated by sleeps.
+
+    python -m app.benchmarks.introspection --tokens 50 --rtt 0.001 --query-latency 0.0005
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.endpoints import tokens_router
+from app.config import Config, get_config
+from app.core.auth_tokens import AuthTokensService
+from app.core.models import User
+from app.core.repos import UserRepo
+from app.core.security import UserAuthInfo
+
+
+class _FakeUserRepo:
+    def __init__(self, users: dict[str, UserAuthInfo], query_latency: float):
+        self.users = users
+        self.query_latency = query_latency
+        self.queries = 0
+
+    async def get_auth_info_by_name(self, name: str) -> UserAuthInfo | None:
+        self.queries += 1
+        await asyncio.sleep(self.query_latency)
+        return self.users.get(name)
+
+    async def get_auth_info_by_names(self, names) -> dict[str, UserAuthInfo]:
+        self.queries += 1
+        await asyncio.sleep(self.query_latency)
+        return {name: self.users[name] for name in names if name in self.users}
+
+
+class _LatencyTransport(httpx.AsyncBaseTransport):
+    def __init__(self, app: FastAPI, rtt: float):
+        self.transport = httpx.ASGITransport(app=app)
+        self.rtt = rtt
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(self.rtt)
+        return await self.transport.handle_async_request(request)
+
+
+def _create_app(repo: _FakeUserRepo, config: Config) -> FastAPI:
+    app = FastAPI()
+    app.include_router(tokens_router)
+    app.dependency_overrides[UserRepo] = lambda: repo
+    app.dependency_overrides[get_config] = lambda: config
+    return app
+
+
+async def _bench(name: str, app: FastAPI, repo: _FakeUserRepo, rtt: float, rounds: int, call):
+    transport = _LatencyTransport(app, rtt)
+    repo.queries = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://users") as client:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await call(client)
+        elapsed = time.perf_counter() - start
+
+    print(f"{name}: {elapsed / rounds * 1000:.2f} ms per batch, "
+          f"{transport.requests / rounds:.0f} requests, {repo.queries / rounds:.0f} queries")
+
+
+async def run(tokens: int, rtt: float, query_latency: float, rounds: int):
+    config = Config()
+    config.oauth.access_token_expire = 3600
+    config.oauth.access_token_secret = config.oauth.refresh_token_secret = "benchmark-secret-benchmark-secret"
+    config.oauth.refresh_token_expire = 3600
+    config.oauth.stateless_access_tokens = False
+    config.oauth.introspect_max_tokens = tokens
+
+    users = [
+        User(id=i, name=f"user{i}", is_disabled=False, scopes=["service:read"], token_version=0)
+        for i in range(tokens)
+    ]
+    repo = _FakeUserRepo({user.name: UserAuthInfo.from_user(user) for user in users}, query_latency)
+    service = AuthTokensService(config, repo, None, None)
+    access_tokens = [service._encode_tokens(user, user.scopes).access for user in users]
+
+    app = _create_app(repo, config)
+
+    async def single_calls(client: httpx.AsyncClient):
+        for token in access_tokens:
+            response = await client.get("/tokens/user", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200
+
+    async def concurrent_single_calls(client: httpx.AsyncClient):
+        responses = await asyncio.gather(*(
+            client.get("/tokens/user", headers={"Authorization": f"Bearer {token}"}) for token in access_tokens
+        ))
+        assert all(response.status_code == 200 for response in responses)
+
+    async def batch_call(client: httpx.AsyncClient):
+        response = await client.post("/tokens/introspect", json={"tokens": access_tokens})
+        assert response.status_code == 200 and all(result["active"] for result in response.json())
+
+    await _bench("single calls", app, repo, rtt, rounds, single_calls)
+    await _bench("concurrent single calls", app, repo, rtt, rounds, concurrent_single_calls)
+    await _bench("introspect", app, repo, rtt, rounds, batch_call)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=50, help="tokens validated by gateway at once")
+    parser.add_argument("--rtt", type=float, default=0.001, help="gateway to users round trip in seconds")
+    parser.add_argument("--query-latency", type=float, default=0.0005, help="user query latency in seconds")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.tokens, args.rtt, args.query_latency, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+End-to-end load test of the auth endpoints against the configured (local) DB.
+
+    python -m app.benchmarks.load --users 1000 --duration 30 --concurrency 64
+    python -m app.benchmarks.load --target http://127.0.0.1:8000 --mix login=40,user=40,refresh=10,account=9,register=1
+
+Users with Telegram accounts are seeded directly to the DB and Telegram tokens are minted with the configured
+telegram.token_secret, so no external services are required. Then concurrent clients drive the mix of
+/tg/login, /tokens/user, /tokens/refresh, /tg/account and /tg/register for the duration and throughput and
+latency percentiles are reported by operation.
+
+By default the app is called in process (startup and shutdown handlers included), with --target a running
+server (local uvicorn with the same users.ini) is called. Seeded and registered users are deleted at the end.
+Access tokens are renewed by login when they expire (oauth.access_token_expire).
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import httpx
+from sqlalchemy import insert, delete, select
+
+from app import db
+from app.config import Config, load_config, get_config
+from app.core.crypto import encode_jwt
+from app.core.models import User, TelegramAccount
+from app.main import app as users_app
+
+OPERATIONS = ("login", "user", "refresh", "account", "register")
+DEFAULT_MIX = "login=30,user=45,refresh=10,account=14,register=1"
+_SEED_BATCH_SIZE = 1000
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """
+    :param mix: comma separated operation=weight pairs.
+    """
+
+    weights = {}
+    for pair in mix.split(","):
+        operation, weight = pair.split("=")
+        assert operation.strip() in OPERATIONS, f"unknown operation '{operation}'"
+        weights[operation.strip()] = float(weight)
+
+    return weights
+
+
+def mint_tg_token(config: Config, tg_user_id: str) -> str:
+    return encode_jwt(tg_user_id, config.telegram.token_secret, 24 * 3600, {
+        "tg_username": f"user{tg_user_id}",
+        "tg_first_name": "Load",
+        "tg_last_name": "Test",
+        "tg_photo_url": None
+    })
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[max(math.ceil(p * len(sorted_values)) - 1, 0)]
+
+
+@dataclass(kw_only=True)
+class _Client:
+    """ Seeded user with its tokens. """
+    tg_token: str
+    access: str | None = None
+    refresh: str | None = None
+    issued_at: float = 0
+
+
+@dataclass(kw_only=True)
+class OperationStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: dict[int, int] = field(default_factory=dict)
+    """ Number of unexpected responses by status. """
+
+
+class LoadTest:
+    def __init__(self,
+                 http: httpx.AsyncClient,
+                 config: Config,
+                 prefix: str,
+                 tg_tokens: list[str],
+                 mix: dict[str, float]
+                 ):
+        self.http = http
+        self.config = config
+        self.prefix = prefix
+        self.clients = [_Client(tg_token=token) for token in tg_tokens]
+        self.operations = list(mix.keys())
+        self.weights = list(mix.values())
+        self.stats = {operation: OperationStats() for operation in OPERATIONS}
+        self.recording = False
+        self._registered = 0
+
+    async def _request(self, operation: str, expected_status: int, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.http.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        if self.recording:
+            stats = self.stats[operation]
+            if response.status_code == expected_status:
+                stats.latencies.append(elapsed)
+            else:
+                stats.errors[response.status_code] = stats.errors.get(response.status_code, 0) + 1
+
+        return response
+
+    def _scope(self) -> str:
+        return " ".join(self.config.user_default.scopes)
+
+    async def _login(self, client: _Client):
+        response = await self._request("login", 200, "POST", "/tg/login", json={
+            "token": client.tg_token,
+            "scope": self._scope()
+        })
+
+        if response.status_code == 200:
+            client.access, client.refresh = response.json()["access"], response.json()["refresh"]
+            client.issued_at = time.monotonic()
+
+    async def _ensure_tokens(self, client: _Client):
+        # Renewed a second before expiration, so requests don't fail in flight.
+        if client.access is None or time.monotonic() - client.issued_at > self.config.oauth.access_token_expire - 1:
+            await self._login(client)
+
+    async def _run_operation(self, operation: str):
+        client = random.choice(self.clients)
+
+        if operation == "login":
+            await self._login(client)
+        elif operation == "register":
+            self._registered += 1
+            tg_user_id = f"{self.prefix}r{self._registered}"
+            await self._request("register", 201, "POST", "/tg/register", json={
+                "name": tg_user_id,
+                "token": mint_tg_token(self.config, tg_user_id)
+            })
+        else:
+            await self._ensure_tokens(client)
+            if client.access is None:
+                return
+
+            if operation == "user":
+                await self._request("user", 200, "GET", "/tokens/user", headers={
+                    "Authorization": f"Bearer {client.access}"
+                })
+            elif operation == "account":
+                await self._request("account", 200, "GET", "/tg/account", headers={
+                    "Authorization": f"Bearer {client.access}"
+                })
+            elif operation == "refresh":
+                response = await self._request("refresh", 200, "POST", "/tokens/refresh", headers={
+                    "Refresh-Token": client.refresh
+                })
+                if response.status_code == 200:
+                    client.access, client.refresh = response.json()["access"], response.json()["refresh"]
+                    client.issued_at = time.monotonic()
+
+    async def _worker(self, deadline: float):
+        while time.monotonic() < deadline:
+            await self._run_operation(random.choices(self.operations, self.weights)[0])
+
+    async def run(self, concurrency: int, duration: float, warmup: float) -> float:
+        """
+        :return: measured seconds (warmup excluded).
+        """
+
+        if warmup > 0:
+            await asyncio.gather(*(self._worker(time.monotonic() + warmup) for _ in range(concurrency)))
+
+        self.recording = True
+        start = time.monotonic()
+        await asyncio.gather(*(self._worker(start + duration) for _ in range(concurrency)))
+        self.recording = False
+
+        return time.monotonic() - start
+
+    def report(self, elapsed: float):
+        total = sum(len(stats.latencies) for stats in self.stats.values())
+        errors = sum(sum(stats.errors.values()) for stats in self.stats.values())
+        print(f"{total} requests in {elapsed:.1f}s, {total / elapsed:.0f} req/s, {errors} errors")
+        print(f"{'operation':<10} {'count':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  errors")
+
+        for operation, stats in self.stats.items():
+            if not stats.latencies and not stats.errors:
+                continue
+
+            latencies = sorted(stats.latencies) or [math.nan]
+            print(f"{operation:<10} {len(stats.latencies):>8} {len(stats.latencies) / elapsed:>8.0f} "
+                  f"{percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.2f}  {stats.errors or ''}")
+
+
+async def seed_users(prefix: str, count: int, scopes: list[str]) -> list[str]:
+    """
+    :return: Telegram user ids of seeded users.
+    """
+
+    tg_user_ids = [f"{prefix}{i}" for i in range(count)]
+
+    async with db.AsyncSessionLocal() as session:
+        for start in range(0, count, _SEED_BATCH_SIZE):
+            batch = tg_user_ids[start:start + _SEED_BATCH_SIZE]
+
+            result = await session.execute(insert(User).returning(User.id, User.name), [
+                {"name": tg_user_id, "is_disabled": False, "scopes": scopes, "registered_at": datetime.utcnow()}
+                for tg_user_id in batch
+            ])
+            user_ids = {name: id_ for id_, name in result.all()}
+
+            await session.execute(insert(TelegramAccount), [
+                {
+                    "tg_user_id": tg_user_id,
+                    "tg_username": f"user{tg_user_id}",
+                    "tg_first_name": "Load",
+                    "tg_last_name": "Test",
+                    "user_id": user_ids[tg_user_id]
+                }
+                for tg_user_id in batch
+            ])
+
+        await session.commit()
+
+    return tg_user_ids
+
+
+async def delete_users(prefix: str):
+    async with db.AsyncSessionLocal() as session:
+        user_ids = select(User.id).where(User.name.startswith(prefix, autoescape=True))
+        await session.execute(delete(TelegramAccount).where(TelegramAccount.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.name.startswith(prefix, autoescape=True)))
+        await session.commit()
+
+
+async def run(target: str | None, users: int, concurrency: int, duration: float, warmup: float, mix: dict[str, float]):
+    if target is None:
+        # Runs startup handlers: config loading, DB connecting, background workers.
+        await users_app.router.startup()
+        transport = httpx.ASGITransport(app=users_app)
+        base_url = "http://users"
+    else:
+        load_config()
+        db.connect_to_db()
+        transport = None
+        base_url = target
+
+    config = get_config()
+    prefix = f"load_{uuid.uuid4().hex[:8]}_"
+
+    try:
+        start = time.perf_counter()
+        tg_user_ids = await seed_users(prefix, users, config.user_default.scopes)
+        print(f"Seeded {users} users in {time.perf_counter() - start:.1f}s")
+
+        tg_tokens = [mint_tg_token(config, tg_user_id) for tg_user_id in tg_user_ids]
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=30) as http:
+            load_test = LoadTest(http, config, prefix, tg_tokens, mix)
+            elapsed = await load_test.run(concurrency, duration, warmup)
+
+        load_test.report(elapsed)
+    finally:
+        await delete_users(prefix)
+
+        if target is None:
+            await users_app.router.shutdown()
+        else:
+            await db.disconnect_from_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="URL of running server, app is called in process if not set")
+    parser.add_argument("--users", type=int, default=1000, help="number of seeded users")
+    parser.add_argument("--concurrency", type=int, default=32, help="number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights of operations")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.target, args.users, args.concurrency, args.duration, args.warmup, parse_mix(args.mix)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares blocking per-mail SMTP connection (previous MailSender) with pooled async MailTransport
+against local aiosmtpd server.
+
+    python -m app.benchmarks.mail --mails 200 --server-latency 0.005
+"""
+
+import argparse
+import asyncio
+import smtplib
+import socket
+import time
+from email.message import EmailMessage
+
+from aiosmtpd.controller import Controller
+
+from app.mail_sender import SMTPSettings, SMTPConnectionPool, MailTransport
+
+
+class _SlowHandler:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+
+def _message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "no-reply@localhost"
+    msg["To"] = f"user{i}@localhost"
+    msg["Subject"] = "Account verification"
+    msg.set_content('<a href="http://localhost/verify/token">Verify your account</a>', subtype="html")
+    return msg
+
+
+def bench_blocking(host: str, port: int, mails: int) -> float:
+    """
+    :return: mean time (seconds) the request handler is blocked per mail.
+    """
+
+    start = time.perf_counter()
+    for i in range(mails):
+        server = smtplib.SMTP(host=host, port=port)
+        server.send_message(_message(i))
+        server.quit()
+
+    return (time.perf_counter() - start) / mails
+
+
+async def bench_pooled(host: str, port: int, mails: int, pool_size: int) -> tuple[float, float]:
+    """
+    :return: mean time (seconds) the request handler is blocked per mail and total time to deliver all mails.
+    """
+
+    settings = SMTPSettings(host=host, port=port, user="", password="", tls=False, timeout=10)
+    transport = MailTransport(SMTPConnectionPool(settings, pool_size), workers=pool_size, queue_size=mails)
+    transport.start()
+
+    start = time.perf_counter()
+    blocked = 0
+    for i in range(mails):
+        enqueue_start = time.perf_counter()
+        transport.enqueue(_message(i))
+        blocked += time.perf_counter() - enqueue_start
+
+        # Requests are handled concurrently with sending.
+        await asyncio.sleep(0)
+
+    await transport.stop(timeout=600)
+    total = time.perf_counter() - start
+
+    return blocked / mails, total
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mails", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--server-latency", type=float, default=0.005, help="seconds spent by server per mail")
+    args = parser.parse_args()
+
+    handler = _SlowHandler(args.server_latency)
+    host, port = "127.0.0.1", _free_port()
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+
+    try:
+        blocking_per_mail = bench_blocking(host, port, args.mails)
+        print(f"blocking:  {blocking_per_mail * 1000:.3f} ms blocked per mail, "
+              f"{1 / blocking_per_mail:.0f} mails/s")
+
+        pooled_per_mail, pooled_total = asyncio.run(bench_pooled(host, port, args.mails, args.pool_size))
+        print(f"pooled:    {pooled_per_mail * 1000:.3f} ms blocked per mail, "
+              f"{args.mails / pooled_total:.0f} mails/s (pool size {args.pool_size})")
+    finally:
+        controller.stop()
+
+    assert handler.received == 2 * args.mails, "not all mails are delivered"
+
+
+if __name__ == "__main__":
+    main()
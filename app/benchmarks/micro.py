@@ -0,0 +1,216 @@
+"""
+Micro-benchmarks of crypto, security and schema hot paths with stored baselines.
+
+    python -m app.benchmarks.micro run                      # print timings
+    python -m app.benchmarks.micro save                     # store timings as the baseline
+    python -m app.benchmarks.micro compare --threshold 0.35 # exit code 1 if any case is slower than baseline
+
+Compare against a baseline saved on the same machine, timings of different machines are not comparable.
+Run to run noise of the fastest cases is up to ~30% even on the same machine, so lower threshold reports
+false regressions.
+Cases can be filtered by name prefix with --only.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime
+from importlib.metadata import version
+from typing import Callable
+
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.api.endpoints.tokens import TokenIntrospectionSchema
+from app.api.schemas import AuthTokensSchema, UserSchema
+from app.config import Config
+from app.core.auth_strategies import TelegramAuthStrategy
+from app.core.auth_tokens import AuthTokensService
+from app.core.crypto import encode_jwt, decode_jwt, configure_jwt_cache, get_jwt_cache_size, KeyRing, SigningKey
+from app.core.models import User
+from app.core.models.types import ScopesArrayType
+from app.core.scopes import scope_registry
+from app.core.security import get_valid_scopes, check_scopes_valid, check_user_not_disabled, UserAuthInfo
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+TRACKED_PACKAGES = ("pyjwt", "cryptography", "pydantic", "sqlalchemy", "fastapi")
+
+_SECRET = "benchmark-secret-benchmark-secret"
+
+
+def _get_config() -> Config:
+    config = Config()
+    config.oauth.access_token_expire = 3600
+    config.oauth.access_token_secret = _SECRET
+    config.oauth.refresh_token_expire = 3600
+    config.oauth.refresh_token_secret = _SECRET
+    config.telegram.token_secret = _SECRET
+    return config
+
+
+def _get_user() -> User:
+    return User(
+        id=1,
+        name="benchmark_user",
+        is_disabled=False,
+        scopes=[f"service{i}:read" for i in range(10)],
+        token_version=0,
+        registered_at=datetime(2023, 1, 1)
+    )
+
+
+def get_cases() -> dict[str, Callable[[], object]]:
+    """
+    :return: benchmarked functions by case names.
+    """
+
+    config = _get_config()
+    user = _get_user()
+    auth_info = UserAuthInfo.from_user(user)
+    requested_scopes = user.scopes[:3] + ["unknown:scope"]
+    compiled_scopes = scope_registry.parse(" ".join(user.scopes[:3]))
+
+    hs256_token = encode_jwt(user.name, _SECRET, 3600, {"scopes": " ".join(user.scopes)})
+    key_ring = KeyRing([SigningKey.from_private_key("EdDSA", ed25519.Ed25519PrivateKey.generate())])
+    eddsa_token = encode_jwt(user.name, key_ring, 3600, {"scopes": " ".join(user.scopes)})
+
+    auth_service = AuthTokensService(config, None, None, None)
+    tg_strategy = TelegramAuthStrategy(None, config, None)
+    tg_token = encode_jwt("123456789", _SECRET, 3600, {
+        "tg_username": "benchmark",
+        "tg_first_name": "Benchmark",
+        "tg_last_name": None,
+        "tg_photo_url": "https://t.me/i/userpic/320/benchmark.jpg"
+    })
+
+    dialect = asyncpg.dialect()
+    scopes_type = ScopesArrayType()
+    bind_scopes = scopes_type.bind_processor(dialect) or (lambda value: value)
+    result_scopes = scopes_type.result_processor(dialect, None) or (lambda value: value)
+
+    return {
+        "jwt.encode_hs256": lambda: encode_jwt(user.name, _SECRET, 3600, {"scopes": "a b"}),
+        "jwt.decode_hs256": lambda: decode_jwt(hs256_token, ["scopes"], _SECRET),
+        "jwt.encode_eddsa": lambda: encode_jwt(user.name, key_ring, 3600, {"scopes": "a b"}),
+        "jwt.decode_eddsa": lambda: decode_jwt(eddsa_token, ["scopes"], key_ring),
+        "auth_tokens.encode_tokens": lambda: auth_service._encode_tokens(user, user.scopes),
+        "security.get_valid_scopes": lambda: get_valid_scopes(requested_scopes, auth_info),
+        "security.check_scopes_valid": lambda: check_scopes_valid(compiled_scopes, auth_info),
+        "security.check_user_not_disabled": lambda: check_user_not_disabled(auth_info),
+        "scopes.parse_cached": lambda: scope_registry.parse("service0:read service1:read"),
+        "types.scopes_bind": lambda: bind_scopes(user.scopes),
+        "types.scopes_result": lambda: result_scopes(user.scopes),
+        "telegram.decode_tg_token": lambda: tg_strategy._decode_tg_token(tg_token),
+        "schemas.auth_tokens": lambda: AuthTokensSchema(access=hs256_token, refresh=hs256_token),
+        "schemas.user_from_model": lambda: UserSchema.from_model(user),
+        "schemas.user_json": lambda: UserSchema.from_model(user).json(),
+        "schemas.token_introspection": lambda: TokenIntrospectionSchema(
+            active=True,
+            name=user.name,
+            scopes=user.scopes
+        )
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """
+    :return: best of repeat runs in nanoseconds per call.
+    """
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run_cases(only: str | None, repeat: int) -> dict[str, float]:
+    # Verification cost is measured, not the cache. Restored cache is empty.
+    cache_size = get_jwt_cache_size()
+    configure_jwt_cache(0)
+
+    results = {}
+    try:
+        for name, func in get_cases().items():
+            if only is None or name.startswith(only):
+                results[name] = measure(func, repeat)
+                print(f"{name:<36} {results[name]:>12.0f} ns")
+    finally:
+        configure_jwt_cache(cache_size)
+
+    return results
+
+
+def _get_environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "packages": {package: version(package) for package in TRACKED_PACKAGES}
+    }
+
+
+def save_baseline(results: dict[str, float], path: str):
+    baseline = {"environment": _get_environment(), "results": {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline["results"] = json.load(f)["results"]
+
+    # Cases that were not run keep their previous timings.
+    baseline["results"].update({name: round(ns, 1) for name, ns in results.items()})
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results: dict[str, float], path: str, threshold: float) -> bool:
+    """
+    :param threshold: allowed slowdown, 0.35 is 35%.
+
+    :return: True if there are no regressions.
+    """
+
+    with open(path) as f:
+        baseline = json.load(f)
+
+    environment = _get_environment()
+    if baseline["environment"] != environment:
+        print(f"Environment differs from baseline: {baseline['environment']} -> {environment}")
+
+    ok = True
+    print()
+    for name, ns in results.items():
+        if (base := baseline["results"].get(name)) is None:
+            print(f"{name:<36} no baseline")
+            continue
+
+        change = ns / base - 1
+        status = "REGRESSION" if change > threshold else ""
+        ok = ok and not status
+        print(f"{name:<36} {base:>12.0f} -> {ns:>12.0f} ns {change:>+8.1%} {status}")
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("run", "save", "compare"))
+    parser.add_argument("--only", help="run only cases with names starting with it")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.35, help="allowed slowdown for compare (above noise)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    results = run_cases(args.only, args.repeat)
+
+    if args.command == "save":
+        save_baseline(results, args.baseline)
+        print(f"Baseline is saved to {args.baseline}")
+    elif args.command == "compare" and not compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
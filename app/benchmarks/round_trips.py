@@ -0,0 +1,111 @@
+"""
+Counts DB round trips (statements, BEGIN and COMMIT included) of the services behind /tg/register and /tg/login
+against the configured DB. --refresh emulates refresh after every write (previous BaseRepo behavior).
+Created users are deleted at the end.
+
+    python -m app.benchmarks.round_trips --users 20
+"""
+
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import event, delete, select
+
+from app import db
+from app.config import load_config, get_config
+from app.core.auth_strategies import TelegramAuthStrategy, TelegramAddAccountData, TelegramCredentials
+from app.core.bloom import BloomFilter
+from app.core.crypto import encode_jwt
+from app.core.models import User, TelegramAccount
+from app.core.register import RegistrationService
+from app.core.repos import UserRepo, TelegramAccountRepo, UnitOfWork
+
+
+class _RoundTripsCounter:
+    def __init__(self):
+        self.count = 0
+
+    def on_round_trip(self, *args):
+        self.count += 1
+
+
+def _encode_tg_token(name: str) -> str:
+    # New first name every time, so profile is written on every login.
+    return encode_jwt(name, get_config().telegram.token_secret, 60, {
+        "tg_username": name,
+        "tg_first_name": uuid.uuid4().hex,
+        "tg_last_name": None,
+        "tg_photo_url": None
+    })
+
+
+def _get_tg_strategy(session) -> TelegramAuthStrategy:
+    # Profile is written on login without write-behind.
+    return TelegramAuthStrategy(TelegramAccountRepo(session, session), get_config(), None)
+
+
+async def _register(session, name: str, refresh: bool):
+    # Empty filter of taken names, as for a new name.
+    service = RegistrationService(
+        get_config(),
+        UserRepo(session, session),
+        BloomFilter(1000, 0.01),
+        UnitOfWork(session)
+    )
+
+    user = await service.register(name, _get_tg_strategy(session), TelegramAddAccountData(token=_encode_tg_token(name)))
+    if refresh:
+        await session.refresh(user)
+
+
+async def _login(session, name: str, refresh: bool):
+    user = await _get_tg_strategy(session).login_for_user(TelegramCredentials(token=_encode_tg_token(name)))
+    if refresh:
+        await session.refresh(user)
+
+
+async def run(users: int, refresh: bool):
+    load_config()
+    db.connect_to_db()
+
+    counter = _RoundTripsCounter()
+    engine = db._engine.sync_engine
+    for event_name in ("before_cursor_execute", "begin", "commit"):
+        event.listen(engine, event_name, counter.on_round_trip)
+
+    names = [f"bench_{uuid.uuid4().hex[:16]}" for _ in range(users)]
+    results = {}
+
+    try:
+        for title, operation in (("register", _register), ("login", _login)):
+            counter.count = 0
+            for name in names:
+                async with db.AsyncSessionLocal() as session:
+                    await operation(session, name, refresh)
+
+            results[title] = counter.count / users
+    finally:
+        async with db.AsyncSessionLocal() as session:
+            user_ids = select(User.id).where(User.name.in_(names))
+            await session.execute(delete(TelegramAccount).where(TelegramAccount.user_id.in_(user_ids)))
+            await session.execute(delete(User).where(User.name.in_(names)))
+            await session.commit()
+
+        await db.disconnect_from_db()
+
+    for title, round_trips in results.items():
+        print(f"{title}: {round_trips:.1f} round trips per request{' (with refresh)' if refresh else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--refresh", action="store_true", help="refresh objects after writes")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.users, args.refresh))
+
+
+if __name__ == "__main__":
+    main()
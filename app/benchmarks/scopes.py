@@ -0,0 +1,55 @@
+"""
+Compares authorization checks over lists of scopes (previous implementation) with compiled bitsets.
+
+    python -m app.benchmarks.scopes --scopes 20 --required 3 --number 200000
+"""
+
+import argparse
+import timeit
+
+from app.core.scopes import ScopeRegistry
+
+
+def is_permitted_lists(scopes_str: str, required: list[str]) -> bool:
+    # Token scopes are split on every request, then every required scope is searched in the list.
+    scopes = scopes_str.split()
+    if "admin" in scopes:
+        return True
+
+    for scope in required:
+        if scope not in scopes:
+            return False
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scopes", type=int, default=20, help="number of user scopes")
+    parser.add_argument("--required", type=int, default=3, help="number of scopes required by endpoint")
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    user_scopes = [f"service{i}:read" for i in range(args.scopes)]
+    # The worst case for lists, required scopes are at the end.
+    required = user_scopes[-args.required:]
+    scopes_str = " ".join(user_scopes)
+
+    registry = ScopeRegistry()
+    required_mask = registry.compile(required)
+
+    def check_bitset() -> bool:
+        return registry.is_permitted(registry.parse(scopes_str).mask, required_mask)
+
+    assert is_permitted_lists(scopes_str, required) and check_bitset()
+
+    lists_time = timeit.timeit(lambda: is_permitted_lists(scopes_str, required), number=args.number)
+    bitset_time = timeit.timeit(check_bitset, number=args.number)
+
+    print(f"lists:  {lists_time / args.number * 1e9:.0f} ns per check")
+    print(f"bitset: {bitset_time / args.number * 1e9:.0f} ns per check "
+          f"({lists_time / bitset_time:.1f}x, parsed scopes cached)")
+
+
+if __name__ == "__main__":
+    main()
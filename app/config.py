@@ -9,6 +9,18 @@ class Config:
     class _SQLAlchemy:
         async_db_url: str
 
+        pool_size: int
+        max_overflow: int
+        pool_timeout: int
+        pool_recycle: int
+        pool_pre_ping: bool
+        statement_cache_size: int
+
+        replica_db_urls: list
+        replica_balancing: str
+        replica_max_lag: int
+        replica_recent_changes_size: int
+
     class _UserDefault:
         scopes: list
 
@@ -21,6 +33,9 @@ class Config:
         smtp_user: str
         smtp_password: str
         smtp_from: str
+        smtp_timeout: int
+        smtp_pool_size: int
+        send_queue_size: int
 
         verify_url: str
         verify_token_expire: int
@@ -30,15 +45,60 @@ class Config:
         pwd_update_token_expire: int
         pwd_update_token_secret: str
 
+    class _EmailOutbox:
+        run_in_app: bool
+        batch_size: int
+        poll_interval: int
+        max_attempts: int
+        retry_backoff: int
+        max_retry_backoff: int
+
     class _OAuth:
         access_token_expire: int
         access_token_secret: str
+        access_token_algorithm: str
+        access_token_keys: list
+        jwks_max_age: int
+        introspect_max_tokens: int
+
+        stateless_access_tokens: bool
+        token_versions_refresh_interval: int
 
         refresh_token_expire: int
         refresh_token_secret: str
 
     class _Telegram:
         token_secret: str
+        profile_sync_interval: int
+        profile_sync_max_pending: int
+
+    class _JWT:
+        cache_size: int
+
+    class _PasswordHashing:
+        workers: int
+        max_concurrency: int
+
+    class _UserCache:
+        max_size: int
+        ttl: int
+
+    class _Invalidation:
+        listen: bool
+        reconnect_interval: int
+
+    class _Registration:
+        name_filter_capacity: int
+        name_filter_error_rate: float
+
+    class _ServerTiming:
+        header: bool
+        log_sample_rate: float
+
+    class _QueryStats:
+        budget: int
+        n_plus_one_threshold: int
+        log_sample_rate: float
 
     class _Tests:
         sync_db_url: str
@@ -49,8 +109,16 @@ class Config:
         self.sqlalchemy = Config._SQLAlchemy()
         self.user_default = Config._UserDefault()
         self.email = Config._Email()
+        self.email_outbox = Config._EmailOutbox()
         self.oauth = Config._OAuth()
         self.telegram = Config._Telegram()
+        self.jwt = Config._JWT()
+        self.password_hashing = Config._PasswordHashing()
+        self.user_cache = Config._UserCache()
+        self.invalidation = Config._Invalidation()
+        self.registration = Config._Registration()
+        self.server_timing = Config._ServerTiming()
+        self.query_stats = Config._QueryStats()
         self.tests = Config._Tests()
 
     def load_from_ini(self):
@@ -71,6 +139,9 @@ class Config:
 
                 if type_ == list:
                     value = str(parsed_section[key]).split(",")
+                elif type_ == bool:
+                    # bool() is true for any non-empty string.
+                    value = parsed_section.getboolean(key)
                 else:
                     value = type_(parsed_section[key])
 
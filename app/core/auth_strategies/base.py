@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import TypeVar, Generic
 
 from app.core.models import User, Base
@@ -18,6 +18,9 @@ class Credentials:
     Data required for strategy to login.
     """
 
+    scopes: list[str] = field(default_factory=list)
+    """ Requested scopes of the tokens. """
+
 
 LoginCredentialsType = TypeVar("LoginCredentialsType", bound=Credentials)
 AddAuthAccountDataType = TypeVar("AddAuthAccountDataType", bound=AddAuthAccountData)
@@ -31,7 +34,7 @@ class AuthStrategy(Generic[LoginCredentialsType, AddAuthAccountDataType, AuthMet
     """
 
     @abstractmethod
-    def add_auth_account_to_user(self, user: User, data: AddAuthAccountDataType) -> User:
+    async def add_auth_account_to_user(self, user: User, data: AddAuthAccountDataType) -> User:
         """
         Attaches new authentication account to given user model.
 
@@ -52,3 +55,13 @@ class AuthStrategy(Generic[LoginCredentialsType, AddAuthAccountDataType, AuthMet
         :raises InvalidAuthData: credentials are invalid.
         :raises AccessDenied: user is not permitted to authenticate.
         """
+
+    @abstractmethod
+    async def get_auth_method_data(self, user_id: int) -> AuthMethodDataType | None:
+        """
+        Get auth account of the user for this strategy.
+
+        :param user_id: id of the user.
+
+        :returns: account or None if user has no account for this strategy.
+        """
@@ -7,8 +7,9 @@ from pydantic import EmailStr
 from app.core.models import User
 from app.core.models.email import EmailAccount
 from app.core import exc
-from app.core.crypto import hash_password, verify_password
-from app.core.repos import EmailAccountRepo, UserRepo
+from app.core.crypto import hash_password_async, verify_password_async
+from app.core.timing import span
+from app.core.repos import EmailAccountRepo, UserRepo, LoadingProfile, is_recently_changed
 from app.config import Config, get_config
 from .base import AddAuthAccountData, AuthStrategy, Credentials
 
@@ -44,31 +45,39 @@ class EmailAuthStrategy(AuthStrategy[EmailCredentials, EmailAddAccountData, Emai
         self.user_repo = user_repo
         self.config = config
 
-    def add_auth_account_to_user(self, user: User, data: EmailAddAccountData) -> User:
+    async def add_auth_account_to_user(self, user: User, data: EmailAddAccountData) -> User:
         if data.is_verified is None:
             is_verified = not self.config.email.should_verify
         else:
             is_verified = data.is_verified
 
+        with span("password_hash"):
+            password_hash = await hash_password_async(data.password)
+
         user.email_account = EmailAccount(
             email=data.email,
             is_verified=is_verified,
-            password_hash=hash_password(data.password),
+            password_hash=password_hash,
             password_updated_with_token=None
         )
 
         return user
 
     async def _get_account(self, name_or_email: str | EmailStr) -> EmailAccount | None:
+        # Accounts are not modified, so they are read from the replica unless user may be stale there.
         if type(name_or_email) == str:
             # Find user.
-            user = await self.user_repo.get_by_name(name_or_email)
+            user = await self.user_repo.get_by_name(
+                name_or_email,
+                primary=is_recently_changed(name_or_email),
+                profile=LoadingProfile.FULL
+            )
             if user is None:
                 return None  # No user found -> no account found.
 
             return user.email_account
         elif type(name_or_email) == EmailStr:
-            return await self.email_repo.get_by_email(name_or_email)
+            return await self.email_repo.get_current_by_email(name_or_email, profile=LoadingProfile.PROFILE)
         else:
             assert_never(name_or_email)
 
@@ -80,7 +89,13 @@ class EmailAuthStrategy(AuthStrategy[EmailCredentials, EmailAddAccountData, Emai
         if not account.is_verified:
             raise exc.AccessDenied("user with unverified email account")
 
-        if not verify_password(credentials.password, account.password_hash):
+        with span("password_verify"):
+            is_valid = await verify_password_async(credentials.password, account.password_hash)
+
+        if not is_valid:
             raise exc.InvalidAuthData()
 
         return account.user
+
+    async def get_auth_method_data(self, user_id: int) -> EmailAccount | None:
+        return await self.email_repo.get_by_user_id(user_id)
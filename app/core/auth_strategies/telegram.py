@@ -7,7 +7,9 @@ from app.config import get_config, Config
 from app.core import exc
 from app.core.crypto import decode_jwt
 from app.core.models import User, TelegramAccount
-from app.core.repos import TelegramAccountRepo
+from app.core.repos import TelegramAccountRepo, LoadingProfile
+from app.core.tg_profile_sync import TelegramProfileSync, get_tg_profile_sync
+from app.core.timing import span
 from .base import AuthStrategy, Credentials, AddAuthAccountData
 
 
@@ -29,6 +31,18 @@ class TelegramTokenDataSchema(BaseModel):
     tg_photo_url: str | None
 
 
+def _get_changed_profile(account: TelegramAccount, token_data: TelegramTokenDataSchema) -> dict | None:
+    """
+    :return: profile data from token or None if it is the same as stored.
+    """
+
+    profile = token_data.dict(exclude={"tg_user_id"})
+    if all(getattr(account, key) == value for key, value in profile.items()):
+        return None
+
+    return profile
+
+
 class TelegramAuthStrategy(AuthStrategy[TelegramCredentials, TelegramAddAccountData, TelegramAccount]):
     """
     Authentication via telegram requires only valid Telegram JWT generated by nto-tg-jwt.
@@ -36,35 +50,38 @@ class TelegramAuthStrategy(AuthStrategy[TelegramCredentials, TelegramAddAccountD
 
     def __init__(self,
                  tg_account_repo: TelegramAccountRepo = Depends(),
-                 config: Config = Depends(get_config)
+                 config: Config = Depends(get_config),
+                 profile_sync: TelegramProfileSync | None = Depends(get_tg_profile_sync)
                  ):
         self.tg_account_repo = tg_account_repo
         self.config = config
+        self.profile_sync = profile_sync
 
     def _decode_tg_token(self, token: str) -> TelegramTokenDataSchema:
         try:
-            payload = decode_jwt(token, [
-                "tg_username",
-                "tg_first_name",
-                "tg_last_name",
-                "tg_photo_url"
-            ], self.config.telegram.token_secret)
-
-            # Rename "sub" to "tg_user_id".
-            payload["tg_user_id"] = payload["sub"]
-            del payload["sub"]
-
-            return TelegramTokenDataSchema(**payload)
+            with span("tg_token_decode"):
+                payload = decode_jwt(token, [
+                    "tg_username",
+                    "tg_first_name",
+                    "tg_last_name",
+                    "tg_photo_url"
+                ], self.config.telegram.token_secret)
+
+                # Rename "sub" to "tg_user_id".
+                payload["tg_user_id"] = payload["sub"]
+                del payload["sub"]
+
+                return TelegramTokenDataSchema(**payload)
         except (exc.InvalidToken, ValidationError):
             raise exc.InvalidAuthData()
 
-    def add_auth_account_to_user(self, user: User, data: TelegramAddAccountData) -> User:
+    async def add_auth_account_to_user(self, user: User, data: TelegramAddAccountData) -> User:
         # Raises InvalidAuthData.
         token_account_date = self._decode_tg_token(data.token)
 
+        # Account is attached via user, so it is cascaded into the session of a persistent user.
         user.telegram_account = TelegramAccount(
-            **token_account_date.__dict__,
-            user=user
+            **token_account_date.__dict__
         )
 
         return user
@@ -73,13 +90,22 @@ class TelegramAuthStrategy(AuthStrategy[TelegramCredentials, TelegramAddAccountD
         # Raises InvalidAuthData.
         token_account_data = self._decode_tg_token(schema.token)
 
-        # Find auth data in db.
-        account = await self.tg_account_repo.get_by_tg_user_id(token_account_data.tg_user_id)
+        # Find auth data in db. Account is not modified, so it is read from the replica unless it may be stale there.
+        account = await self.tg_account_repo.get_current_by_tg_user_id(
+            token_account_data.tg_user_id,
+            profile=LoadingProfile.PROFILE
+        )
         if account is None:
             raise exc.InvalidAuthData()
 
-        # Token data is ok, update profile data.
-        account.update_fields(**token_account_data.__dict__)
-        account = await self.tg_account_repo.update(account)
+        # Token data is ok, sync profile data if it is changed.
+        if (profile := _get_changed_profile(account, token_account_data)) is not None:
+            if self.profile_sync is not None:
+                self.profile_sync.add(account.id, profile)
+            else:
+                await self.tg_account_repo.update_profiles([{"id": account.id, **profile}])
 
         return account.user
+
+    async def get_auth_method_data(self, user_id: int) -> TelegramAccount | None:
+        return await self.tg_account_repo.get_by_user_id(user_id)
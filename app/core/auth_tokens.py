@@ -1,15 +1,26 @@
+import functools
 from dataclasses import dataclass
 
 from fastapi import Depends
 
 from app.config import Config, get_config
 from app.core import exc
-from app.core.crypto import encode_jwt, decode_jwt
+from app.core.crypto import encode_jwt, decode_jwt, KeyRing, get_access_key_ring
+from app.core.metrics import AUTH_OUTCOMES
 from app.core.models import User
 from app.core.repos import UserRepo
-from app.core.security import AuthenticatedUser, get_valid_scopes, check_scopes_valid, check_user_not_disabled
+from app.core.scopes import CompiledScopes, scope_registry
+from app.core.security import (
+    AuthenticatedUser,
+    UserAuthInfo,
+    get_valid_scopes,
+    check_scopes_valid,
+    check_user_not_disabled
+)
 from app.core.auth_strategies import AuthStrategy
 from app.core.auth_strategies import LoginCredentialsType
+from app.core.timing import span
+from app.core.token_versions import TokenVersions, get_token_versions
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -18,33 +29,84 @@ class AuthTokens:
     refresh: str
 
 
+def _count_outcome(operation: str, error: Exception | None):
+    if error is None:
+        AUTH_OUTCOMES.inc(operation, "ok")
+    elif isinstance(error, exc.InvalidAuthData):
+        AUTH_OUTCOMES.inc(operation, "invalid_auth_data")
+    elif isinstance(error, exc.AccessDenied):
+        AUTH_OUTCOMES.inc(operation, "access_denied")
+
+
+def _counts_outcomes(operation: str):
+    """
+    Counts results and auth errors of the decorated method (see metrics.AUTH_OUTCOMES).
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            try:
+                result = await method(*args, **kwargs)
+            except (exc.InvalidAuthData, exc.AccessDenied) as e:
+                _count_outcome(operation, e)
+                raise
+
+            _count_outcome(operation, None)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
 class AuthTokensService:
-    def __init__(self, config: Config = Depends(get_config), user_repo: UserRepo = Depends()):
+    def __init__(self,
+                 config: Config = Depends(get_config),
+                 user_repo: UserRepo = Depends(),
+                 token_versions: TokenVersions = Depends(get_token_versions),
+                 access_key_ring: KeyRing | None = Depends(get_access_key_ring)
+                 ):
         self.config = config
         self.user_repo = user_repo
+        self.token_versions = token_versions
+        self.access_key_ring = access_key_ring
+
+    @property
+    def _access_token_key(self) -> str | KeyRing:
+        # Asymmetric keys (if configured) allow other services to verify access tokens by JWKS.
+        return self.access_key_ring if self.access_key_ring is not None else self.config.oauth.access_token_secret
+
+    def _encode_tokens(self, user: User, scopes: list[str]) -> AuthTokens:
+        # Claims allow to verify access token without loading user (see stateless_access_tokens option).
+        claims = {
+            "scopes": " ".join(scopes),
+            "uid": user.id,
+            "disabled": user.is_disabled,
+            "token_version": user.token_version
+        }
+
+        with span("tokens_encode"):
+            access_token = encode_jwt(
+                user.name,
+                self._access_token_key,
+                self.config.oauth.access_token_expire,
+                claims
+            )
 
-    def _encode_tokens(self, username: str, scopes: list[str]) -> AuthTokens:
-        scopes_str = " ".join(scopes)
-
-        access_token = encode_jwt(
-            username,
-            self.config.oauth.access_token_secret,
-            self.config.oauth.access_token_expire,
-            {"scopes": scopes_str}
-        )
-
-        refresh_token = encode_jwt(
-            username,
-            self.config.oauth.refresh_token_secret,
-            self.config.oauth.refresh_token_expire,
-            {"scopes": scopes_str}
-        )
+            refresh_token = encode_jwt(
+                user.name,
+                self.config.oauth.refresh_token_secret,
+                self.config.oauth.refresh_token_expire,
+                claims
+            )
 
         return AuthTokens(
             access=access_token,
             refresh=refresh_token
         )
 
+    @_counts_outcomes("login")
     async def login_for_tokens(self,
                                strategy: AuthStrategy,
                                credentials: LoginCredentialsType
@@ -69,51 +131,190 @@ class AuthTokensService:
 
         verified_scopes = get_valid_scopes(credentials.scopes, user)
 
-        return self._encode_tokens(user.name, verified_scopes)
+        return self._encode_tokens(user, verified_scopes)
 
-    async def _validate_token_payload(self, username: str, scopes: list[str]) -> User:
-        if (user := await self.user_repo.get_by_name(username)) is None:
-            raise exc.InvalidAuthData()
+    @staticmethod
+    def _check_token_version(payload: dict, current_version: int):
+        """
+        :raises AccessDenied: token is revoked.
+        """
+
+        # Tokens without version are issued before versioning, they have initial version.
+        if int(payload.get("token_version", 0)) < current_version:
+            raise exc.AccessDenied("revoked token")
+
+    def _get_user_from_claims(self, payload: dict) -> UserAuthInfo | None:
+        """
+        Get user from signed claims of the access token without DB access.
+
+        :raises AccessDenied: token is revoked.
+
+        :return: user or None if token can't be verified by claims only.
+        """
+
+        if "uid" not in payload or "token_version" not in payload:
+            return None  # Token issued before claims are added.
+
+        # Stale map may miss revoked tokens.
+        if not self.token_versions.is_fresh(self.config.oauth.token_versions_refresh_interval * 3):
+            return None
+
+        user_id = int(payload["uid"])
 
         # Raises AccessDenied.
-        check_user_not_disabled(user)
-        check_scopes_valid(scopes, user)
+        self._check_token_version(payload, self.token_versions.get(user_id))
+
+        # Token scopes are subset of user scopes.
+        scopes = scope_registry.parse(str(payload["scopes"]))
+
+        return UserAuthInfo(
+            id=user_id,
+            name=str(payload["sub"]),
+            is_disabled=bool(payload.get("disabled", False)),
+            scopes=scopes.names,
+            scopes_mask=scopes.mask,
+            token_version=int(payload["token_version"])
+        )
+
+    async def _validate_token_payload(self,
+                                      payload: dict,
+                                      username: str,
+                                      scopes: CompiledScopes,
+                                      cached: bool
+                                      ) -> User | UserAuthInfo:
+        """
+        :param cached: use cached user auth info, if False then user is always loaded from the primary DB.
+        """
+
+        if cached:
+            user = await self.user_repo.get_auth_info_by_name(username)
+        else:
+            user = await self.user_repo.get_by_name(username, primary=True)
+
+        # Raises InvalidAuthData, AccessDenied.
+        self._check_user(payload, scopes, user)
 
         return user
 
-    async def get_auth_user_from_access_token(self, access_token: str) -> AuthenticatedUser:
+    def _check_user(self, payload: dict, scopes: CompiledScopes, user: User | UserAuthInfo | None):
+        """
+        :raises InvalidAuthData: user not found.
+        :raises AccessDenied: user is not permitted to authorize.
         """
-        Get authenticated user from access token.
 
-        :param access_token: access token.
+        if user is None:
+            raise exc.InvalidAuthData()
 
+        check_user_not_disabled(user)
+        check_scopes_valid(scopes, user)
+        self._check_token_version(payload, user.token_version)
+
+    def _decode_access_token(self, access_token: str) -> tuple[dict, CompiledScopes, UserAuthInfo | None]:
+        """
         :raises InvalidAuthData: invalid token.
-        :raises AccessDenied: user is not permitted to authorize.
+        :raises AccessDenied: user is not permitted to authorize (by token claims).
 
-        :return: authenticated user.
+        :return: payload, token scopes and user if it is verified by token claims only (stateless mode).
         """
 
         try:
-            payload = decode_jwt(
-                access_token,
-                ["exp", "scopes"],
-                self.config.oauth.access_token_secret
-            )
+            with span("access_token_decode"):
+                payload = decode_jwt(
+                    access_token,
+                    ["exp", "scopes"],
+                    self._access_token_key
+                )
         except exc.InvalidToken:
             raise exc.InvalidAuthData()
 
-        username = str(payload["sub"])
-        scopes = str(payload["scopes"]).split()
+        scopes = scope_registry.parse(str(payload["scopes"]))
 
-        # Raises InvalidAuthData, AccessDenied.
-        user = await self._validate_token_payload(username, scopes)
+        user = None
+        if self.config.oauth.stateless_access_tokens:
+            # Raises AccessDenied.
+            if (user := self._get_user_from_claims(payload)) is not None:
+                check_user_not_disabled(user)
+
+        return payload, scopes, user
 
+    @staticmethod
+    def _to_auth_user(payload: dict, scopes: CompiledScopes, user: User | UserAuthInfo) -> AuthenticatedUser:
         return AuthenticatedUser(
-            name=username,
-            scopes=scopes,
+            name=str(payload["sub"]),
+            scopes=list(scopes.names),
+            scopes_mask=scopes.mask,
             user=user
         )
 
+    @_counts_outcomes("authenticate")
+    async def get_auth_user_from_access_token(self, access_token: str) -> AuthenticatedUser:
+        """
+        Get authenticated user from access token.
+        In stateless mode user is taken from token claims, so DB is not accessed.
+
+        :param access_token: access token.
+
+        :raises InvalidAuthData: invalid token.
+        :raises AccessDenied: user is not permitted to authorize.
+
+        :return: authenticated user.
+        """
+
+        # Raises InvalidAuthData, AccessDenied.
+        payload, scopes, user = self._decode_access_token(access_token)
+
+        if user is None:
+            # Raises InvalidAuthData, AccessDenied.
+            user = await self._validate_token_payload(payload, str(payload["sub"]), scopes, cached=True)
+
+        return self._to_auth_user(payload, scopes, user)
+
+    async def introspect_access_tokens(self,
+                                       access_tokens: list[str]
+                                       ) -> list[AuthenticatedUser | exc.InvalidAuthData | exc.AccessDenied]:
+        """
+        Batch version of get_auth_user_from_access_token().
+        Users that can't be verified by token claims are loaded with one query.
+
+        :param access_tokens: access tokens.
+
+        :return: authenticated user or error for every token in the same order.
+        """
+
+        decoded = []
+        for access_token in access_tokens:
+            try:
+                decoded.append(self._decode_access_token(access_token))
+            except (exc.InvalidAuthData, exc.AccessDenied) as e:
+                decoded.append(e)
+
+        names = [str(item[0]["sub"]) for item in decoded if isinstance(item, tuple) and item[2] is None]
+        users = await self.user_repo.get_auth_info_by_names(names) if names else {}
+
+        results = []
+        for item in decoded:
+            if not isinstance(item, tuple):
+                results.append(item)
+                continue
+
+            payload, scopes, user = item
+            if user is None:
+                user = users.get(str(payload["sub"]))
+
+            try:
+                self._check_user(payload, scopes, user)
+            except (exc.InvalidAuthData, exc.AccessDenied) as e:
+                results.append(e)
+                continue
+
+            results.append(self._to_auth_user(payload, scopes, user))
+
+        for result in results:
+            _count_outcome("introspect", result if isinstance(result, Exception) else None)
+
+        return results
+
+    @_counts_outcomes("refresh")
     async def refresh_tokens(self, refresh_token: str) -> AuthTokens:
         """
         Get new tokens with refresh-token.
@@ -128,18 +329,20 @@ class AuthTokensService:
 
         # Raises InvalidTokenError
         try:
-            payload = decode_jwt(
-                refresh_token,
-                ["exp", "scopes"],
-                self.config.oauth.refresh_token_secret
-            )
+            with span("refresh_token_decode"):
+                payload = decode_jwt(
+                    refresh_token,
+                    ["exp", "scopes"],
+                    self.config.oauth.refresh_token_secret
+                )
         except exc.InvalidToken:
             raise exc.InvalidAuthData()
 
         username = str(payload["sub"])
-        scopes = str(payload["scopes"]).split()
+        scopes = scope_registry.parse(str(payload["scopes"]))
 
         # Raises InvalidAuthData, AccessDenied.
-        await self._validate_token_payload(username, scopes)
+        # Refresh issues new tokens, so it is checked against actual data.
+        user = await self._validate_token_payload(payload, username, scopes, cached=False)
 
-        return self._encode_tokens(username, scopes)
+        return self._encode_tokens(user, list(scopes.names))
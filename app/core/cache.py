@@ -0,0 +1,83 @@
+"""
+In-process caches.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, TypeVar, Hashable
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+
+@dataclass(kw_only=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    """ Entries removed to free space for the new ones. """
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class TTLCache(Generic[KeyType, ValueType]):
+    """
+    Bounded LRU cache with entries expiration.
+    Not thread safe, should be used only from the event loop thread.
+    """
+
+    def __init__(self, max_size: int, ttl: float | None):
+        """
+        :param max_size: max number of entries, if 0 then nothing is cached.
+        :param ttl: default entry lifetime in seconds. If None then entries live until evicted.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[KeyType, tuple[ValueType, float | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: KeyType) -> ValueType | None:
+        if (entry := self._entries.get(key)) is None:
+            self.stats.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: KeyType, value: ValueType, ttl: float | None = None):
+        """
+        :param ttl: lifetime of this entry in seconds, overrides default one.
+        """
+
+        if self.max_size <= 0:
+            return
+
+        if ttl is None:
+            ttl = self.ttl
+
+        self._entries[key] = (value, None if ttl is None else time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: KeyType):
+        if self._entries.pop(key, None) is not None:
+            self.stats.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
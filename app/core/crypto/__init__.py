@@ -1,2 +1,11 @@
-from .password import verify_password, hash_password
-from .jwt import encode_jwt, decode_jwt
+from .password import (
+    verify_password,
+    hash_password,
+    verify_password_async,
+    hash_password_async,
+    init_password_hashing,
+    shutdown_password_hashing,
+    get_password_hashing_stats
+)
+from .jwt import encode_jwt, decode_jwt, configure_jwt_cache, get_jwt_cache_size, get_jwt_cache_stats
+from .keys import SigningKey, KeyRing, configure_access_token_keys, get_access_key_ring
@@ -1,18 +1,84 @@
+import hashlib
+import time
+
 import jwt
 
 from datetime import datetime, timedelta
 
 from app.core import exc
+from app.core.cache import TTLCache, CacheStats
+from app.core.crypto.keys import KeyRing, SigningKey
+from app.core.metrics import JWT_SECONDS
 
 _ALGORITHM = "HS256"
 
+# Disabled until configure_jwt_cache() is called.
+_verified_cache: TTLCache[bytes, dict] = TTLCache(0, None)
+
+
+def configure_jwt_cache(max_size: int):
+    """
+    Configure cache of verified tokens payloads used by decode_jwt().
+    Payload is cached until token expiration, so repeated decoding of the same token skips verification.
+
+    :param max_size: max number of cached tokens, 0 disables cache.
+    """
+
+    global _verified_cache
+    _verified_cache = TTLCache(max_size, None)
+
+
+def get_jwt_cache_size() -> int:
+    """
+    :return: max number of cached tokens, 0 if cache is disabled.
+    """
+    return _verified_cache.max_size
+
+
+def get_jwt_cache_stats() -> CacheStats:
+    return _verified_cache.stats
+
+
+def _get_verifying_key(token: str, secret: str | KeyRing) -> tuple[str | SigningKey, bytes]:
+    """
+    :return: key and its identity for the cache key.
+    """
+
+    if isinstance(secret, str):
+        return secret, secret.encode()
 
-def encode_jwt(sub: str, secret: str, expire_in_seconds: int | None = None, extra_payload: dict = None) -> str:
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.InvalidTokenError:
+        raise exc.InvalidToken("JWT")
+
+    if not isinstance(kid, str) or (key := secret.get(kid)) is None:
+        raise exc.InvalidToken("JWT")
+
+    return key, kid.encode()
+
+
+def _cache_key(token: str, key_id: bytes) -> bytes:
+    # Same token verified with another secret must not hit the cache.
+    return hashlib.sha256(key_id + b"\0" + token.encode()).digest()
+
+
+def _verify_jwt(token: str, key: str | SigningKey) -> dict:
+    try:
+        if isinstance(key, str):
+            return jwt.decode(token, key, [_ALGORITHM])
+        # Algorithm is fixed by the key, so token header can't downgrade it.
+        return jwt.decode(token, key.public_key, [key.algorithm])
+    except Exception:  # pyjwt may raise many exceptions (sometimes ValueError, for example).
+        raise exc.InvalidToken("JWT")
+
+
+def encode_jwt(sub: str, secret: str | KeyRing, expire_in_seconds: int | None = None, extra_payload: dict = None) -> str:
     """
     Encodes and encrypts token.
 
     :param sub: token's subject (use for username if required).
-    :param secret: encrypting secret.
+    :param secret: encrypting secret (HS256) or key ring, then token is signed by its active key with "kid" header.
     :param expire_in_seconds: lifetime of token in seconds. If None then no "exp" added.
     :param extra_payload: any JSON data. If None then no extra data is included.
 
@@ -30,29 +96,51 @@ def encode_jwt(sub: str, secret: str, expire_in_seconds: int | None = None, extr
     if expire_in_seconds is not None:
         payload["exp"] = datetime.utcnow() + timedelta(seconds=expire_in_seconds)
 
-    return jwt.encode(payload, secret, _ALGORITHM)
+    with JWT_SECONDS.time("encode"):
+        if isinstance(secret, str):
+            return jwt.encode(payload, secret, _ALGORITHM)
 
+        key = secret.active
+        return jwt.encode(payload, key.private_key, key.algorithm, headers={"kid": key.kid})
 
-def decode_jwt(token: str, required_payload_fields: list[str], secret: str) -> dict:
+
+def decode_jwt(token: str, required_payload_fields: list[str], secret: str | KeyRing) -> dict:
     """
     Decodes and verifies given token.
 
     :param token: given token.
     :param required_payload_fields: names of fields that the payload should contain.
         "sub" and "exp" will be checked in any way.
-    :param secret: encoding encrypting secret.
+    :param secret: encoding encrypting secret or key ring, then key is chosen by "kid" header.
 
     :raises InvalidToken: token is invalid or it's payload doesn't contain required fields.
 
-    :return: payload dictionary.
+    :return: payload dictionary (a new one on every call, so it can be modified).
     """
+
+    start = time.perf_counter()
+    operation = "decode"
     try:
-        payload = jwt.decode(token, secret, _ALGORITHM)
-    except Exception:  # pyjwt may raise many exceptions (sometimes ValueError, for example).
-        raise exc.InvalidToken("JWT")
+        # Raises InvalidToken.
+        key, key_id = _get_verifying_key(token, secret)
+
+        if _verified_cache.max_size <= 0:
+            payload = _verify_jwt(token, key)
+        else:
+            cache_key = _cache_key(token, key_id)
+            if (payload := _verified_cache.get(cache_key)) is None:
+                payload = _verify_jwt(token, key)
+
+                # Tokens without "exp" are rejected below anyway.
+                if isinstance(payload.get("exp"), (int, float)):
+                    _verified_cache.set(cache_key, payload, ttl=payload["exp"] - time.time())
+            else:
+                operation = "decode_cached"
+    finally:
+        JWT_SECONDS.observe(time.perf_counter() - start, operation)
 
     for required in required_payload_fields + ["sub", "exp"]:
         if required not in payload:
             raise exc.InvalidToken("JWT")
 
-    return payload
+    return dict(payload)
@@ -0,0 +1,133 @@
+"""
+Asymmetric keys for access tokens signing. Public keys are published as JWKS,
+so other services can verify access tokens offline.
+"""
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "ES256")
+
+# RFC 7638 members of the JWK thumbprint.
+_THUMBPRINT_MEMBERS = {
+    "OKP": ("crv", "kty", "x"),
+    "EC": ("crv", "kty", "x", "y")
+}
+
+
+def _thumbprint(jwk: dict) -> str:
+    members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+@dataclass(frozen=True, kw_only=True)
+class SigningKey:
+    kid: str
+    """ JWK thumbprint of the public key. """
+    algorithm: str
+    private_key: ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey = field(repr=False)
+    public_key: ed25519.Ed25519PublicKey | ec.EllipticCurvePublicKey
+    public_jwk: dict
+
+    @staticmethod
+    def from_private_key(algorithm: str, private_key) -> "SigningKey":
+        """
+        :raises ValueError: key doesn't match algorithm.
+        """
+
+        if algorithm == "EdDSA" and isinstance(private_key, ed25519.Ed25519PrivateKey):
+            jwk = OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+        elif algorithm == "ES256" and isinstance(private_key, ec.EllipticCurvePrivateKey) \
+                and isinstance(private_key.curve, ec.SECP256R1):
+            jwk = ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+        else:
+            raise ValueError(f"key doesn't match '{algorithm}' algorithm")
+
+        kid = _thumbprint(jwk)
+
+        return SigningKey(
+            kid=kid,
+            algorithm=algorithm,
+            private_key=private_key,
+            public_key=private_key.public_key(),
+            public_jwk={**jwk, "kid": kid, "alg": algorithm, "use": "sig"}
+        )
+
+    @staticmethod
+    def from_pem(algorithm: str, pem: bytes) -> "SigningKey":
+        """
+        :raises ValueError: invalid PEM or key doesn't match algorithm.
+        """
+        return SigningKey.from_private_key(algorithm, load_pem_private_key(pem, password=None))
+
+
+class KeyRing:
+    """
+    Signing keys for rotation. Tokens are signed by the first (active) key only, the rest are kept
+    to verify tokens issued before rotation. All keys are published in JWKS.
+
+    Rotation: add the new key last, so it is published before it signs. After JWKS caches are refreshed
+    (jwks_max_age) move it first, remove the old key after its tokens expire.
+    """
+
+    def __init__(self, keys: list[SigningKey]):
+        assert len(keys) != 0, "key ring is empty"
+
+        self.keys = keys
+        self._by_kid = {key.kid: key for key in keys}
+        self.jwks_json = json.dumps({"keys": [key.public_jwk for key in keys]}).encode()
+        self.jwks_etag = '"' + hashlib.sha256(self.jwks_json).hexdigest()[:32] + '"'
+
+    @property
+    def active(self) -> SigningKey:
+        return self.keys[0]
+
+    def get(self, kid: str) -> SigningKey | None:
+        return self._by_kid.get(kid)
+
+    @staticmethod
+    def load(algorithm: str, paths: list[str]) -> "KeyRing":
+        """
+        :param paths: PEM files of private keys, the first one is active.
+
+        :raises ValueError: invalid key.
+        :raises OSError: key file can't be read.
+        """
+
+        keys = []
+        for path in paths:
+            with open(path, "rb") as f:
+                keys.append(SigningKey.from_pem(algorithm, f.read()))
+
+        return KeyRing(keys)
+
+
+# None if access tokens are signed with the shared secret (HS256).
+_access_key_ring: KeyRing | None = None
+
+
+def configure_access_token_keys(algorithm: str, paths: list[str]):
+    """
+    :param algorithm: HS256 (shared secret, no keys) or one of ASYMMETRIC_ALGORITHMS.
+    :param paths: PEM files of private keys, the first one is active.
+    """
+
+    global _access_key_ring
+
+    if algorithm == "HS256":
+        _access_key_ring = None
+        return
+
+    assert algorithm in ASYMMETRIC_ALGORITHMS, f"unsupported access token algorithm '{algorithm}'"
+    _access_key_ring = KeyRing.load(algorithm, [path.strip() for path in paths if path.strip()])
+
+
+def get_access_key_ring() -> KeyRing | None:
+    return _access_key_ring
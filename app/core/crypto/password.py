@@ -1,11 +1,21 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
 from passlib.context import CryptContext
 
+from app.core.metrics import PASSWORD_HASHING_SECONDS
+
 _crypt_context = CryptContext(schemes=["bcrypt"])
 
+ResultType = TypeVar("ResultType")
+
 
 def hash_password(password: str) -> str:
     """
     Hashes given password with salt.
+    Blocks for the whole bcrypt computation, use hash_password_async() from async code.
     """
     return _crypt_context.hash(password)
 
@@ -13,5 +23,89 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hash_: str) -> bool:
     """
     Verifies password with a hash.
+    Blocks for the whole bcrypt computation, use verify_password_async() from async code.
     """
     return _crypt_context.verify(password, hash_)
+
+
+@dataclass(kw_only=True)
+class PasswordHashingStats:
+    waiting: int = 0
+    """ Calls waiting for a free slot (queue depth). """
+    running: int = 0
+    """ Calls currently computed by the pool. """
+    completed: int = 0
+
+
+_executor: ProcessPoolExecutor | None = None
+_semaphore: asyncio.Semaphore | None = None
+_max_concurrency: int | None = None
+_stats = PasswordHashingStats()
+
+
+def init_password_hashing(workers: int, max_concurrency: int):
+    """
+    Creates process pool for async password hashing.
+
+    :param workers: number of worker processes.
+    :param max_concurrency: max number of calls submitted to the pool at once, other calls wait in queue.
+    """
+
+    global _executor, _semaphore, _max_concurrency
+
+    shutdown_password_hashing()
+
+    _executor = ProcessPoolExecutor(max_workers=workers)
+    _semaphore = None  # Created lazily inside running event loop.
+    _max_concurrency = max_concurrency
+
+
+def shutdown_password_hashing():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def get_password_hashing_stats() -> PasswordHashingStats:
+    return _stats
+
+
+async def _run_in_pool(operation: str, func: Callable[..., ResultType], *args) -> ResultType:
+    global _semaphore
+
+    if _executor is None:
+        raise RuntimeError("password hashing pool is not initialized, call init_password_hashing()")
+
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(_max_concurrency)
+
+    _stats.waiting += 1
+    try:
+        await _semaphore.acquire()
+    finally:
+        _stats.waiting -= 1
+
+    _stats.running += 1
+    try:
+        with PASSWORD_HASHING_SECONDS.time(operation):
+            return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _stats.running -= 1
+        _stats.completed += 1
+        _semaphore.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Same as hash_password(), but computed in process pool without blocking event loop.
+    """
+    return await _run_in_pool("hash", hash_password, password)
+
+
+async def verify_password_async(password: str, hash_: str) -> bool:
+    """
+    Same as verify_password(), but computed in process pool without blocking event loop.
+    """
+    return await _run_in_pool("verify", verify_password, password, hash_)
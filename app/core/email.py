@@ -1,22 +1,44 @@
+from datetime import datetime
+
 from fastapi import Depends
 
-from app.config import Config
+from app.config import Config, get_config
 from app.core import exc
-from app.core.crypto import encode_jwt, decode_jwt, hash_password
-from app.core.repos import EmailAccountRepo
-from app.mail_sender import MailSender
+from app.core.crypto import encode_jwt, decode_jwt, hash_password_async
+from app.core.models import EmailOutboxMessage
+from app.core.repos import EmailAccountRepo, EmailOutboxRepo, UnitOfWork
 
 
 class EmailService:
+    """
+    Mails are not sent right away, they are written to the outbox and sent by outbox worker.
+    Outbox row is written in the unit of work of the request, so if caller has started one,
+    the mail is committed (or rolled back) together with the caller's changes.
+    """
+
     def __init__(self,
-                 mail_sender: MailSender = Depends(),
+                 outbox_repo: EmailOutboxRepo = Depends(),
                  email_repo: EmailAccountRepo = Depends(),
-                 config: Config = Depends()
+                 uow: UnitOfWork = Depends(),
+                 config: Config = Depends(get_config)
                  ):
-        self.mail_sender = mail_sender
+        self.outbox_repo = outbox_repo
         self.email_repo = email_repo
+        self.uow = uow
         self.config = config
 
+    async def _send_mail(self, kind: str, email: str, token: str):
+        now = datetime.utcnow()
+
+        await self.outbox_repo.enqueue(EmailOutboxMessage(
+            kind=kind,
+            email=email,
+            token=token,
+            created_at=now,
+            attempts=0,
+            next_attempt_at=now
+        ))
+
     async def request_verify_token(self, email: str):
         """
         Request sending verify token for user to the given email address.
@@ -36,7 +58,8 @@ class EmailService:
             self.config.email.verify_token_expire
         )
 
-        self.mail_sender.send_verification_mail(email, token)
+        async with self.uow:
+            await self._send_mail(EmailOutboxMessage.KIND_VERIFICATION, account.email, token)
 
     async def verify_by_token(self, token: str):
         """
@@ -50,7 +73,7 @@ class EmailService:
         payload = decode_jwt(token, [], self.config.email.verify_token_secret)
         email = payload["sub"]
 
-        if (account := await self.email_repo.get_by_email(email)) is None:
+        if (account := await self.email_repo.get_by_email(email, primary=True)) is None:
             raise exc.InvalidToken("email verification")
 
         if account.is_verified:
@@ -74,7 +97,8 @@ class EmailService:
             self.config.email.verify_token_expire
         )
 
-        self.mail_sender.send_password_update_mail(account.email, token)
+        async with self.uow:
+            await self._send_mail(EmailOutboxMessage.KIND_PASSWORD_UPDATE, account.email, token)
 
     async def update_password_by_token(self, token: str, new_password: str):
         """
@@ -87,13 +111,13 @@ class EmailService:
         payload = decode_jwt(token, [], self.config.email.verify_token_secret)
         email = payload["sub"]
 
-        if (account := await self.email_repo.get_by_email(email)) is None:
+        if (account := await self.email_repo.get_by_email(email, primary=True)) is None:
             raise exc.InvalidToken("password update")
 
         if account.password_updated_with_token == token:
             raise exc.AlreadyDoneNonIdempotentAction("password update with given token")
 
-        account.password_hash = hash_password(new_password)
+        account.password_hash = await hash_password_async(new_password)
         account.password_updated_with_token = token
 
         await self.email_repo.update(account)
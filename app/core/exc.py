@@ -43,6 +43,15 @@ class NotFound(Exception):
         super().__init__(f"{resource} not found")
 
 
+class Overloaded(Exception):
+    """
+    Resource is temporarily overloaded, request may be retried later.
+    """
+
+    def __init__(self, resource: str):
+        super().__init__(f"{resource} is overloaded")
+
+
 class AlreadyDoneNonIdempotentAction(Exception):
     """
     Same non-idempotent action was already performed.
@@ -0,0 +1,159 @@
+"""
+Invalidation of per-process caches of users data between workers and replicas via Postgres LISTEN/NOTIFY.
+
+Repos emit notification in the same transaction as the change, so it is delivered only after commit.
+Every process runs InvalidationListener that passes received notifications to registered handlers.
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "users_invalidation"
+
+
+@dataclass(frozen=True, kw_only=True)
+class UserInvalidation:
+    user_id: int | None
+    names: tuple[str, ...] = ()
+    """ All names of the user cached data may be stored by (previous name included). """
+    token_version: int | None = None
+    """ New token version if it was changed. """
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "user_id": self.user_id,
+            "names": list(self.names),
+            "token_version": self.token_version
+        })
+
+    @staticmethod
+    def from_json(payload: str) -> "UserInvalidation":
+        data = json.loads(payload)
+        return UserInvalidation(
+            user_id=data["user_id"],
+            names=tuple(data["names"]),
+            token_version=data["token_version"]
+        )
+
+
+InvalidationHandler = Callable[[UserInvalidation], None]
+ResetHandler = Callable[[], None]
+
+_invalidation_handlers: list[InvalidationHandler] = []
+_reset_handlers: list[ResetHandler] = []
+
+
+def add_invalidation_handler(on_invalidation: InvalidationHandler, on_reset: ResetHandler):
+    """
+    :param on_invalidation: called for every received notification.
+    :param on_reset: called when notifications could be missed (listener (re)connected), so all data may be stale.
+    """
+
+    _invalidation_handlers.append(on_invalidation)
+    _reset_handlers.append(on_reset)
+
+
+def dispatch_invalidation(payload: str):
+    try:
+        invalidation = UserInvalidation.from_json(payload)
+    except (ValueError, KeyError, TypeError):
+        logger.error("Invalid invalidation payload: %s", payload)
+        return
+
+    for handler in _invalidation_handlers:
+        handler(invalidation)
+
+
+def dispatch_reset():
+    for handler in _reset_handlers:
+        handler()
+
+
+async def notify_invalidation(session: AsyncSession, invalidation: UserInvalidation):
+    """
+    Emits notification in current transaction of the session, it is delivered on commit.
+    """
+
+    await session.execute(select(func.pg_notify(CHANNEL, invalidation.to_json())))
+
+
+class InvalidationListener:
+    """
+    Listens for invalidation notifications on dedicated connection. Reconnects on connection loss.
+    """
+
+    def __init__(self, dsn: str, reconnect_interval: float):
+        self.dsn = dsn
+        self.reconnect_interval = reconnect_interval
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _on_notification(connection, pid: int, channel: str, payload: str):
+        dispatch_invalidation(payload)
+
+    async def _listen_once(self):
+        lost = asyncio.Event()
+
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(CHANNEL, self._on_notification)
+
+            # Notifications sent while not listening are lost.
+            dispatch_reset()
+
+            await lost.wait()
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen_once()
+                logger.warning("Invalidation listener connection is lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Invalidation listener failed")
+
+            await asyncio.sleep(self.reconnect_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_listener: InvalidationListener | None = None
+
+
+def start_invalidation_listener(dsn: str, reconnect_interval: float):
+    global _listener
+
+    _listener = InvalidationListener(dsn, reconnect_interval)
+    _listener.start()
+
+
+async def stop_invalidation_listener():
+    global _listener
+
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
@@ -0,0 +1,210 @@
+"""
+In-process metrics exposed in Prometheus text format (see /metrics endpoint).
+
+Metrics are recorded from the event loop thread only, so they are plain counters without locks:
+recording is a dict lookup and a few additions and it can stay on under full load.
+Every worker process aggregates its own metrics, they are summed up by Prometheus queries.
+Metrics are registered in the global registry unless another one is given (e.g. by tests).
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Iterator
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+Registry = list["Counter | Gauge | Histogram"]
+
+_metrics: Registry = []
+_collect_hooks: list[Callable[[], None]] = []
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Counter:
+    type_ = "counter"
+
+    def __init__(self, name: str, help_: str, labels: tuple[str, ...] = (), registry: Registry | None = None):
+        """
+        :param registry: rendered metrics, global one if None.
+        """
+
+        self.name = name
+        self.help = help_
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        (_metrics if registry is None else registry).append(self)
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, *labels: str, value: float):
+        """
+        Set value counted elsewhere (from collect hook, see add_collect_hook()).
+        """
+        self._values[labels] = value
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type_}"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """
+    Value that is set on scrape by collect hook (see add_collect_hook()).
+    """
+
+    type_ = "gauge"
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets_count: int):
+        # Not cumulative, the last one is +Inf bucket.
+        self.counts = [0] * (buckets_count + 1)
+        self.sum = 0.0
+
+
+class Histogram:
+    def __init__(self,
+                 name: str,
+                 help_: str,
+                 labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+                 registry: Registry | None = None
+                 ):
+        """
+        :param registry: rendered metrics, global one if None.
+        """
+
+        self.name = name
+        self.help = help_
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], _HistogramSeries] = {}
+        (_metrics if registry is None else registry).append(self)
+
+    def observe(self, value: float, *labels: str):
+        if (series := self._series.get(labels)) is None:
+            series = self._series[labels] = _HistogramSeries(len(self.buckets))
+
+        # Bucket bounds are inclusive.
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """
+        Context manager observing time of its body.
+        """
+        return _Timer(self, labels)
+
+    def get_count(self, *labels: str) -> int:
+        return 0 if (series := self._series.get(labels)) is None else sum(series.counts)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(series.sum)}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def add_collect_hook(hook: Callable[[], None]):
+    """
+    :param hook: called before rendering, use it to set gauges from stats collected elsewhere.
+    """
+    _collect_hooks.append(hook)
+
+
+def render_metrics(registry: Registry | None = None) -> str:
+    """
+    :param registry: metrics to render, global one if None.
+    """
+
+    for hook in _collect_hooks:
+        hook()
+
+    lines = []
+    for metric in _metrics if registry is None else registry:
+        lines.extend(metric.render())
+
+    return "\n".join(lines) + "\n"
+
+
+# Metrics of the hot paths.
+
+REQUEST_SECONDS = Histogram(
+    "users_http_request_duration_seconds",
+    "Time of HTTP requests processing by route",
+    ("method", "route", "status")
+)
+JWT_SECONDS = Histogram(
+    "users_jwt_duration_seconds",
+    "Time of JWT encoding and decoding (decode_cached is decoding with verified payload cache hit)",
+    ("operation",)
+)
+PASSWORD_HASHING_SECONDS = Histogram(
+    "users_password_hashing_duration_seconds",
+    "Time of bcrypt hashing and verification in process pool (waiting for a free slot excluded)",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2.5, 5)
+)
+REPO_METHOD_SECONDS = Histogram(
+    "users_repo_method_duration_seconds",
+    "Time of repo methods (queries and commits), nested repo calls are included in the outer one",
+    ("repo", "method")
+)
+STATEMENTS_PER_REQUEST = Histogram(
+    "users_db_statements_per_request",
+    "Number of SQL statements executed by HTTP request",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50)
+)
+POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "users_db_pool_checkout_wait_seconds",
+    "Time of waiting for a connection from the primary DB pool (new connections establishing included)"
+)
+AUTH_OUTCOMES = Counter(
+    "users_auth_outcomes_total",
+    "Outcomes of tokens issuing and verification",
+    ("operation", "outcome")
+)
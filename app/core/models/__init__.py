@@ -3,3 +3,4 @@ from .types import ScopesArrayType
 from .telegram import TelegramAccount
 from .email import EmailAccount
 from .user import User
+from .outbox import EmailOutboxMessage
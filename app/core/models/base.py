@@ -2,6 +2,9 @@ from sqlalchemy.orm import DeclarativeBase
 
 
 class Base(DeclarativeBase):
+    # Server generated values are fetched by RETURNING of INSERT/UPDATE, so objects don't need refresh after write.
+    __mapper_args__ = {"eager_defaults": True}
+
     def update_fields(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
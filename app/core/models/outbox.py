@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class EmailOutboxMessage(Base):
+    """
+    Mail waiting to be sent by outbox worker. Written in the same transaction as the action that requires it.
+    Row is deleted after mail is sent.
+    """
+
+    __tablename__ = "email_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(nullable=False)
+    """ One of EmailOutboxMessage.KIND_* """
+    email: Mapped[str] = mapped_column(nullable=False)
+    token: Mapped[str] = mapped_column(nullable=False)
+    created_at: Mapped[datetime] = mapped_column(nullable=False)
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(index=True)
+    """ None if attempts are exhausted. """
+    last_error: Mapped[str | None] = mapped_column(default=None)
+
+    KIND_VERIFICATION = "verification"
+    KIND_PASSWORD_UPDATE = "password_update"
@@ -1,16 +1,17 @@
-from sqlalchemy import TypeDecorator, String, Dialect
+from sqlalchemy import TypeDecorator, Text, Dialect
+from sqlalchemy.dialects.postgresql import ARRAY
 
 
 # noinspection PyAbstractClass
 class ScopesArrayType(TypeDecorator):
     """
-    Array of user scopes that is stored as a string in DB. Note that scope should not contain any blank characters.
+    Array of user scopes that is stored as Postgres text[], so users can be searched by scope with GIN index.
     """
-    impl = String
+    impl = ARRAY(Text)
     cache_ok = True
 
-    def process_bind_param(self, value: list[str], dialect: Dialect) -> str:
-        return " ".join(value)
+    def process_bind_param(self, value: list[str] | None, dialect: Dialect) -> list[str]:
+        return [] if value is None else list(value)
 
-    def process_result_value(self, value: str, dialect: Dialect) -> list[str]:
-        return value.split()
\ No newline at end of file
+    def process_result_value(self, value: list[str] | None, dialect: Dialect) -> list[str]:
+        return [] if value is None else value
@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from sqlalchemy import Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .telegram import TelegramAccount
@@ -10,13 +11,22 @@ from app.core.models.types import ScopesArrayType
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_revoked_token_version", "id", "token_version", postgresql_where=text("token_version > 0")),
+        Index("ix_users_scopes", "scopes", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
 
     name: Mapped[str] = mapped_column(index=True, unique=True, nullable=False)
     is_disabled: Mapped[bool] = mapped_column(nullable=False, default=False)
-    scopes: Mapped[list[str]] = mapped_column(ScopesArrayType, nullable=False, default=[])
+    scopes: Mapped[list[str]] = mapped_column(
+        ScopesArrayType, nullable=False, default=[], server_default=text("'{}'")
+    )
     registered_at: Mapped[datetime] = mapped_column(nullable=False)
+    token_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    """ Incremented to revoke all issued tokens. """
 
-    telegram_account: Mapped[TelegramAccount] = relationship(back_populates="user", lazy="joined", uselist=False)
-    email_account: Mapped[EmailAccount] = relationship(back_populates="user", lazy="joined", uselist=False)
+    # Loaded only on demand (see repos LoadingProfile).
+    telegram_account: Mapped[TelegramAccount] = relationship(back_populates="user", lazy="raise_on_sql", uselist=False)
+    email_account: Mapped[EmailAccount] = relationship(back_populates="user", lazy="raise_on_sql", uselist=False)
@@ -1,38 +1,136 @@
+import asyncio
+import logging
 from datetime import datetime
 
 from fastapi import Depends
 
+from app import db
 from app.config import Config, get_config
+from app.core import exc
+from app.core.bloom import BloomFilter
+from app.core.invalidation import UserInvalidation, add_invalidation_handler
 from app.core.models import User
-from app.core.repos import UserRepo
+from app.core.repos import UserRepo, UnitOfWork
 from app.core.auth_strategies import AuthStrategy
 from app.core.auth_strategies import AddAuthAccountDataType
 
+logger = logging.getLogger(__name__)
+
+# Filter of taken names, None if disabled or not loaded yet.
+_taken_names: BloomFilter | None = None
+_filter_capacity = 0
+_filter_error_rate = 0.0
+_reload_task: asyncio.Task | None = None
+
+
+def _on_invalidation(invalidation: UserInvalidation):
+    # New and renamed users of other processes.
+    if _taken_names is not None:
+        for name in invalidation.names:
+            _taken_names.add(name)
+
+
+async def _reload_taken_names_filter():
+    global _reload_task
+
+    try:
+        await load_taken_names_filter(_filter_capacity, _filter_error_rate)
+    except Exception:
+        logger.exception("Failed to reload filter of taken names")
+    finally:
+        _reload_task = None
+
+
+def _on_invalidation_reset():
+    # Names taken while notifications were missed are not in the filter, it is reloaded.
+    # Until then the old filter is used, it only lets registration skip the early check.
+    global _reload_task
+
+    if _taken_names is not None and _reload_task is None:
+        _reload_task = asyncio.get_running_loop().create_task(_reload_taken_names_filter())
+
+
+add_invalidation_handler(_on_invalidation, _on_invalidation_reset)
+
+
+async def load_taken_names_filter(capacity: int, error_rate: float):
+    """
+    Loads names of all users into the filter of taken names.
+
+    :param capacity: expected number of users, 0 disables filter.
+    :param error_rate: false positives rate.
+    """
+
+    global _taken_names, _filter_capacity, _filter_error_rate
+
+    _filter_capacity, _filter_error_rate = capacity, error_rate
+
+    if capacity <= 0:
+        _taken_names = None
+        return
+
+    names_filter = BloomFilter(capacity, error_rate)
+    async with db.AsyncSessionLocal() as session:
+        async for name in UserRepo(session, session).stream_names():
+            names_filter.add(name)
+
+    # Partially loaded filter would report taken names as available.
+    _taken_names = names_filter
+
+
+def get_taken_names_filter() -> BloomFilter | None:
+    return _taken_names
+
 
 class RegistrationService:
     """
     Registers new user.
     """
 
-    def __init__(self, config: Config = Depends(get_config), user_repo: UserRepo = Depends()):
+    def __init__(self,
+                 config: Config = Depends(get_config),
+                 user_repo: UserRepo = Depends(),
+                 taken_names: BloomFilter | None = Depends(get_taken_names_filter),
+                 uow: UnitOfWork = Depends()
+                 ):
         self.config = config
         self.user_repo = user_repo
+        self.taken_names = taken_names
+        self.uow = uow
+
+    async def is_name_available(self, name: str) -> bool:
+        """
+        Checked in DB, name still may be taken concurrently after the check.
+        Filter of taken names can't be used, names inserted without notification
+        (by import tool or while listener is not connected) are not in it.
+        """
+
+        return await self.user_repo.get_by_name(name) is None
+
+    def _may_be_taken(self, name: str) -> bool:
+        return self.taken_names is None or name in self.taken_names
 
     async def register(self, username: str, strategy: AuthStrategy, auth_data: AddAuthAccountDataType) -> User:
         """
         Register user using given auth strategy.
         Auth data will be attached to created user.
+        Name found in the filter of taken names is checked in DB before auth data is processed by strategy
+        (it may be expensive). Other names are checked only by insert.
+        User and its auth account are written in one unit of work, or in the caller's one if it is started.
 
         :param username: name of the new user.
         :param strategy: auth strategy.
         :param auth_data: data for auth strategy.
 
-        :raises AlreadyExists: user with given name already exists.
+        :raises AlreadyExists: user with given name or auth account already exists.
         :raises InvalidAuthData: invalid auth data.
 
         :return: created user.
         """
 
+        if self._may_be_taken(username) and not await self.is_name_available(username):
+            raise exc.AlreadyExists("User")
+
         user = User(
             name=username,
             is_disabled=False,
@@ -41,7 +139,14 @@ class RegistrationService:
         )
 
         # Raises InvalidAuthData.
-        user = strategy.add_auth_account_to_user(user, auth_data)
+        user = await strategy.add_auth_account_to_user(user, auth_data)
 
         # Raises AlreadyExists.
-        return await self.user_repo.create(user)
+        async with self.uow:
+            if (created := await self.user_repo.insert_if_not_exists(user)) is None:
+                raise exc.AlreadyExists("User")
+
+        if self.taken_names is not None:
+            self.taken_names.add(username)
+
+        return created
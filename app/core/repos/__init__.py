@@ -1,4 +1,6 @@
-from .base import BaseRepo
+from .base import BaseRepo, LoadingProfile
 from .telegram import TelegramAccountRepo
 from .email import EmailAccountRepo
-from .user import UserRepo
+from .user import UserRepo, configure_user_cache, configure_recent_changes, get_user_cache_stats, is_recently_changed
+from .outbox import EmailOutboxRepo
+from .unit_of_work import UnitOfWork
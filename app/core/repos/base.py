@@ -1,59 +1,235 @@
 from app.core import exc
-from typing import TypeVar, Generic, Type
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from enum import Enum
+from typing import TypeVar, Generic, Type, AsyncIterator, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import select, inspect, Select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.base import NO_VALUE
+from sqlalchemy.orm.interfaces import ORMOption
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import models
+from app.core.invalidation import UserInvalidation, notify_invalidation
+from app.core.metrics import REPO_METHOD_SECONDS
+from app.core.timing import add_span
 
 ModelType = TypeVar("ModelType", bound=models.Base)
 
+IN_UNIT_OF_WORK = "in_unit_of_work"
+""" Key of session info with the depth of UnitOfWork blocks using the session, not set outside of them. """
+
+
+class LoadingProfile(Enum):
+    """
+    What is loaded with the object. Relationships are not loaded by default (models raise on lazy load),
+    so every query loads only what is requested by profile.
+    """
+
+    AUTH_MINIMAL = "auth_minimal"
+    """ Only columns required for authentication, no relationships. """
+    PROFILE = "profile"
+    """ All columns of the object and its directly related object if it is required to use it (account's user). """
+    FULL = "full"
+    """ Object with all relationships, required to attach/detach auth accounts. """
+
+
+def get_account_invalidation(account: models.TelegramAccount | models.EmailAccount,
+                             deleted: bool
+                             ) -> UserInvalidation | None:
+    """
+    Auth account affects cached data of the user only if it is attached or detached.
+    """
+
+    state = inspect(account)
+    if not deleted and not state.attrs.user_id.history.has_changes():
+        return None
+
+    names = ()
+    if (user := state.attrs.user.loaded_value) is not None and user is not NO_VALUE:
+        names = (user.name,)
+
+    return UserInvalidation(user_id=account.user_id, names=names)
+
+
+# Set while repo method is running, so nested calls are timed as a part of the outer one.
+_in_repo_method: ContextVar[bool] = ContextVar("in_repo_method", default=False)
+
+
+def _timed(method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if _in_repo_method.get():
+            return await method(self, *args, **kwargs)
+
+        token = _in_repo_method.set(True)
+        start = time.perf_counter()
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            REPO_METHOD_SECONDS.observe(elapsed, type(self).__name__, method.__name__)
+            add_span(f"{type(self).__name__}.{method.__name__}", elapsed)
+            _in_repo_method.reset(token)
+
+    return wrapper
+
+
+def _time_public_methods(cls: type):
+    for name, attr in list(vars(cls).items()):
+        if not name.startswith("_") and asyncio.iscoroutinefunction(attr):
+            setattr(cls, name, _timed(attr))
+
 
 class BaseRepo(Generic[ModelType]):
-    def __init__(self, session: AsyncSession, model: Type[ModelType]):
+    """
+    Public async methods of repos are timed (see metrics.REPO_METHOD_SECONDS and timing spans).
+    """
+
+    loading_options: dict[LoadingProfile, Sequence[ORMOption]] = {}
+    """ Loader options of every profile, override in subclasses. """
+
+    def __init__(self, session: AsyncSession, model: Type[ModelType], read_session: AsyncSession | None = None):
+        """
+        :param session: primary DB session, used for writes.
+        :param read_session: read replica session for reads that don't need the latest data.
+            Objects loaded with it should not be modified. If None then primary session is used.
+        """
+
         self.session = session
         self.model = model
+        self.read_session = session if read_session is None else read_session
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _time_public_methods(cls)
 
-    async def get_by_id(self, id_: int) -> ModelType | None:
-        return await self.session.get(self.model, id_)
+    def _get_read_session(self, primary: bool) -> AsyncSession:
+        return self.session if primary else self.read_session
 
-    async def get_many(self, offset: int, limit: int) -> list[ModelType]:
-        result = await self.session.execute(
-            select(self.model).offset(offset).limit(limit)
+    def _select(self, profile: LoadingProfile) -> Select:
+        return select(self.model).options(*self.loading_options.get(profile, ()))
+
+    def _get_invalidation(self, obj: ModelType, deleted: bool) -> UserInvalidation | None:
+        """
+        Override to notify other processes that their cached data is changed by update/delete of the object.
+
+        :param deleted: object is being deleted.
+
+        :return: invalidation or None if changes do not affect cached data.
+        """
+        return None
+
+    async def _notify_invalidation(self, obj: ModelType, deleted: bool = False):
+        if (invalidation := self._get_invalidation(obj, deleted)) is not None:
+            await notify_invalidation(self.session, invalidation)
+
+    async def get_by_id(self, id_: int, profile: LoadingProfile = LoadingProfile.FULL) -> ModelType | None:
+        """
+        Reads from the primary DB. Object is reloaded even if it is already in session (maybe with other profile).
+        """
+
+        return await self.session.get(
+            self.model,
+            id_,
+            options=self.loading_options.get(profile, ()),
+            populate_existing=True
         )
-        # noinspection PyTypeChecker
-        return result.all()
 
-    async def create(self, obj: ModelType, attribute_names: list[str] = None) -> ModelType:
+    async def get_many(self,
+                       limit: int,
+                       after_id: int | None = None,
+                       profile: LoadingProfile = LoadingProfile.PROFILE
+                       ) -> list[ModelType]:
         """
-        :raises AlreadyExists: given model is not unique (if it should be).
+        Keyset pagination by primary key, read from the replica.
+        Each page is found by index, so walking all pages doesn't slow down with page number like OFFSET does.
+
+        :param after_id: id of the last object of the previous page, None for the first page.
+
+        :return: objects ordered by id.
+        """
+
+        query = self._select(profile).order_by(self.model.id).limit(limit)
+        if after_id is not None:
+            query = query.where(self.model.id > after_id)
+
+        result = await self.read_session.scalars(query)
+        return list(result.all())
+
+    async def stream_many(self,
+                          batch_size: int = 1000,
+                          profile: LoadingProfile = LoadingProfile.PROFILE
+                          ) -> AsyncIterator[ModelType]:
+        """
+        Iterates over all objects ordered by id with server side cursor, read from the replica.
+        Only one batch is held in memory at once, objects should not be kept by caller.
         """
 
-        if attribute_names is None:
-            attribute_names = []
+        result = await self.read_session.stream_scalars(
+            self._select(profile).order_by(self.model.id).execution_options(yield_per=batch_size)
+        )
+
+        async for obj in result:
+            yield obj
+
+    async def _commit(self):
+        """
+        Commits session or only flushes it if session is used by UnitOfWork, so it commits once.
+        """
+
+        if self.session.info.get(IN_UNIT_OF_WORK):
+            await self.session.flush()
+        else:
+            await self.session.commit()
+
+    async def _rollback(self):
+        """
+        Rolls back session after failed write. Session used by UnitOfWork is rolled back by it when the error
+        leaves its block, so writes flushed before by other repos are not discarded here silently.
+        """
+
+        if not self.session.info.get(IN_UNIT_OF_WORK):
+            await self.session.rollback()
+
+    async def create(self, obj: ModelType) -> ModelType:
+        """
+        Server generated values (id, server defaults) are set from INSERT ... RETURNING, object is not refreshed.
+
+        :raises AlreadyExists: given model is not unique (if it should be).
+        """
 
         try:
             self.session.add(obj)
-            await self.session.commit()
-            await self.session.refresh(obj, attribute_names)
+            await self._commit()
         except IntegrityError:
+            await self._rollback()
             raise exc.AlreadyExists(self.model.__name__)
 
         return obj
 
     async def update(self, obj: ModelType) -> ModelType:
         """
+        Object is not refreshed, server generated values are set from UPDATE ... RETURNING.
+
         :raises AlreadyExists: model with updated unique data already exists.
         """
         try:
-            await self.session.commit()
-            await self.session.refresh(obj)
+            await self._notify_invalidation(obj)
+            await self._commit()
         except IntegrityError:
+            await self._rollback()
             raise exc.AlreadyExists(self.model.__name__)
 
         return obj
 
     async def delete(self, obj: ModelType):
+        await self._notify_invalidation(obj, deleted=True)
         await self.session.delete(obj)
-        await self.session.commit()
+        await self._commit()
+
+
+_time_public_methods(BaseRepo)
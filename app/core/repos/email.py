@@ -1,29 +1,89 @@
 from fastapi import Depends
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.core import exc
+from app.core.invalidation import UserInvalidation
+from app.core.models import User
 from app.core.models.email import EmailAccount
-from app.core.repos import BaseRepo
-from app.db import get_session
+from app.core.repos.base import BaseRepo, LoadingProfile, get_account_invalidation
+from app.db import get_session, get_read_session
+from .user import is_recently_changed
 
 
 class EmailAccountRepo(BaseRepo[EmailAccount]):
-    def __init__(self, session: AsyncSession = Depends(get_session)):
-        super().__init__(session, EmailAccount)
+    loading_options = {
+        LoadingProfile.AUTH_MINIMAL: (),
+        LoadingProfile.PROFILE: (joinedload(EmailAccount.user, innerjoin=True),),
+        LoadingProfile.FULL: (
+            joinedload(EmailAccount.user, innerjoin=True).options(
+                selectinload(User.telegram_account),
+                selectinload(User.email_account)
+            ),
+        )
+    }
+
+    def __init__(self,
+                 session: AsyncSession = Depends(get_session),
+                 read_session: AsyncSession = Depends(get_read_session)
+                 ):
+        super().__init__(session, EmailAccount, read_session)
+
+    def _get_invalidation(self, obj: EmailAccount, deleted: bool) -> UserInvalidation | None:
+        return get_account_invalidation(obj, deleted)
+
+    async def get_by_email(self,
+                           email: str,
+                           primary: bool = False,
+                           profile: LoadingProfile = LoadingProfile.AUTH_MINIMAL
+                           ) -> EmailAccount | None:
+        """
+        :param primary: read from the primary DB, required if account will be modified.
+        """
+
+        result = await self._get_read_session(primary).execute(
+            self._select(profile).where(EmailAccount.email == email)
+        )
+        return result.scalar_one_or_none()
 
-    async def get_by_email(self, email: str) -> EmailAccount | None:
+    async def get_current_by_email(self,
+                                   email: str,
+                                   profile: LoadingProfile = LoadingProfile.PROFILE
+                                   ) -> EmailAccount | None:
+        """
+        Reads from the replica, but from the primary if the account is not there (it may be just created)
+        or its user was changed recently (see UserRepo), so authentication sees the latest user state.
+        Profile should load the user of the account.
+        """
+
+        account = await self.get_by_email(email, profile=profile)
+        if self.read_session is self.session:
+            return account  # There are no replicas.
+
+        if account is None or is_recently_changed(account.user.name):
+            account = await self.get_by_email(email, primary=True, profile=profile)
+
+        return account
+
+    async def get_by_user_id(self,
+                             user_id: int,
+                             profile: LoadingProfile = LoadingProfile.AUTH_MINIMAL
+                             ) -> EmailAccount | None:
         result = await self.session.execute(
-            select(EmailAccount).where(EmailAccount.email == email)
+            self._select(profile).where(EmailAccount.user_id == user_id)
         )
-        # noinspection PyTypeChecker
-        return result.one()
+        return result.scalar_one_or_none()
 
-    async def get_by_email_or_fail(self, email: str) -> EmailAccount:
+    async def get_by_email_or_fail(self,
+                                   email: str,
+                                   profile: LoadingProfile = LoadingProfile.AUTH_MINIMAL
+                                   ) -> EmailAccount:
         """
+        Reads from the primary DB, account may be just created.
+
         :raises NotFound: account not found.
         """
-        if (account := self.get_by_email(email)) is None:
+        if (account := await self.get_by_email(email, primary=True, profile=profile)) is None:
             raise exc.NotFound("Email account")
 
         return account
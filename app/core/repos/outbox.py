@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from fastapi import Depends
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models import EmailOutboxMessage
+from app.db import get_session
+from .base import BaseRepo
+
+
+class EmailOutboxRepo(BaseRepo[EmailOutboxMessage]):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        super().__init__(session, EmailOutboxMessage)
+
+    async def enqueue(self, message: EmailOutboxMessage):
+        """
+        Writes message in the current transaction of the session, it is committed by the caller
+        (or its UnitOfWork) together with the changes that require the mail.
+        """
+
+        self.session.add(message)
+        await self.session.flush()
+
+    async def lock_due_batch(self, limit: int) -> list[EmailOutboxMessage]:
+        """
+        Locks messages which are due to be sent. Messages locked by other workers are skipped.
+        Locks are held until the end of current transaction.
+        """
+
+        result = await self.session.execute(
+            select(EmailOutboxMessage)
+            .where(EmailOutboxMessage.next_attempt_at <= datetime.utcnow())
+            .order_by(EmailOutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+    async def get_pending_stats(self) -> tuple[int, datetime | None]:
+        """
+        :return: number of pending messages and creation time of the oldest one (None if there are no messages).
+        """
+
+        result = await self.session.execute(
+            select(func.count(), func.min(EmailOutboxMessage.created_at))
+            .where(EmailOutboxMessage.next_attempt_at.is_not(None))
+        )
+        count, oldest = result.one()
+        return count, oldest
@@ -1,19 +1,85 @@
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.core.models import TelegramAccount
-from app.db import get_session
-from .base import BaseRepo
+from app.core.invalidation import UserInvalidation
+from app.core.models import TelegramAccount, User
+from app.db import get_session, get_read_session
+from .base import BaseRepo, LoadingProfile, get_account_invalidation
+from .user import is_recently_changed
 
 
 class TelegramAccountRepo(BaseRepo[TelegramAccount]):
-    def __init__(self, session: AsyncSession = Depends(get_session)):
-        super().__init__(session, TelegramAccount)
+    loading_options = {
+        LoadingProfile.AUTH_MINIMAL: (),
+        LoadingProfile.PROFILE: (joinedload(TelegramAccount.user, innerjoin=True),),
+        LoadingProfile.FULL: (
+            joinedload(TelegramAccount.user, innerjoin=True).options(
+                selectinload(User.telegram_account),
+                selectinload(User.email_account)
+            ),
+        )
+    }
+
+    def __init__(self,
+                 session: AsyncSession = Depends(get_session),
+                 read_session: AsyncSession = Depends(get_read_session)
+                 ):
+        super().__init__(session, TelegramAccount, read_session)
+
+    def _get_invalidation(self, obj: TelegramAccount, deleted: bool) -> UserInvalidation | None:
+        return get_account_invalidation(obj, deleted)
+
+    async def get_by_tg_user_id(self,
+                                tg_user_id: str,
+                                primary: bool = False,
+                                profile: LoadingProfile = LoadingProfile.AUTH_MINIMAL
+                                ) -> TelegramAccount | None:
+        """
+        :param primary: read from the primary DB, required if account will be modified.
+        """
+
+        result = await self._get_read_session(primary).execute(
+            self._select(profile).where(TelegramAccount.tg_user_id == tg_user_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_current_by_tg_user_id(self,
+                                        tg_user_id: str,
+                                        profile: LoadingProfile = LoadingProfile.PROFILE
+                                        ) -> TelegramAccount | None:
+        """
+        Reads from the replica, but from the primary if the account is not there (it may be just created)
+        or its user was changed recently (see UserRepo), so authentication sees the latest user state.
+        Profile should load the user of the account.
+        """
 
-    async def get_by_tg_user_id(self, tg_user_id: str) -> TelegramAccount:
+        account = await self.get_by_tg_user_id(tg_user_id, profile=profile)
+        if self.read_session is self.session:
+            return account  # There are no replicas.
+
+        if account is None or is_recently_changed(account.user.name):
+            account = await self.get_by_tg_user_id(tg_user_id, primary=True, profile=profile)
+
+        return account
+
+    async def get_by_user_id(self,
+                             user_id: int,
+                             profile: LoadingProfile = LoadingProfile.AUTH_MINIMAL
+                             ) -> TelegramAccount | None:
         result = await self.session.execute(
-            select(TelegramAccount).where(TelegramAccount.tg_user_id == tg_user_id)
+            self._select(profile).where(TelegramAccount.user_id == user_id)
         )
-        # noinspection PyTypeChecker
-        return result.one()
+        return result.scalar_one_or_none()
+
+    async def update_profiles(self, profiles: list[dict]):
+        """
+        Updates profile data of many accounts in one batch without loading them.
+        Profile data doesn't affect cached data of users, so there is nothing to invalidate.
+
+        :param profiles: new values of fields with account "id".
+        """
+
+        await self.session.execute(update(TelegramAccount), profiles)
+        await self._commit()
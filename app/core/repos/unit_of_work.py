@@ -0,0 +1,35 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_session
+from .base import IN_UNIT_OF_WORK
+
+
+class UnitOfWork:
+    """
+    Groups writes of several repos into one transaction. Inside `async with` block repos sharing the session
+    (request session is shared by all dependencies) only flush changes, they are committed once at the end
+    of the block or rolled back on exception.
+
+    Nested blocks on the same session join the outer one, so services using unit of work write
+    in the transaction of the caller if it is started.
+    """
+
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        self.session = session
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self.session.info[IN_UNIT_OF_WORK] = self.session.info.get(IN_UNIT_OF_WORK, 0) + 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        depth = self.session.info.pop(IN_UNIT_OF_WORK) - 1
+        if depth > 0:
+            # Outer block commits or rolls back.
+            self.session.info[IN_UNIT_OF_WORK] = depth
+            return
+
+        if exc_type is None:
+            await self.session.commit()
+        else:
+            await self.session.rollback()
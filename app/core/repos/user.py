@@ -1,33 +1,353 @@
+from typing import AsyncIterator, Iterable
+
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import select, inspect, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.models import User
+from app.core.cache import TTLCache, CacheStats
+from app.core.invalidation import UserInvalidation, add_invalidation_handler, notify_invalidation
+from app.core.models import User, Base
 from app.core import exc
-from app.db import get_session
-from .base import BaseRepo
+from app.core.security import UserAuthInfo
+from app.db import get_session, get_read_session
+from .base import BaseRepo, LoadingProfile
+
+# Disabled until configure_user_cache() is called.
+_auth_info_cache: TTLCache[str, UserAuthInfo] = TTLCache(0, None)
+# Names of users changed recently, they are read from the primary until replicas catch up.
+# Disabled until configure_recent_changes() is called.
+_recently_changed: TTLCache[str, bool] = TTLCache(0, None)
+
+
+def configure_user_cache(max_size: int, ttl: int):
+    """
+    Configure cache of users auth info used by UserRepo.get_auth_info_by_name().
+
+    :param max_size: max number of cached users, 0 disables cache.
+    :param ttl: lifetime of cached user in seconds.
+    """
+
+    global _auth_info_cache
+    _auth_info_cache = TTLCache(max_size, ttl)
+
+
+def configure_recent_changes(max_size: int, replica_max_lag: int):
+    """
+    Configure tracking of recently changed users, they are read from the primary instead of replicas.
+    It doesn't depend on the user cache, auth lookups read replicas with cache disabled too.
+
+    :param max_size: max number of tracked users, 0 disables tracking (required only with replicas).
+    :param replica_max_lag: seconds changed users are tracked, 0 disables tracking.
+    """
+
+    global _recently_changed
+    _recently_changed = TTLCache(max_size if replica_max_lag > 0 else 0, replica_max_lag)
+
+
+def get_user_cache() -> TTLCache[str, UserAuthInfo]:
+    return _auth_info_cache
+
+
+def get_user_cache_stats() -> CacheStats:
+    return _auth_info_cache.stats
+
+
+def is_recently_changed(name: str) -> bool:
+    """
+    :return: True if user may be stale in replicas, it should be read from the primary.
+    """
+    return _recently_changed.get(name) is not None
+
+
+def _invalidate_names(names):
+    for name in names:
+        _auth_info_cache.invalidate(name)
+        _recently_changed.set(name, True)
+
+
+def _on_invalidation(invalidation: UserInvalidation):
+    _invalidate_names(invalidation.names)
+
+
+def _on_invalidation_reset():
+    _auth_info_cache.clear()
+
+
+add_invalidation_handler(_on_invalidation, _on_invalidation_reset)
+
+
+def _get_cached_names(user: User) -> set[str]:
+    """
+    Returns current and previous (if it was changed, but not committed yet) names of the user.
+    """
+
+    names = {user.name}
+
+    history = inspect(user).attrs.name.history
+    names.update(history.deleted or ())
+
+    return names
+
+
+def _is_auth_data_changed(user: User) -> bool:
+    state = inspect(user)
+    return state.attrs.is_disabled.history.has_changes() or state.attrs.scopes.history.has_changes()
+
+
+def _is_cached_data_changed(user: User) -> bool:
+    state = inspect(user)
+    return (
+        _is_auth_data_changed(user)
+        or state.attrs.name.history.has_changes()
+        or state.attrs.token_version.history.has_changes()
+    )
+
+
+def _get_set_column_values(obj: Base) -> dict:
+    """
+    :return: values of columns that are set on (transient) object, unset ones get defaults on insert.
+    """
+
+    state = inspect(obj)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
 
 
 class UserRepo(BaseRepo[User]):
-    def __init__(self, session: AsyncSession = Depends(get_session)):
-        super().__init__(session, User)
+    loading_options = {
+        # Accessing other columns raises instead of loading them.
+        LoadingProfile.AUTH_MINIMAL: (
+            load_only(User.id, User.name, User.is_disabled, User.scopes, User.token_version, raiseload=True),
+        ),
+        LoadingProfile.PROFILE: (),
+        LoadingProfile.FULL: (joinedload(User.telegram_account), joinedload(User.email_account))
+    }
 
-    async def get_by_name(self, name: str) -> User | None:
-        result = await self.session.execute(
-            select(User).where(User.name == name)
+    def __init__(self,
+                 session: AsyncSession = Depends(get_session),
+                 read_session: AsyncSession = Depends(get_read_session)
+                 ):
+        super().__init__(session, User, read_session)
+
+    def _get_invalidation(self, obj: User, deleted: bool) -> UserInvalidation | None:
+        if not deleted and not _is_cached_data_changed(obj):
+            return None
+
+        return UserInvalidation(
+            user_id=obj.id,
+            names=tuple(_get_cached_names(obj)),
+            token_version=obj.token_version
         )
 
-        # noinspection PyTypeChecker
-        return result.one()
+    async def get_by_name(self,
+                          name: str,
+                          primary: bool = False,
+                          profile: LoadingProfile = LoadingProfile.AUTH_MINIMAL
+                          ) -> User | None:
+        """
+        :param primary: read from the primary DB, otherwise from the replica.
+        """
 
-    async def get_by_name_or_fail(self, name: str) -> User:
+        result = await self._get_read_session(primary).execute(
+            self._select(profile).where(User.name == name)
+        )
+
+        return result.scalar_one_or_none()
+
+    async def get_by_name_or_fail(self, name: str, profile: LoadingProfile = LoadingProfile.FULL) -> User:
         """
+        Reads from the primary DB, so user can be modified.
+
         :raises NotFound: if user not found.
 
         :return: found user model.
         """
 
-        if (user := await self.get_by_name(name)) is None:
+        if (user := await self.get_by_name(name, primary=True, profile=profile)) is None:
             raise exc.NotFound("User")
 
         return user
+
+    async def get_auth_info_by_name(self, name: str) -> UserAuthInfo | None:
+        """
+        Same as get_by_name(), but returns cached auth info snapshot if possible.
+        Cached data may be stale for at most cache TTL if user is changed not through this repo.
+        User is read from the replica unless it was changed recently.
+        """
+
+        if (auth_info := _auth_info_cache.get(name)) is not None:
+            return auth_info
+
+        primary = is_recently_changed(name)
+        if (user := await self.get_by_name(name, primary)) is None:
+            return None
+
+        auth_info = UserAuthInfo.from_user(user)
+        _auth_info_cache.set(name, auth_info)
+
+        return auth_info
+
+    async def get_auth_info_by_names(self, names: Iterable[str]) -> dict[str, UserAuthInfo]:
+        """
+        Batch version of get_auth_info_by_name(). Users missing in cache are loaded with one query
+        (and one more from the primary for recently changed users).
+
+        :return: auth info of found users by their names.
+        """
+
+        found = {}
+        missing = {False: [], True: []}  # By primary flag.
+
+        for name in set(names):
+            if (auth_info := _auth_info_cache.get(name)) is not None:
+                found[name] = auth_info
+            else:
+                missing[is_recently_changed(name)].append(name)
+
+        for primary, batch in missing.items():
+            if not batch:
+                continue
+
+            result = await self._get_read_session(primary).scalars(
+                self._select(LoadingProfile.AUTH_MINIMAL).where(User.name.in_(batch))
+            )
+
+            for user in result:
+                auth_info = UserAuthInfo.from_user(user)
+                _auth_info_cache.set(user.name, auth_info)
+                found[user.name] = auth_info
+
+        return found
+
+    async def get_revoked_token_versions(self) -> dict[int, int]:
+        """
+        :return: token versions of users that have ever revoked tokens by user ids.
+        """
+
+        result = await self.session.execute(
+            select(User.id, User.token_version).where(User.token_version > 0)
+        )
+        return {id_: version for id_, version in result.all()}
+
+    async def find_by_scope(self,
+                            scope: str,
+                            limit: int,
+                            after_id: int | None = None,
+                            profile: LoadingProfile = LoadingProfile.PROFILE
+                            ) -> list[User]:
+        """
+        Keyset pagination of users having the scope (GIN index on scopes is used), read from the replica.
+
+        :param after_id: id of the last user of the previous page, None for the first page.
+
+        :return: users ordered by id.
+        """
+
+        query = self._select(profile).where(User.scopes.contains([scope])).order_by(User.id).limit(limit)
+        if after_id is not None:
+            query = query.where(User.id > after_id)
+
+        result = await self.read_session.scalars(query)
+        return list(result.all())
+
+    async def count_by_scope(self, scope: str) -> int:
+        """
+        Number of users having the scope, read from the replica.
+        """
+
+        result = await self.read_session.execute(
+            select(func.count()).select_from(User).where(User.scopes.contains([scope]))
+        )
+        return result.scalar_one()
+
+    async def stream_names(self, batch_size: int = 10000) -> AsyncIterator[str]:
+        """
+        Iterates over names of all users with server side cursor, read from the replica.
+        """
+
+        result = await self.read_session.stream_scalars(
+            select(User.name).execution_options(yield_per=batch_size)
+        )
+
+        async for name in result:
+            yield name
+
+    async def insert_if_not_exists(self, user: User) -> User | None:
+        """
+        Inserts new user and auth accounts attached to it with INSERT ... ON CONFLICT DO NOTHING RETURNING,
+        so taken name is reported without IntegrityError. Inserted objects are returned by RETURNING.
+
+        :param user: transient user.
+
+        :raises AlreadyExists: auth account is already attached to other user (nothing is inserted,
+            inside UnitOfWork the user is discarded when the error leaves its block).
+
+        :return: inserted user (it is not the given object) or None if name is taken.
+        """
+
+        accounts = {
+            relationship.key: account
+            for relationship in inspect(User).relationships
+            if (account := inspect(user).dict.get(relationship.key)) is not None
+        }
+
+        inserted = await self.session.scalar(
+            insert(User)
+            .values(**_get_set_column_values(user))
+            .on_conflict_do_nothing(index_elements=[User.name])
+            .returning(User)
+        )
+        if inserted is None:
+            return None  # Nothing is written.
+
+        for relationship in inspect(User).relationships:
+            inserted_account = None
+
+            if (account := accounts.get(relationship.key)) is not None:
+                model = relationship.mapper.class_
+                values = _get_set_column_values(account) | {"user_id": inserted.id}
+
+                inserted_account = await self.session.scalar(
+                    insert(model).values(**values).on_conflict_do_nothing().returning(model)
+                )
+                if inserted_account is None:
+                    # Inserted user is rolled back with the account.
+                    await self._rollback()
+                    raise exc.AlreadyExists(model.__name__)
+
+                set_committed_value(inserted_account, relationship.back_populates, inserted)
+
+            # Relationships are known, so they can be used without loading.
+            set_committed_value(inserted, relationship.key, inserted_account)
+
+        # Other processes learn about taken name. Replicas may not have the user yet, so it is read from the primary.
+        await notify_invalidation(self.session, UserInvalidation(user_id=inserted.id, names=(inserted.name,)))
+        await self._commit()
+        _invalidate_names((inserted.name,))
+
+        return inserted
+
+    async def update(self, obj: User) -> User:
+        """
+        Tokens issued before disabling user or changing its scopes are revoked.
+
+        :raises AlreadyExists: user with updated name already exists.
+        """
+
+        if _is_auth_data_changed(obj):
+            obj.token_version += 1
+
+        names = _get_cached_names(obj)
+        try:
+            return await super().update(obj)
+        finally:
+            _invalidate_names(names)
+
+    async def delete(self, obj: User):
+        names = _get_cached_names(obj)
+        try:
+            await super().delete(obj)
+        finally:
+            _invalidate_names(names)
@@ -0,0 +1,89 @@
+"""
+Registry of scopes that assigns a bit to every known scope. Sets of scopes are compiled into integer masks once,
+so authorization check is a single AND instead of lookups over lists.
+
+Bits are assigned in order of the first use, so masks are valid only within the process and must not be stored.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from app.core.cache import TTLCache
+
+ADMIN_SCOPE = "admin"
+""" Admin has all scopes. """
+ALL_SCOPE = "all"
+""" Requests all scopes of the user. """
+
+
+@dataclass(frozen=True)
+class CompiledScopes:
+    names: tuple[str, ...]
+    mask: int
+
+
+class ScopeRegistry:
+    def __init__(self, parse_cache_size: int = 4096):
+        """
+        :param parse_cache_size: max number of cached parsed scopes strings.
+        """
+
+        self._bits: dict[str, int] = {}
+        self._parsed: TTLCache[str, CompiledScopes] = TTLCache(parse_cache_size, None)
+        self.admin_bit = self._register(ADMIN_SCOPE)
+
+    def _register(self, scope: str) -> int:
+        if (bit := self._bits.get(scope)) is None:
+            bit = 1 << len(self._bits)
+            self._bits[scope] = bit
+
+        return bit
+
+    def get_bit(self, scope: str) -> int:
+        """
+        :return: bit of the scope or 0 if scope is unknown (it is not held by anyone).
+        """
+        return self._bits.get(scope, 0)
+
+    def compile(self, scopes: Iterable[str]) -> int:
+        """
+        Unknown scopes are registered.
+        """
+
+        mask = 0
+        for scope in scopes:
+            mask |= self._register(scope)
+
+        return mask
+
+    def parse(self, scopes: str) -> CompiledScopes:
+        """
+        Compiles space separated scopes (as stored in tokens). Result is cached by string.
+        """
+
+        if (compiled := self._parsed.get(scopes)) is not None:
+            return compiled
+
+        names = tuple(scopes.split())
+        compiled = CompiledScopes(names, self.compile(names))
+        self._parsed.set(scopes, compiled)
+
+        return compiled
+
+    def is_admin(self, mask: int) -> bool:
+        return mask & self.admin_bit != 0
+
+    def is_permitted(self, mask: int, required_mask: int) -> bool:
+        """
+        :return: True if all required scopes are in mask or mask has admin scope.
+        """
+        return required_mask & ~mask == 0 or self.is_admin(mask)
+
+    def get_names(self, mask: int) -> list[str]:
+        return [scope for scope, bit in self._bits.items() if mask & bit]
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+
+scope_registry = ScopeRegistry()
@@ -6,6 +6,40 @@ from dataclasses import dataclass
 
 from app.core import exc
 from app.core.models import User
+from app.core.scopes import CompiledScopes, ALL_SCOPE, scope_registry
+
+
+@dataclass(frozen=True, kw_only=True)
+class UserAuthInfo:
+    """
+    Immutable snapshot of user data required for authentication/authorization.
+    Unlike User model it is not bound to DB session, so it can be cached and shared between requests.
+    """
+
+    id: int
+    name: str
+    is_disabled: bool
+    scopes: tuple[str, ...]
+    scopes_mask: int
+    token_version: int
+
+    @staticmethod
+    def from_user(user: User) -> "UserAuthInfo":
+        return UserAuthInfo(
+            id=user.id,
+            name=user.name,
+            is_disabled=user.is_disabled,
+            scopes=tuple(user.scopes),
+            scopes_mask=scope_registry.compile(user.scopes),
+            token_version=user.token_version
+        )
+
+
+def _get_scopes_mask(user: User | UserAuthInfo) -> int:
+    if isinstance(user, UserAuthInfo):
+        return user.scopes_mask
+
+    return scope_registry.compile(user.scopes)
 
 
 def get_valid_scopes(requested_scopes: list[str], user: User) -> list[str]:
@@ -18,39 +52,35 @@ def get_valid_scopes(requested_scopes: list[str], user: User) -> list[str]:
     :return: list of available scopes based on the requested ones.
     """
 
+    user_mask = _get_scopes_mask(user)
+
     # Admin has full access.
-    if "admin" in user.scopes:
+    if scope_registry.is_admin(user_mask):
         return requested_scopes
 
     # User is requesting all available scopes.
-    if "all" in requested_scopes:
-        return user.scopes
+    if ALL_SCOPE in requested_scopes:
+        return list(user.scopes)
 
-    # Extract only available scopes from the requested.
-    available_from_requested = []
-    for scope in requested_scopes:
-        if scope in user.scopes:
-            available_from_requested.append(scope)
+    # Extract only available scopes from the requested. Requested scopes are not registered,
+    # unknown ones have no bit and are not held by the user.
+    return [scope for scope in requested_scopes if scope_registry.get_bit(scope) & user_mask]
 
-    return available_from_requested
 
-
-def check_scopes_valid(scopes: list[str], user: User):
+def check_scopes_valid(scopes: CompiledScopes, user: User | UserAuthInfo):
     """
     Checks that requested scopes are valid for given user.
 
     :raises AccessDeniedError
     """
 
-    if "admin" in user.scopes:
-        return
-
-    for scope in scopes:
-        if scope not in user.scopes:
-            raise exc.AccessDenied(f"requested scope {scope}")
+    user_mask = _get_scopes_mask(user)
+    if not scope_registry.is_permitted(user_mask, scopes.mask):
+        missing = scope_registry.get_names(scopes.mask & ~user_mask)
+        raise exc.AccessDenied(f"requested scope {missing[0]}")
 
 
-def check_user_not_disabled(user: User):
+def check_user_not_disabled(user: User | UserAuthInfo):
     """
     Check that user is not disabled.
 
@@ -65,23 +95,23 @@ def check_user_not_disabled(user: User):
 class AuthenticatedUser:
     name: str
     scopes: list[str]
-    user: User
+    scopes_mask: int
+    user: UserAuthInfo
 
     def is_admin(self) -> bool:
-        return "admin" in self.scopes
+        return scope_registry.is_admin(self.scopes_mask)
 
     def is_permitted(self, scopes: list[str]) -> bool:
-        if self.is_admin():
-            return True
-
-        for scope in scopes:
-            if scope not in self.scopes:
-                return False
+        return self.is_permitted_mask(scope_registry.compile(scopes))
 
-        return True
+    def is_permitted_mask(self, required_mask: int) -> bool:
+        """
+        :param required_mask: scopes compiled with scope_registry.
+        """
+        return scope_registry.is_permitted(self.scopes_mask, required_mask)
 
     def authorize(self, scopes: list[str]):
-        if self.is_permitted(scopes):
+        if not self.is_permitted(scopes):
             raise exc.AccessDenied(f"action that requires scopes {', '.join(scopes)}")
 
 
@@ -0,0 +1,148 @@
+"""
+Write-behind of Telegram profiles updated on login.
+
+Profile data in Telegram token is applied on every login, but it rarely changes. Changed profiles are buffered
+and written periodically in one batched UPDATE, several changes of the same account are coalesced.
+Buffered changes are lost on process crash, they are applied again on the next login.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.repos import TelegramAccountRepo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class ProfileSyncStats:
+    pending: int = 0
+    buffered: int = 0
+    coalesced: int = 0
+    """ Changes merged with pending change of the same account. """
+    written: int = 0
+    flushes: int = 0
+    failed_flushes: int = 0
+
+
+class TelegramProfileSync:
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession], interval: float, max_pending: int):
+        """
+        :param interval: seconds between flushes.
+        :param max_pending: number of pending changes that triggers flush before interval ends.
+        """
+
+        self.session_maker = session_maker
+        self.interval = interval
+        self.max_pending = max_pending
+        self.stats = ProfileSyncStats()
+        self._pending: dict[int, dict] = {}
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def add(self, account_id: int, profile: dict):
+        """
+        Buffers new profile data of the account, it replaces pending data of the same account.
+        """
+
+        if account_id in self._pending:
+            self.stats.coalesced += 1
+
+        self._pending[account_id] = profile
+        self.stats.buffered += 1
+        self.stats.pending = len(self._pending)
+
+        if len(self._pending) >= self.max_pending:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """
+        Writes all pending changes. On failure they are returned to the buffer (unless newer ones were added).
+
+        :return: number of written accounts.
+        """
+
+        if not self._pending:
+            return 0
+
+        batch, self._pending = self._pending, {}
+
+        try:
+            async with self.session_maker() as session:
+                await TelegramAccountRepo(session, session).update_profiles(
+                    [{"id": account_id, **profile} for account_id, profile in batch.items()]
+                )
+        except Exception:
+            self.stats.failed_flushes += 1
+            for account_id, profile in batch.items():
+                self._pending.setdefault(account_id, profile)
+            raise
+        finally:
+            self.stats.pending = len(self._pending)
+
+        self.stats.flushes += 1
+        self.stats.written += len(batch)
+
+        return len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush Telegram profiles")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops periodic flushes and writes what is left.
+        """
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("%d Telegram profiles are not written on shutdown", len(self._pending))
+
+
+_profile_sync: TelegramProfileSync | None = None
+
+
+def start_tg_profile_sync(session_maker: async_sessionmaker[AsyncSession], interval: float, max_pending: int):
+    global _profile_sync
+
+    _profile_sync = TelegramProfileSync(session_maker, interval, max_pending)
+    _profile_sync.start()
+
+
+async def stop_tg_profile_sync():
+    global _profile_sync
+
+    if _profile_sync is not None:
+        await _profile_sync.stop()
+        _profile_sync = None
+
+
+def get_tg_profile_sync() -> TelegramProfileSync | None:
+    """
+    :return: write-behind buffer or None if profiles are written on login.
+    """
+    return _profile_sync
@@ -0,0 +1,110 @@
+"""
+Per-request breakdown of processing time by phases (spans) for the Server-Timing header and sampled logs.
+
+Spans are recorded only while request is timed (see ServerTimingMiddleware), otherwise span() is a no-op
+that costs one context variable lookup.
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+
+@dataclass(kw_only=True)
+class ServerTimingSettings:
+    """
+    Settings can be changed at runtime (by PUT /debug/server-timing) for the current process.
+    """
+
+    header: bool = False
+    """ Emit Server-Timing header. """
+    log_sample_rate: float = 0
+    """ Part of requests (0..1) which timings are logged. """
+
+    @property
+    def enabled(self) -> bool:
+        return self.header or self.log_sample_rate > 0
+
+
+_settings = ServerTimingSettings()
+
+
+def configure_server_timing(header: bool, log_sample_rate: float):
+    _settings.header = header
+    _settings.log_sample_rate = log_sample_rate
+
+
+def get_server_timing_settings() -> ServerTimingSettings:
+    return _settings
+
+
+class RequestTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        """ Total seconds by span name, repeated spans are summed up. """
+        self.counts: dict[str, int] = {}
+
+    def add(self, name: str, duration: float):
+        self.phases[name] = self.phases.get(name, 0) + duration
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def to_header(self) -> str:
+        entries = [f"{name};dur={duration * 1000:.3f}" for name, duration in self.phases.items()]
+        entries.append(f"app;dur={self.elapsed() * 1000:.3f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def start_request_timing() -> RequestTiming:
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def get_request_timing() -> RequestTiming | None:
+    return _current.get()
+
+
+class _Span:
+    __slots__ = ("name", "timing", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        if (timing := _current.get()) is not None:
+            self.timing = timing
+            self.start = time.perf_counter()
+        else:
+            self.timing = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.timing is not None:
+            self.timing.add(self.name, time.perf_counter() - self.start)
+
+
+def span(name: str) -> _Span:
+    """
+    Context manager adding time of its body to the current request timing.
+
+        with span("tg_token_decode"):
+            ...
+
+    :param name: Server-Timing metric name (token without spaces).
+    """
+    return _Span(name)
+
+
+def add_span(name: str, duration: float):
+    """
+    Add span measured elsewhere to the current request timing.
+    """
+
+    if (timing := _current.get()) is not None:
+        timing.add(name, duration)
@@ -0,0 +1,92 @@
+"""
+Token versions of users for stateless access tokens verification.
+Token is revoked if its version is lower than the current version of the user.
+"""
+
+import asyncio
+import logging
+import time
+
+from app import db
+from app.core.invalidation import UserInvalidation, add_invalidation_handler
+from app.core.repos import UserRepo
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVersions:
+    """
+    In-memory map of users token versions. Stores only users with revoked tokens (version > 0),
+    so it stays small and can be reloaded in bulk.
+    """
+
+    def __init__(self):
+        self._versions: dict[int, int] = {}
+        self._loaded_at: float | None = None
+
+    def get(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def set(self, user_id: int, version: int):
+        """
+        Set version known from the local change, so it is applied before the next reload.
+        """
+        self._versions[user_id] = max(version, self.get(user_id))
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at <= max_age
+
+    async def reload(self, user_repo: UserRepo):
+        self._versions = await user_repo.get_revoked_token_versions()
+        self._loaded_at = time.monotonic()
+
+
+_token_versions = TokenVersions()
+_refresher: asyncio.Task | None = None
+
+
+def _on_invalidation(invalidation: UserInvalidation):
+    # Revocation is applied without waiting for the next reload.
+    if invalidation.user_id is not None and invalidation.token_version is not None:
+        _token_versions.set(invalidation.user_id, invalidation.token_version)
+
+
+add_invalidation_handler(_on_invalidation, lambda: None)
+
+
+def get_token_versions() -> TokenVersions:
+    return _token_versions
+
+
+async def _reload():
+    async with db.AsyncSessionLocal() as session:
+        await _token_versions.reload(UserRepo(session))
+
+
+async def _run_refresher(interval: int):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await _reload()
+        except Exception:
+            # Stale map is detected by is_fresh(), so just try again later.
+            logger.exception("Failed to reload token versions")
+
+
+async def start_token_versions_refresher(interval: int):
+    """
+    Loads token versions and starts background task reloading them every interval seconds.
+    """
+
+    global _refresher
+
+    await _reload()
+    _refresher = asyncio.create_task(_run_refresher(interval))
+
+
+async def stop_token_versions_refresher():
+    global _refresher
+
+    if _refresher is not None:
+        _refresher.cancel()
+        _refresher = None
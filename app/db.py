@@ -1,19 +1,87 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import itertools
+import time
+from dataclasses import dataclass
+
+from fastapi import Depends
+from sqlalchemy import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import get_config
+from app.core.metrics import POOL_CHECKOUT_WAIT_SECONDS
+from app.query_stats import install_query_stats
 
 AsyncSessionLocal: async_sessionmaker[AsyncSession]
+_engine: AsyncEngine | None = None
 
+ReplicaSessionLocals: list[async_sessionmaker[AsyncSession]] = []
+_replica_engines: list[AsyncEngine] = []
+_replica_counter = itertools.count()
+
+
+@dataclass(kw_only=True)
+class PoolStats:
+    checkouts: int = 0
+    checkout_wait_total: float = 0
+    """ Total time in seconds spent waiting for a connection (new connections establishing included). """
+    checkout_wait_max: float = 0
+    timeouts: int = 0
+
+    size: int = 0
+    in_use: int = 0
+    idle: int = 0
+    overflow: int = 0
+
+
+_pool_stats = PoolStats()
+
+
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that measures time of waiting for a free connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _pool_stats.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            _pool_stats.checkouts += 1
+            _pool_stats.checkout_wait_total += wait
+            _pool_stats.checkout_wait_max = max(_pool_stats.checkout_wait_max, wait)
+            POOL_CHECKOUT_WAIT_SECONDS.observe(wait)
+
+
+def _create_engine(url: str, poolclass: type[AsyncAdaptedQueuePool]) -> AsyncEngine:
+    config = get_config().sqlalchemy
 
-def connect_to_db():
-    global AsyncSessionLocal
     engine = create_async_engine(
-        get_config().sqlalchemy.async_db_url,
+        url,
         echo=False,
-        future=True
+        future=True,
+        poolclass=poolclass,
+        pool_size=config.pool_size,
+        max_overflow=config.max_overflow,
+        pool_timeout=config.pool_timeout,
+        pool_recycle=config.pool_recycle,
+        pool_pre_ping=config.pool_pre_ping,
+        connect_args={
+            # asyncpg prepared statements cache per connection, 0 disables it (required behind pgbouncer).
+            "prepared_statement_cache_size": config.statement_cache_size
+        }
     )
+    install_query_stats(engine.sync_engine)
+
+    return engine
+
 
-    AsyncSessionLocal = async_sessionmaker(
+def _create_session_maker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
         autoflush=False,
         autocommit=False,
         expire_on_commit=False,
@@ -21,6 +89,92 @@ def connect_to_db():
     )
 
 
+def connect_to_db():
+    global AsyncSessionLocal, _engine, ReplicaSessionLocals, _replica_engines
+    config = get_config().sqlalchemy
+
+    _engine = _create_engine(config.async_db_url, _TimedQueuePool)
+    AsyncSessionLocal = _create_session_maker(_engine)
+
+    _replica_engines = [
+        _create_engine(url.strip(), AsyncAdaptedQueuePool) for url in config.replica_db_urls if url.strip()
+    ]
+    ReplicaSessionLocals = [_create_session_maker(engine) for engine in _replica_engines]
+
+
+async def disconnect_from_db():
+    """
+    Closes all pooled connections. Connections that are in use are closed when returned to the pool.
+    """
+
+    global _engine, _replica_engines, ReplicaSessionLocals
+
+    for engine in _replica_engines:
+        await engine.dispose()
+    _replica_engines = []
+    ReplicaSessionLocals = []
+
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+def get_pool_stats() -> PoolStats:
+    if _engine is not None:
+        pool = _engine.pool
+        _pool_stats.size = pool.size()
+        _pool_stats.in_use = pool.checkedout()
+        _pool_stats.idle = pool.checkedin()
+        _pool_stats.overflow = max(pool.overflow(), 0)
+
+    return _pool_stats
+
+
+def get_asyncpg_dsn() -> str:
+    """
+    DSN of the DB for direct asyncpg connections (without SQLAlchemy driver name).
+    """
+
+    url = make_url(get_config().sqlalchemy.async_db_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
 async def get_session() -> any:
+    """
+    Session of the primary DB. Use for writes and reads of data that was just written.
+    """
+
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def _choose_replica() -> async_sessionmaker[AsyncSession]:
+    if get_config().sqlalchemy.replica_balancing == "least_busy":
+        index = min(range(len(_replica_engines)), key=lambda i: _replica_engines[i].pool.checkedout())
+    else:
+        index = next(_replica_counter) % len(ReplicaSessionLocals)
+
+    return ReplicaSessionLocals[index]
+
+
+def get_read_session_maker() -> async_sessionmaker[AsyncSession]:
+    """
+    Session maker of one of the read replicas (primary DB if there are no replicas),
+    for sessions that are opened out of request dependencies.
+    """
+    return _choose_replica() if ReplicaSessionLocals else AsyncSessionLocal
+
+
+async def get_read_session(session: AsyncSession = Depends(get_session)) -> any:
+    """
+    Session of one of the read replicas. If there are no replicas, it is the primary session of the request,
+    so the request doesn't hold two primary connections.
+    Replicas may lag behind the primary, objects loaded with this session should not be modified.
+    """
+
+    if not ReplicaSessionLocals:
+        yield session
+        return
+
+    async with _choose_replica()() as replica_session:
+        yield replica_session
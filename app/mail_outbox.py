@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import aiosmtplib
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.config import Config
+from app.core.models import EmailOutboxMessage
+from app.core.repos import EmailOutboxRepo
+from app.mail_sender import MailSender, MailTransport
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class OutboxStats:
+    pending: int = 0
+    lag: float = 0
+    """ Age of the oldest pending message in seconds. """
+    sent: int = 0
+    failed_attempts: int = 0
+    dropped: int = 0
+    """ Messages with exhausted attempts. """
+
+
+class EmailOutboxWorker:
+    """
+    Drains email outbox in batches. Batch rows are locked with SKIP LOCKED,
+    so any number of workers (in app processes or standalone) can run at once.
+    """
+
+    def __init__(self,
+                 session_maker: async_sessionmaker[AsyncSession],
+                 transport: MailTransport,
+                 config: Config
+                 ):
+        self.session_maker = session_maker
+        self.transport = transport
+        self.mail_sender = MailSender(config)
+        self.config = config
+        self.stats = OutboxStats()
+        self._task: asyncio.Task | None = None
+
+    def _build_mail(self, message: EmailOutboxMessage) -> EmailMessage:
+        if message.kind == EmailOutboxMessage.KIND_VERIFICATION:
+            return self.mail_sender.build_verification_mail(message.email, message.token)
+        elif message.kind == EmailOutboxMessage.KIND_PASSWORD_UPDATE:
+            return self.mail_sender.build_password_update_mail(message.email, message.token)
+        else:
+            raise ValueError(f"unknown outbox message kind '{message.kind}'")
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        backoff = self.config.email_outbox.retry_backoff * 2 ** (attempts - 1)
+        return timedelta(seconds=min(backoff, self.config.email_outbox.max_retry_backoff))
+
+    async def _send(self, message: EmailOutboxMessage) -> Exception | None:
+        """
+        :return: error if message is not sent.
+        """
+
+        try:
+            await self.transport.send(self._build_mail(message))
+        except (aiosmtplib.SMTPException, OSError, ValueError) as e:
+            return e
+
+        return None
+
+    async def _apply_result(self, repo: EmailOutboxRepo, message: EmailOutboxMessage, error: Exception | None):
+        if error is not None:
+            message.attempts += 1
+            message.last_error = str(error)[:1024]
+            self.stats.failed_attempts += 1
+
+            if message.attempts >= self.config.email_outbox.max_attempts:
+                message.next_attempt_at = None
+                self.stats.dropped += 1
+                logger.error("Mail to %s is dropped after %d attempts", message.email, message.attempts)
+            else:
+                message.next_attempt_at = datetime.utcnow() + self._retry_delay(message.attempts)
+
+            return
+
+        await repo.session.delete(message)
+        self.stats.sent += 1
+
+    async def drain_batch(self) -> int:
+        """
+        Sends one batch of due messages.
+
+        :return: number of processed messages.
+        """
+
+        async with self.session_maker() as session:
+            async with session.begin():
+                repo = EmailOutboxRepo(session)
+                batch = await repo.lock_due_batch(self.config.email_outbox.batch_size)
+
+                # Sent concurrently over the pooled connections, session is used sequentially.
+                errors = await asyncio.gather(*(self._send(message) for message in batch))
+                for message, error in zip(batch, errors):
+                    await self._apply_result(repo, message, error)
+
+            self.stats.pending, oldest = await repo.get_pending_stats()
+            self.stats.lag = 0 if oldest is None else (datetime.utcnow() - oldest).total_seconds()
+
+        return len(batch)
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.drain_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to drain email outbox")
+                processed = 0
+
+            # Full batch means more messages are likely due.
+            if processed < self.config.email_outbox.batch_size:
+                await asyncio.sleep(self.config.email_outbox.poll_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_worker: EmailOutboxWorker | None = None
+
+
+def start_outbox_worker(session_maker: async_sessionmaker[AsyncSession], transport: MailTransport, config: Config):
+    global _worker
+
+    _worker = EmailOutboxWorker(session_maker, transport, config)
+    _worker.start()
+
+
+async def stop_outbox_worker():
+    global _worker
+
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
+
+
+def get_outbox_stats() -> OutboxStats | None:
+    """
+    :return: stats of the worker running in this process or None.
+    """
+    return None if _worker is None else _worker.stats
@@ -1,36 +1,251 @@
-import smtplib
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import AsyncIterator
 
-from app.config import Config
+import aiosmtplib
+from fastapi import Depends
 
+from app.config import Config, get_config
+from app.core import exc
 
-class MailSender:
-    def __init__(self, config: Config = Depends(get_env)):
-        self.env = env
-        self.server = smtplib.SMTP(host=self.env.SMTP_HOST, port=self.env.SMTP_PORT)
-        # self.server.login(self.env.SMTP_USER, self.env.SMTP_PASSWORD)
-
-    def send_verification_mail(self, email: str, token: str):
-        msg = MIMEMultipart()
-        msg["From"] = self.env.SMTP_FROM
-        msg["To"] = email
-        msg["Subject"] = "Account verification"
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class SMTPSettings:
+    host: str
+    port: int
+    user: str
+    password: str
+    tls: bool
+    timeout: float
+
+    @staticmethod
+    def from_config(config: Config) -> "SMTPSettings":
+        return SMTPSettings(
+            host=config.email.smtp_host,
+            port=config.email.smtp_port,
+            user=config.email.smtp_user,
+            password=config.email.smtp_password,
+            tls=config.email.smtp_tls,
+            timeout=config.email.smtp_timeout
+        )
+
+
+class SMTPConnection:
+    """
+    Persistent SMTP connection. It is (re)connected on demand.
+    """
+
+    def __init__(self, settings: SMTPSettings):
+        self.settings = settings
+        self._smtp: aiosmtplib.SMTP | None = None
+
+    async def _connect(self):
+        self._smtp = aiosmtplib.SMTP(
+            hostname=self.settings.host,
+            port=self.settings.port,
+            start_tls=self.settings.tls,
+            timeout=self.settings.timeout
+        )
+        await self._smtp.connect()
+
+        if self.settings.user:
+            await self._smtp.login(self.settings.user, self.settings.password)
+
+    async def send(self, message: EmailMessage):
+        """
+        Sends message, reconnects once if connection is lost.
+
+        :raises SMTPException: message is not sent.
+        """
+
+        if self._smtp is None or not self._smtp.is_connected:
+            await self._connect()
+
+        try:
+            await self._smtp.send_message(message)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+            # Server may close idle connection at any moment.
+            await self._connect()
+            await self._smtp.send_message(message)
+
+    async def close(self):
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException:
+                self._smtp.close()
+
+        self._smtp = None
+
+
+class SMTPConnectionPool:
+    def __init__(self, settings: SMTPSettings, size: int):
+        self._connections = [SMTPConnection(settings) for _ in range(size)]
+        self._idle: asyncio.Queue[SMTPConnection] = asyncio.Queue()
+
+        for connection in self._connections:
+            self._idle.put_nowait(connection)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[SMTPConnection]:
+        connection = await self._idle.get()
+        try:
+            yield connection
+        except Exception:
+            # Connection may be in broken state.
+            await connection.close()
+            raise
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def close(self):
+        for connection in self._connections:
+            await connection.close()
+
+
+@dataclass(kw_only=True)
+class MailTransportStats:
+    queued: int = 0
+    sent: int = 0
+    failed: int = 0
+
+
+class MailTransport:
+    """
+    Sends mails in background. Messages are put to the bounded in-memory queue and sent by workers,
+    each of them sends all queued messages over one pooled connection without reconnecting.
+    Queued messages are lost on process crash.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool, workers: int, queue_size: int):
+        self.pool = pool
+        self.stats = MailTransportStats()
+        self._queue: asyncio.Queue[EmailMessage] = asyncio.Queue(queue_size)
+        self._workers_count = workers
+        self._workers: list[asyncio.Task] = []
+
+    def enqueue(self, message: EmailMessage):
+        """
+        :raises Overloaded: send queue is full.
+        """
 
-        link = self.env.VERIFY_URL + "/" + token
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            raise exc.Overloaded("mail send queue")
 
-        message = f'<a href="{link}">Verify your account</a>'
-        msg.attach(MIMEText(message, "html"))
+        self.stats.queued = self._queue.qsize()
+
+    async def send(self, message: EmailMessage):
+        """
+        Sends message right away with pooled connection.
+
+        :raises SMTPException: message is not sent.
+        """
+
+        async with self.pool.connection() as connection:
+            await connection.send(message)
+
+    async def _send_queued(self, connection: SMTPConnection, message: EmailMessage):
+        try:
+            await connection.send(message)
+            self.stats.sent += 1
+        except Exception:
+            # Any error must not stop the worker, otherwise the queue is not drained anymore.
+            self.stats.failed += 1
+            logger.exception("Failed to send mail to %s", message["To"])
+        finally:
+            self._queue.task_done()
+            self.stats.queued = self._queue.qsize()
+
+    async def _work(self):
+        while True:
+            message = await self._queue.get()
+
+            async with self.pool.connection() as connection:
+                await self._send_queued(connection, message)
+
+                # Drain what is already queued over the same connection.
+                while not self._queue.empty():
+                    await self._send_queued(connection, self._queue.get_nowait())
+
+    def start(self):
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self._workers_count)]
+
+    async def stop(self, timeout: float):
+        """
+        Waits at most timeout seconds for queued messages to be sent, then stops workers.
+        """
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("%d queued mails are not sent on shutdown", self._queue.qsize())
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        await self.pool.close()
+
+
+_transport: MailTransport | None = None
+
+
+def start_mail_transport(config: Config):
+    """
+    Creates the transport of the process. Queue workers are not started: mails are sent by outbox worker
+    with MailTransport.send(), start them (MailTransport.start()) only if mails are enqueued.
+    """
+
+    global _transport
+
+    _transport = MailTransport(
+        SMTPConnectionPool(SMTPSettings.from_config(config), config.email.smtp_pool_size),
+        workers=config.email.smtp_pool_size,
+        queue_size=config.email.send_queue_size
+    )
+
+
+async def stop_mail_transport(timeout: float = 10):
+    global _transport
+
+    if _transport is not None:
+        await _transport.stop(timeout)
+        _transport = None
+
+
+def get_mail_transport() -> MailTransport:
+    return _transport
+
+
+class MailSender:
+    """
+    Builds mails. They are sent by outbox worker (see EmailService and mail_outbox).
+    """
 
-        self.server.sendmail(self.env.SMTP_FROM, email, msg.as_string())
+    def __init__(self, config: Config = Depends(get_config)):
+        self.config = config
 
-    def send_password_update_mail(self, email: str, token: str):
-        msg = MIMEMultipart()
-        msg["From"] = self.env.SMTP_FROM
+    def _build_mail(self, email: str, subject: str, html: str) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.config.email.smtp_from
         msg["To"] = email
-        msg["Subject"] = "Password changing"
+        msg["Subject"] = subject
+        msg.set_content(html, subtype="html")
 
-        link = self.env.PWD_UPDATE_URL + "/" + token
+        return msg
 
-        message = f'<a href="{link}">Change your password</a>'
-        msg.attach(MIMEText(message, "html"))
+    def build_verification_mail(self, email: str, token: str) -> EmailMessage:
+        link = self.config.email.verify_url + "/" + token
+        return self._build_mail(email, "Account verification", f'<a href="{link}">Verify your account</a>')
 
-        self.server.sendmail(self.env.SMTP_FROM, email, msg.as_string())
\ No newline at end of file
+    def build_password_update_mail(self, email: str, token: str) -> EmailMessage:
+        link = self.config.email.pwd_update_url + "/" + token
+        return self._build_mail(email, "Password changing", f'<a href="{link}">Change your password</a>')
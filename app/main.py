@@ -2,10 +2,27 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.config import load_config
+from app.config import load_config, get_config
 
-from app.api.endpoints import tg_router, tokens_router
-from app.db import connect_to_db
+from app.api.endpoints import tg_router, tokens_router, users_router, jwks_router, metrics_router, debug_router
+from app.api.middleware import MetricsMiddleware, ServerTimingMiddleware, QueryStatsMiddleware
+from app.core.crypto import (
+    init_password_hashing,
+    shutdown_password_hashing,
+    configure_jwt_cache,
+    configure_access_token_keys
+)
+from app.core.invalidation import start_invalidation_listener, stop_invalidation_listener
+from app.core.register import load_taken_names_filter
+from app.core.repos import configure_user_cache, configure_recent_changes
+from app.core.tg_profile_sync import start_tg_profile_sync, stop_tg_profile_sync
+from app.core.timing import configure_server_timing
+from app.core.token_versions import start_token_versions_refresher, stop_token_versions_refresher
+from app import db
+from app.db import connect_to_db, disconnect_from_db, get_asyncpg_dsn
+from app.mail_outbox import start_outbox_worker, stop_outbox_worker
+from app.mail_sender import start_mail_transport, stop_mail_transport, get_mail_transport
+from app.query_stats import configure_query_budget
 
 app = FastAPI()
 
@@ -16,9 +33,16 @@ app.add_middleware(
     allow_methods=['GET', 'POST', 'DELETE', 'PATCH'],
     allow_headers=['*'],
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(tg_router)
 app.include_router(tokens_router)
+app.include_router(users_router)
+app.include_router(jwks_router)
+app.include_router(metrics_router)
+app.include_router(debug_router)
 
 
 @app.on_event('startup')
@@ -27,10 +51,52 @@ async def startup():
     connect_to_db()
     # create_admin_if_not_exists()
 
+    config = get_config()
+    init_password_hashing(config.password_hashing.workers, config.password_hashing.max_concurrency)
+    configure_user_cache(config.user_cache.max_size, config.user_cache.ttl)
+    configure_recent_changes(
+        config.sqlalchemy.replica_recent_changes_size if db.ReplicaSessionLocals else 0,
+        config.sqlalchemy.replica_max_lag
+    )
+    configure_jwt_cache(config.jwt.cache_size)
+    configure_access_token_keys(config.oauth.access_token_algorithm, config.oauth.access_token_keys)
+    configure_server_timing(config.server_timing.header, config.server_timing.log_sample_rate)
+    configure_query_budget(
+        config.query_stats.budget,
+        config.query_stats.n_plus_one_threshold,
+        config.query_stats.log_sample_rate
+    )
+    await load_taken_names_filter(config.registration.name_filter_capacity, config.registration.name_filter_error_rate)
+    if config.email_outbox.run_in_app:
+        # Only outbox worker sends mails.
+        start_mail_transport(config)
+        start_outbox_worker(db.AsyncSessionLocal, get_mail_transport(), config)
+
+    if config.telegram.profile_sync_interval > 0:
+        start_tg_profile_sync(
+            db.AsyncSessionLocal,
+            config.telegram.profile_sync_interval / 1000,
+            config.telegram.profile_sync_max_pending
+        )
+
+    if config.invalidation.listen:
+        start_invalidation_listener(get_asyncpg_dsn(), config.invalidation.reconnect_interval)
+
+    if config.oauth.stateless_access_tokens:
+        await start_token_versions_refresher(config.oauth.token_versions_refresh_interval)
+
 
 @app.on_event('shutdown')
 async def shutdown():
-    ...
+    await stop_token_versions_refresher()
+    await stop_invalidation_listener()
+    await stop_outbox_worker()
+    await stop_tg_profile_sync()
+    await stop_mail_transport()
+    shutdown_password_hashing()
+
+    # Last, background tasks above may use connections.
+    await disconnect_from_db()
 
 
 if __name__ == "__main__":
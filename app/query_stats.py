@@ -0,0 +1,136 @@
+"""
+Counting of SQL statements and DB time per request via SQLAlchemy engine events.
+
+Statements are attached to the stats of the current request (see QueryStatsMiddleware) and to all
+recorders started by assert_max_queries() (for tests, including requests made by TestClient in other thread).
+Repeated statement text within one request is a sign of N+1 queries.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.timing import add_span
+
+_START_KEY = "query_stats_start"
+
+
+@dataclass(kw_only=True)
+class QueryBudget:
+    statements: int = 5
+    """ Requests executing more statements are logged. """
+    n_plus_one_threshold: int = 3
+    log_sample_rate: float = 0
+    """ Part of over budget requests (0..1) that are logged. """
+
+
+_budget = QueryBudget()
+
+
+def configure_query_budget(statements: int, n_plus_one_threshold: int, log_sample_rate: float):
+    _budget.statements = statements
+    _budget.n_plus_one_threshold = n_plus_one_threshold
+    _budget.log_sample_rate = log_sample_rate
+
+
+def get_query_budget() -> QueryBudget:
+    return _budget
+
+
+class QueryStats:
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        """ Total time of statements execution in seconds. """
+        self.by_statement: dict[str, int] = {}
+        """ Number of executions by statement text. """
+
+    def add(self, statement: str, duration: float):
+        self.statements += 1
+        self.duration += duration
+        self.by_statement[statement] = self.by_statement.get(statement, 0) + 1
+
+    def get_repeated(self, threshold: int) -> dict[str, int]:
+        """
+        :return: statements executed at least threshold times (likely N+1 queries).
+        """
+        return {statement: count for statement, count in self.by_statement.items() if count >= threshold}
+
+
+_request_stats: ContextVar[QueryStats | None] = ContextVar("request_query_stats", default=None)
+_recorders: list[QueryStats] = []
+
+
+def start_request_query_stats() -> QueryStats:
+    stats = QueryStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def get_request_query_stats() -> QueryStats | None:
+    return _request_stats.get()
+
+
+def _record(statement: str, duration: float):
+    if (stats := _request_stats.get()) is not None:
+        stats.add(statement, duration)
+
+    for recorder in _recorders:
+        recorder.add(statement, duration)
+
+    add_span("db", duration)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(statement, time.perf_counter() - conn.info[_START_KEY].pop())
+
+
+def _handle_error(exception_context):
+    # Failed statement is counted too, after_cursor_execute is not called for it.
+    if exception_context.connection is None or exception_context.statement is None:
+        return  # Not a statement execution (connection failure).
+
+    if starts := exception_context.connection.info.get(_START_KEY):
+        _record(exception_context.statement, time.perf_counter() - starts.pop())
+
+
+def install_query_stats(engine: Engine):
+    """
+    :param engine: sync engine (AsyncEngine.sync_engine for async one).
+    """
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def assert_max_queries(max_statements: int) -> Iterator[QueryStats]:
+    """
+    Fails if more than max_statements are executed by all engines in its body. For tests.
+
+        with assert_max_queries(2):
+            client.post("/tg/login", ...)
+
+    :raises AssertionError: too many statements executed, all of them are listed in the message.
+    """
+
+    stats = QueryStats()
+    _recorders.append(stats)
+    try:
+        yield stats
+    finally:
+        _recorders.remove(stats)
+
+    if stats.statements > max_statements:
+        executed = "\n".join(f"{count} x {statement}" for statement, count in stats.by_statement.items())
+        raise AssertionError(f"{stats.statements} statements executed, at most {max_statements} expected:\n{executed}")
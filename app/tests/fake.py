@@ -32,7 +32,8 @@ class ModelsProvider(BaseProvider):
             "name": self.generator.user_name(),
             "is_disabled": self.generator.pybool(),
             "scopes": self.generator.list_of(self.generator.word),
-            "registered_at": self.generator.date_time()
+            "registered_at": self.generator.date_time(),
+            "token_version": 0
         }
 
         return self._apply_specified_fields(fields, **kwargs)
@@ -1,17 +1,24 @@
+from copy import deepcopy
+
 from starlette.testclient import TestClient
 
 import app.config
 
+_base_config = app.config.Config()
 _config = app.config.Config()
 
 
-def override_config(client: TestClient):
+def override_config(client: TestClient, base_config: app.config.Config):
     """
     Overriding get_config() dependency for use of set_config() by tests.
 
-    If field is not set by set_config() then it is undefined.
+    If field is not set by set_config() then it has the value of base config (loaded from 'users.ini').
     """
 
+    global _base_config
+    _base_config = base_config
+    reset_config()
+
     def get_config():
         return _config
 
@@ -25,7 +32,7 @@ def reset_config():
 
     global _config
 
-    _config = app.config.Config()
+    _config = deepcopy(_base_config)
 
 
 def set_config(**kwargs):
@@ -1,4 +1,5 @@
 import pytest
+from anyio.from_thread import start_blocking_portal
 from starlette.testclient import TestClient
 
 from app.config import load_config, get_config
@@ -18,12 +19,14 @@ def client() -> TestClient:
     load_config()
     real_config = get_config()
 
-    override_config(client)
-
     configure_test_sqlalchemy_async_db(real_config)
+    override_config(client, real_config)
     init_sync_db(real_config)
 
-    return client
+    # Pooled asyncpg connections are bound to the event loop, all requests must run in the same one.
+    with start_blocking_portal(**client.async_backend) as portal:
+        client.portal = portal
+        yield client
 
 
 @pytest.fixture(autouse=True)
@@ -4,7 +4,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.config import Config
-from app.core.models import User, TelegramAuthData
+from app.core.models import User, TelegramAccount, EmailAccount, EmailOutboxMessage
 
 SessionLocal: sessionmaker[Session]
 
@@ -35,6 +35,8 @@ def get_sync_session() -> Session:
 
 def truncate_tables():
     session = get_sync_session()
-    session.query(TelegramAuthData).delete()
+    session.query(TelegramAccount).delete()
+    session.query(EmailAccount).delete()
+    session.query(EmailOutboxMessage).delete()
     session.query(User).delete()
     session.commit()
@@ -0,0 +1,64 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from starlette.testclient import TestClient
+
+from app import db
+from app.core.invalidation import InvalidationListener
+from app.core.models import User
+from app.core.repos import UserRepo, configure_user_cache
+from app.core.repos.user import get_user_cache
+from app.core.token_versions import TokenVersions, get_token_versions
+from app.db import get_asyncpg_dsn
+
+
+@pytest.fixture()
+def user_cache():
+    configure_user_cache(10, 10)
+    yield
+    configure_user_cache(0, 0)
+
+
+@pytest.fixture()
+def token_versions():
+    with patch("app.core.token_versions._token_versions", TokenVersions()):
+        yield
+
+
+async def _wait_for_eviction(timeout: float) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while len(get_user_cache()) > 0:
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def _disable_user_with_listener(user: User) -> bool:
+    listening = asyncio.Event()
+    with patch("app.core.invalidation.dispatch_reset", side_effect=listening.set):
+        listener = InvalidationListener(get_asyncpg_dsn(), 0.1)
+        listener.start()
+        try:
+            await asyncio.wait_for(listening.wait(), 5)
+
+            async with db.AsyncSessionLocal() as session:
+                repo = UserRepo(session, session)
+                assert not (await repo.get_auth_info_by_name(user.name)).is_disabled
+                assert len(get_user_cache()) == 1
+
+                db_user = await repo.get_by_name(user.name, primary=True)
+                db_user.is_disabled = True
+                # Cache of this process is not evicted directly, as if user was disabled by another process.
+                with patch("app.core.repos.user._get_cached_names", side_effect=[set(), {user.name}]):
+                    await repo.update(db_user)
+
+            return await _wait_for_eviction(5)
+        finally:
+            await listener.stop()
+
+
+def test_listener_evicts_disabled_user(client: TestClient, stub_user: User, user_cache, token_versions):
+    assert client.portal.call(_disable_user_with_listener, stub_user)
+    assert get_token_versions().get(stub_user.id) == 1
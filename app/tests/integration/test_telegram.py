@@ -6,10 +6,11 @@ from starlette.testclient import TestClient
 
 from .config import set_config
 from .utils import assert_all_users, create_model, rand_str, encode_access_token, update_scopes, with_session, \
-    get_stub_user, assert_user_json, assert_all_tg_auth_data
+    get_stub_user, assert_user_json, assert_all_tg_accounts
 
 from app.core.crypto import encode_jwt
-from app.core.models import User, TelegramAuthData
+from app.core.models import User, TelegramAccount
+from app.query_stats import assert_max_queries
 
 
 @pytest.fixture(autouse=True)
@@ -38,33 +39,42 @@ def encode_tg_token(tg_user_id: str, profile_data: dict) -> str:
     return encode_jwt(tg_user_id, "telegram_token_secret", 10000, extra_payload=profile_data)
 
 
-@pytest.fixture(scope="module")
-def tg_token(rand_tg_user_id: str) -> str:
-    return encode_jwt(rand_tg_user_id, "telegram_token_secret")
+@pytest.fixture()
+def rand_tg_user_id() -> str:
+    return rand_str()
+
+
+@pytest.fixture()
+def tg_token(rand_tg_user_id: str, tg_profile_data: dict) -> str:
+    return encode_tg_token(rand_tg_user_id, tg_profile_data)
 
 
 @pytest.fixture()
 def user_with_tg_auth(
         rand_tg_user_id: str,
+        tg_profile_data: dict,
         stub_user: User
-) -> tuple[TelegramAuthData, User]:
-    tg_auth_entry = with_session(create_model, TelegramAuthData(
+) -> tuple[TelegramAccount, User]:
+    tg_account = with_session(create_model, TelegramAccount(
         tg_user_id=rand_tg_user_id,
+        **tg_profile_data,
         user_id=stub_user.id
     ))
-    return tg_auth_entry, stub_user
+    return tg_account, stub_user
 
 
 @pytest.fixture()
 def disabled_user_with_tg_auth(
         rand_tg_user_id: str,
+        tg_profile_data: dict,
         stub_disabled_user: User
-) -> tuple[TelegramAuthData, User]:
-    tg_auth_entry = with_session(create_model, TelegramAuthData(
+) -> tuple[TelegramAccount, User]:
+    tg_account = with_session(create_model, TelegramAccount(
         tg_user_id=rand_tg_user_id,
+        **tg_profile_data,
         user_id=stub_disabled_user.id
     ))
-    return tg_auth_entry, stub_disabled_user
+    return tg_account, stub_disabled_user
 
 
 def test_tg_register(
@@ -99,7 +109,7 @@ def test_tg_register(
         registered_at=datetime.utcnow()
     )])
 
-    assert_all_tg_auth_data([TelegramAuthData(
+    assert_all_tg_accounts([TelegramAccount(
         tg_user_id=tg_user_id,
         **tg_profile_data,
         user_id=resp.json()["id"]
@@ -127,13 +137,14 @@ def test_tg_register_with_invalid_token(
 def test_tg_register_existing_user(
         client: TestClient,
         stub_user: User,
+        tg_profile_data: dict,
         read_only
 ):
     resp = client.post(
         url="/tg/register",
         json={
             "name": stub_user.name,
-            "token": encode_tg_token(rand_str())
+            "token": encode_tg_token(rand_str(), tg_profile_data)
         }
     )
 
@@ -145,65 +156,75 @@ def test_tg_register_existing_user(
 
 def test_tg_register_existing_tg_user(
         client: TestClient,
-        user_with_tg_auth: User,
+        user_with_tg_auth: tuple[TelegramAccount, User],
         tg_token: str,
         read_only
 ):
     resp = client.post(
         url="/tg/register",
         json={
-            "name": user_with_tg_auth.name,
-            "token": encode_tg_token(user_with_tg_auth.telegram_auth.tg_user_id)
+            "name": rand_str(),
+            "token": tg_token
         }
     )
 
     assert resp.status_code == 400
     assert resp.json() == {
-        "detail": "User already exists"
+        "detail": "TelegramAccount already exists"
     }
 
+    # User inserted before the account conflict is rolled back.
+    assert_all_users([user_with_tg_auth[1]])
+
 
 def test_tg_login(
         client: TestClient,
-        user_with_tg_auth: User,
+        user_with_tg_auth: tuple[TelegramAccount, User],
+        tg_token: str,
         oauth_config
 ):
-    resp = client.post(
-        url="/tg/login",
-        json={
-            "scope": "scope1 scope2 admin",
-            "token": encode_tg_token(user_with_tg_auth.telegram_auth.tg_user_id)
-        }
-    )
+    tg_account, user = user_with_tg_auth
+
+    # Account with user, profile update if it is changed.
+    with assert_max_queries(2):
+        resp = client.post(
+            url="/tg/login",
+            json={
+                "scope": "scope1 scope2 admin",
+                "token": tg_token
+            }
+        )
 
     assert resp.status_code == 200
 
     access, refresh = resp.json()["access"], resp.json()["refresh"]
 
     # Check access token is ok.
-    resp = client.get(
-        url="/tokens/user",
-        headers=[("Authorization", "Bearer " + access)]
-    )
+    with assert_max_queries(1):
+        resp = client.get(
+            url="/tokens/user",
+            headers=[("Authorization", "Bearer " + access)]
+        )
 
     assert resp.status_code == 200
     assert resp.json() == {
-        "name": user_with_tg_auth.name,
+        "name": user.name,
         "scopes": ["scope1", "scope2"]
     }
 
     # Check refresh token is ok.
-    resp = client.post(
-        url="/tokens/refresh",
-        headers=[("Refresh-Token", refresh)]
-    )
+    with assert_max_queries(1):
+        resp = client.post(
+            url="/tokens/refresh",
+            headers=[("Refresh-Token", refresh)]
+        )
 
     assert resp.status_code == 200
 
 
 def test_tg_login_with_invalid_token(
         client: TestClient,
-        user_with_tg_auth: User,
+        user_with_tg_auth: tuple[TelegramAccount, User],
         oauth_config,
         read_only
 ):
@@ -223,22 +244,22 @@ def test_tg_login_with_invalid_token(
 
 def test_tg_login_disabled_user(
         client: TestClient,
-        disabled_user_with_tg_auth: User,
+        disabled_user_with_tg_auth: tuple[TelegramAccount, User],
+        tg_token: str,
         oauth_config,
         read_only
 ):
-    tg_auth = disabled_user_with_tg_auth.telegram_auth
     resp = client.post(
         url="/tg/login",
         json={
             "scope": "scope1 scope2",
-            "token": encode_tg_token(tg_auth.tg_user_id)
+            "token": tg_token
         }
     )
 
     assert resp.status_code == 403
     assert resp.json() == {
-        "detail": "User is not permitted"
+        "detail": "Access denied for disabled user"
     }
 
 
@@ -246,6 +267,7 @@ def test_tg_add_to_user(
         client: TestClient,
         stub_user: User,
         rand_tg_user_id: str,
+        tg_profile_data: dict,
         tg_token: str,
         oauth_config
 ):
@@ -264,8 +286,9 @@ def test_tg_add_to_user(
 
     assert_all_users([stub_user])
 
-    assert_all_tg_auth_data([TelegramAuthData(
+    assert_all_tg_accounts([TelegramAccount(
         tg_user_id=rand_tg_user_id,
+        **tg_profile_data,
         user_id=stub_user.id
     )])
 
@@ -295,13 +318,13 @@ def test_tg_add_to_user_with_invalid_scopes(
 
 def test_tg_add_already_attached(
         client: TestClient,
-        user_with_tg_auth,
+        user_with_tg_auth: tuple[TelegramAccount, User],
         tg_token: str,
-        oauth_config,
-        read_only
+        oauth_config
 ):
-    access_token = encode_access_token(user_with_tg_auth[1].name, "users:tg:add")
-    with_session(update_scopes, user_with_tg_auth[1], ["users:tg:add"])
+    tg_account, user = user_with_tg_auth
+    access_token = encode_access_token(user.name, "users:tg:add")
+    with_session(update_scopes, user, ["users:tg:add"])
 
     resp = client.post(
         url="/tg/add",
@@ -319,10 +342,9 @@ def test_tg_add_already_attached(
 
 def test_tg_add_already_attached_to_another_user(
         client: TestClient,
-        user_with_tg_auth,
+        user_with_tg_auth: tuple[TelegramAccount, User],
         tg_token: str,
-        oauth_config,
-        read_only
+        oauth_config
 ):
     # Create another stub user without Telegram auth.
     stub_user2 = with_session(create_model, get_stub_user(scopes=["users:tg:add"]))
@@ -341,3 +363,23 @@ def test_tg_add_already_attached_to_another_user(
     assert resp.json() == {
         "detail": "Telegram user already attached"
     }
+
+
+def test_tg_get_account(
+        client: TestClient,
+        user_with_tg_auth: tuple[TelegramAccount, User],
+        oauth_config,
+        read_only
+):
+    tg_account, user = user_with_tg_auth
+    access_token = encode_access_token(user.name, "")
+
+    # Authenticated user, account.
+    with assert_max_queries(2):
+        resp = client.get(
+            url="/tg/account",
+            headers=[("Authorization", "Bearer " + access_token)]
+        )
+
+    assert resp.status_code == 200
+    assert resp.json()["tg_user_id"] == tg_account.tg_user_id
@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 from dateutil.parser import parse
 from sqlalchemy.orm import Session
 
-from app.core.models import User, TelegramAuthData
+from app.core.models import User, TelegramAccount
 from app.core.crypto import encode_jwt
 from app.tests.integration.sync_db import get_sync_session
 
@@ -28,7 +28,7 @@ def _model_to_dic(model) -> dict:
     return dic
 
 
-def assert_tg_auth_data(result: TelegramAuthData, expected: TelegramAuthData):
+def assert_tg_account(result: TelegramAccount, expected: TelegramAccount):
     res_dic = _model_to_dic(result)
     exp_dic = _model_to_dic(expected)
 
@@ -41,12 +41,16 @@ def assert_user(result: User, expected: User):
 
     datetime_soft_assert(result.registered_at, result.registered_at)
 
-    _del_if_exists(res_dic, "telegram_auth")
-    _del_if_exists(exp_dic, "telegram_auth")
+    for relationship in ("telegram_account", "email_account"):
+        _del_if_exists(res_dic, relationship)
+        _del_if_exists(exp_dic, relationship)
 
     del res_dic["registered_at"]
     del exp_dic["registered_at"]
 
+    # Column default is applied only on insert.
+    exp_dic.setdefault("token_version", 0)
+
     assert res_dic == exp_dic
 
 
@@ -74,8 +78,8 @@ def assert_all_users(expected: list[User]):
     assert_all_models(User, assert_user, expected)
 
 
-def assert_all_tg_auth_data(expected: list[TelegramAuthData]):
-    assert_all_models(TelegramAuthData, assert_tg_auth_data, expected)
+def assert_all_tg_accounts(expected: list[TelegramAccount]):
+    assert_all_models(TelegramAccount, assert_tg_account, expected)
 
 
 def rand_str() -> str:
@@ -0,0 +1,105 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+from app.core import exc
+from app.core.auth_tokens import AuthTokensService
+from app.core.security import UserAuthInfo
+from app.core.token_versions import TokenVersions
+from .mocks import get_mock_config
+from ..fake import get_faker
+
+
+class TestStatelessAccessTokens(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.faker = get_faker()
+
+        self.config = get_mock_config(oauth={
+            "access_token_expire": 100,
+            "access_token_secret": self.faker.pystr(),
+            "refresh_token_expire": 100,
+            "refresh_token_secret": self.faker.pystr(),
+            "stateless_access_tokens": True,
+            "token_versions_refresh_interval": 5
+        })
+
+        self.user = self.faker.user_model()
+        self.user.id = 1
+        self.user.is_disabled = False
+
+        self.repo = Mock()
+        self.repo.get_auth_info_by_name = AsyncMock(return_value=UserAuthInfo.from_user(self.user))
+        self.repo.get_revoked_token_versions = AsyncMock(return_value={})
+
+        self.token_versions = TokenVersions()
+        await self.token_versions.reload(self.repo)
+
+        self.service = AuthTokensService(self.config, self.repo, self.token_versions, None)
+        self.tokens = self.service._encode_tokens(self.user, self.user.scopes)
+
+    async def test_user_from_claims(self):
+        auth_user = await self.service.get_auth_user_from_access_token(self.tokens.access)
+
+        self.assertEqual(auth_user.name, self.user.name)
+        self.assertEqual(auth_user.scopes, self.user.scopes)
+        self.assertEqual(auth_user.user.id, self.user.id)
+        self.repo.get_auth_info_by_name.assert_not_called()
+
+    async def test_revoked_token(self):
+        self.token_versions.set(self.user.id, 1)
+
+        with self.assertRaises(exc.AccessDenied):
+            await self.service.get_auth_user_from_access_token(self.tokens.access)
+
+    async def test_stale_token_versions(self):
+        self.token_versions = TokenVersions()  # Never loaded.
+        self.service = AuthTokensService(self.config, self.repo, self.token_versions, None)
+
+        auth_user = await self.service.get_auth_user_from_access_token(self.tokens.access)
+
+        self.assertEqual(auth_user.user.id, self.user.id)
+        self.repo.get_auth_info_by_name.assert_called_once_with(self.user.name)
+
+
+class TestIntrospectAccessTokens(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.faker = get_faker()
+
+        self.config = get_mock_config(oauth={
+            "access_token_expire": 100,
+            "access_token_secret": self.faker.pystr(),
+            "refresh_token_expire": 100,
+            "refresh_token_secret": self.faker.pystr(),
+            "stateless_access_tokens": False,
+            "token_versions_refresh_interval": 5
+        })
+
+        self.users = [self.faker.user_model() for _ in range(3)]
+        for i, user in enumerate(self.users):
+            user.id = i + 1
+            user.is_disabled = False
+
+        self.users[1].is_disabled = True
+
+        self.repo = Mock()
+        self.repo.get_auth_info_by_names = AsyncMock(return_value={
+            user.name: UserAuthInfo.from_user(user) for user in self.users[:2]
+        })
+
+        self.service = AuthTokensService(self.config, self.repo, TokenVersions(), None)
+
+    async def test_results_in_order(self):
+        tokens = [self.service._encode_tokens(user, user.scopes).access for user in self.users]
+        tokens.insert(1, "invalid")
+
+        results = await self.service.introspect_access_tokens(tokens)
+
+        self.assertEqual(results[0].name, self.users[0].name)
+        self.assertIsInstance(results[1], exc.InvalidAuthData)
+        self.assertIsInstance(results[2], exc.AccessDenied)  # Disabled.
+        self.assertIsInstance(results[3], exc.InvalidAuthData)  # Not found.
+
+        self.repo.get_auth_info_by_names.assert_called_once()
+        self.assertEqual(
+            sorted(self.repo.get_auth_info_by_names.call_args.args[0]),
+            sorted(user.name for user in self.users)
+        )
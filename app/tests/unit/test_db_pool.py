@@ -0,0 +1,77 @@
+import sqlite3
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, Mock
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from app import db
+from app.db import PoolStats, get_pool_stats
+
+
+class TestPoolStats(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.stats = patch.object(db, "_pool_stats", PoolStats()).start()
+        self.pool = db._TimedQueuePool(
+            lambda: sqlite3.connect(":memory:", check_same_thread=False),
+            pool_size=2,
+            max_overflow=1,
+            timeout=0.05
+        )
+        patch.object(db, "_engine", Mock(pool=self.pool)).start()
+        self.connections = []
+
+    async def asyncTearDown(self):
+        for connection in self.connections:
+            connection.close()
+        self.pool.dispose()
+        patch.stopall()
+
+    async def _checkout(self):
+        # Async pool waits for a connection only in greenlet, as it does under AsyncEngine.
+        self.connections.append(await greenlet_spawn(self.pool.connect))
+
+    async def test_checkouts_counted(self):
+        await self._checkout()
+        await self._checkout()
+
+        stats = get_pool_stats()
+        self.assertEqual(stats.checkouts, 2)
+        self.assertEqual(stats.timeouts, 0)
+        self.assertGreaterEqual(stats.checkout_wait_max, 0)
+        self.assertGreaterEqual(stats.checkout_wait_total, stats.checkout_wait_max)
+
+    async def test_usage(self):
+        for _ in range(3):
+            await self._checkout()
+
+        stats = get_pool_stats()
+        self.assertEqual(stats.size, 2)
+        self.assertEqual(stats.in_use, 3)
+        self.assertEqual(stats.idle, 0)
+        self.assertEqual(stats.overflow, 1)
+
+        self.connections.pop().close()
+
+        stats = get_pool_stats()
+        self.assertEqual(stats.in_use, 2)
+        self.assertEqual(stats.idle, 1)
+
+    async def test_timeout(self):
+        for _ in range(3):
+            await self._checkout()
+
+        with self.assertRaises(PoolTimeoutError):
+            await self._checkout()
+
+        stats = get_pool_stats()
+        self.assertEqual(stats.timeouts, 1)
+        self.assertEqual(stats.checkouts, 4)
+        # Waited for the whole pool timeout.
+        self.assertGreaterEqual(stats.checkout_wait_max, 0.05)
+
+    async def test_not_connected(self):
+        with patch.object(db, "_engine", None):
+            stats = get_pool_stats()
+
+        self.assertEqual((stats.size, stats.in_use, stats.idle, stats.overflow), (0, 0, 0, 0))
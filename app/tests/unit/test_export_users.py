@@ -0,0 +1,81 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from unittest import TestCase, skipUnless
+
+from app.core import models
+from app.tools.export_users import (
+    get_exported_columns,
+    get_export_path,
+    CsvChunkWriter,
+    NdjsonChunkWriter,
+    ParquetChunkWriter,
+    pyarrow
+)
+
+
+class TestExportUsers(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.columns = ["id", "name", "scopes"]
+        self.rows = [{"id": 1, "name": "a", "scopes": []}, {"id": 2, "name": "b", "scopes": ["x", "y"]}]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_password_hash_is_excluded(self):
+        columns = get_exported_columns(models.EmailAccount.__table__)
+
+        self.assertIn("email", columns)
+        self.assertNotIn("password_hash", columns)
+        self.assertNotIn("password_updated_with_token", columns)
+
+    def test_csv_gzip(self):
+        path = get_export_path(self.directory.name, "users", "csv", True)
+        writer = CsvChunkWriter(path, self.columns, True)
+        writer.write(self.rows[:1])
+        writer.write(self.rows[1:])
+        writer.close()
+
+        self.assertEqual(os.path.basename(path), "users.csv.gz")
+        with gzip.open(path, "rt", newline="") as file:
+            self.assertEqual(list(csv.reader(file)), [["id", "name", "scopes"], ["1", "a", ""], ["2", "b", "x y"]])
+
+    def test_ndjson(self):
+        path = get_export_path(self.directory.name, "users", "ndjson", False)
+        writer = NdjsonChunkWriter(path, self.columns, False)
+        writer.write(self.rows)
+        writer.close()
+
+        with open(path) as file:
+            self.assertEqual([json.loads(line) for line in file], self.rows)
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet_null_column_in_first_chunk(self):
+        rows = [
+            {"id": 1, "tg_user_id": "1", "tg_username": "a", "tg_first_name": "A", "tg_last_name": None,
+             "tg_photo_url": None, "user_id": 1},
+            {"id": 2, "tg_user_id": "2", "tg_username": "b", "tg_first_name": "B", "tg_last_name": "B",
+             "tg_photo_url": "https://t.me/b.jpg", "user_id": 2}
+        ]
+
+        path = get_export_path(self.directory.name, "telegram_auth", "parquet", True)
+        writer = ParquetChunkWriter.for_table(path, models.TelegramAccount.__table__, True)
+        writer.write(rows[:1])
+        writer.write(rows[1:])
+        writer.close()
+
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.schema.field("tg_last_name").type, pyarrow.string())
+        self.assertEqual(table.to_pylist(), rows)
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet_schema(self):
+        writer = ParquetChunkWriter.for_table(
+            os.path.join(self.directory.name, "users.parquet"), models.User.__table__, False
+        )
+
+        self.assertEqual(writer.schema.field("scopes").type, pyarrow.list_(pyarrow.string()))
+        self.assertEqual(writer.schema.field("registered_at").type, pyarrow.timestamp("us"))
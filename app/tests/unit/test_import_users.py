@@ -0,0 +1,37 @@
+import io
+from unittest import TestCase
+
+from app.tools.import_users import read_rows, to_record
+
+
+class TestImportUsersRecords(TestCase):
+    def test_csv(self):
+        file = io.StringIO(
+            "name,tg_user_id,tg_username,tg_first_name,tg_last_name,tg_photo_url,scopes\n"
+            "user,1,tg_user,First,,,\n"
+            "admin,2,tg_admin,First,Last,,admin user\n"
+        )
+
+        records = [to_record(row, ["user"]) for row in read_rows(file, "csv")]
+
+        self.assertEqual(records, [
+            ("user", "1", "tg_user", "First", None, None, ["user"]),
+            ("admin", "2", "tg_admin", "First", "Last", None, ["admin", "user"])
+        ])
+
+    def test_ndjson(self):
+        file = io.StringIO(
+            '{"name": "user", "tg_user_id": 1, "tg_username": "tg_user", "tg_first_name": "First", '
+            '"scopes": ["a", "b"]}\n'
+            '\n'
+        )
+
+        records = [to_record(row, []) for row in read_rows(file, "ndjson")]
+
+        self.assertEqual(records, [("user", "1", "tg_user", "First", None, None, ["a", "b"])])
+
+    def test_invalid(self):
+        self.assertIsNone(to_record({"name": "user", "tg_user_id": "1", "tg_username": "tg_user"}, []))
+        self.assertIsNone(to_record(
+            {"name": "@user", "tg_user_id": "1", "tg_username": "tg_user", "tg_first_name": "First"}, []
+        ))
@@ -0,0 +1,71 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.invalidation import dispatch_invalidation, dispatch_reset
+from app.core.repos import UserRepo, configure_user_cache
+from app.core.token_versions import TokenVersions, get_token_versions
+from ..fake import get_faker
+
+
+class TestUserInvalidation(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.faker = get_faker()
+        configure_user_cache(10, 10)
+
+        self.user = self.faker.user_model()
+        self.user.id = self.faker.pyint()
+        self.user.is_disabled = False
+        make_transient_to_detached(self.user)  # As if loaded from DB, so no changes are pending.
+
+        session = AsyncMock()
+        session.info = {}
+        self.repo = UserRepo(session)
+        self.repo.get_by_name = AsyncMock(return_value=self.user)
+
+        self.notify = patch("app.core.repos.base.notify_invalidation").start()
+        # Notifications update global token versions, they are restored by patch.stopall().
+        patch("app.core.token_versions._token_versions", TokenVersions()).start()
+
+    async def asyncTearDown(self):
+        patch.stopall()
+        configure_user_cache(0, 0)
+
+    async def test_update_notifies_other_processes(self):
+        self.user.is_disabled = True
+        await self.repo.update(self.user)
+
+        self.notify.assert_called_once()
+        invalidation = self.notify.call_args.args[1]
+
+        self.assertEqual(invalidation.user_id, self.user.id)
+        self.assertEqual(invalidation.names, (self.user.name,))
+        self.assertEqual(invalidation.token_version, 1)
+
+    async def test_update_without_cached_data_changes(self):
+        await self.repo.update(self.user)
+
+        self.notify.assert_not_called()
+
+    async def test_notification_evicts_cached_user(self):
+        await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.user.is_disabled = True
+        self.user.token_version = 1
+        dispatch_invalidation(
+            f'{{"user_id": {self.user.id}, "names": ["{self.user.name}"], "token_version": 1}}'
+        )
+
+        auth_info = await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.assertTrue(auth_info.is_disabled)
+        self.assertEqual(get_token_versions().get(self.user.id), 1)
+
+    async def test_reset_evicts_all_cached_users(self):
+        await self.repo.get_auth_info_by_name(self.user.name)
+
+        dispatch_reset()
+        await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.assertEqual(self.repo.get_by_name.call_count, 2)
@@ -0,0 +1,44 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import jwt
+
+from app.core import exc
+from app.core.crypto import encode_jwt, decode_jwt, configure_jwt_cache, get_jwt_cache_stats
+
+
+class TestDecodeJWTCache(TestCase):
+    def setUp(self):
+        configure_jwt_cache(10)
+        self.token = encode_jwt("sub", "secret", 100, {"field": "value"})
+        self.jwt_decode = patch("app.core.crypto.jwt.jwt.decode", side_effect=jwt.decode).start()
+
+    def tearDown(self):
+        patch.stopall()
+        configure_jwt_cache(0)
+
+    def test_verified_once(self):
+        first = decode_jwt(self.token, ["field"], "secret")
+        second = decode_jwt(self.token, ["field"], "secret")
+
+        self.assertEqual(first, second)
+        self.jwt_decode.assert_called_once()
+        self.assertEqual(get_jwt_cache_stats().hits, 1)
+
+    def test_payload_modification_does_not_affect_cache(self):
+        payload = decode_jwt(self.token, [], "secret")
+        del payload["sub"]
+
+        self.assertEqual(decode_jwt(self.token, [], "secret")["sub"], "sub")
+
+    def test_another_secret(self):
+        decode_jwt(self.token, [], "secret")
+
+        with self.assertRaises(exc.InvalidToken):
+            decode_jwt(self.token, [], "another secret")
+
+    def test_required_fields_checked_for_cached(self):
+        decode_jwt(self.token, [], "secret")
+
+        with self.assertRaises(exc.InvalidToken):
+            decode_jwt(self.token, ["missing"], "secret")
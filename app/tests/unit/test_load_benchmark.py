@@ -0,0 +1,51 @@
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import httpx
+
+from app.benchmarks.load import LoadTest, parse_mix, percentile
+from .mocks import get_mock_config
+
+
+class TestLoadHelpers(TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("login=3, user=1"), {"login": 3, "user": 1})
+
+        with self.assertRaises(AssertionError):
+            parse_mix("unknown=1")
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+
+class TestLoadTest(IsolatedAsyncioTestCase):
+    async def test_run(self):
+        requests = []
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            requests.append(request.url.path)
+            if request.url.path in ("/tg/login", "/tokens/refresh"):
+                return httpx.Response(200, json={"access": "access", "refresh": "refresh"})
+            if request.url.path == "/tg/register":
+                return httpx.Response(400, json={})
+            return httpx.Response(200, json={})
+
+        config = get_mock_config(
+            oauth={"access_token_expire": 60},
+            user_default={"scopes": []},
+            telegram={"token_secret": "secret"}
+        )
+        mix = {"user": 1, "register": 1}
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handle), base_url="http://test") as http:
+            load_test = LoadTest(http, config, "load_", ["token"], mix)
+            await load_test.run(concurrency=2, duration=0.05, warmup=0)
+
+        # Tokens are got by login (by each worker at most), then reused.
+        self.assertLessEqual(requests.count("/tg/login"), 2)
+        self.assertGreater(len(load_test.stats["user"].latencies), 0)
+        self.assertEqual(load_test.stats["register"].latencies, [])
+        self.assertGreater(load_test.stats["register"].errors[400], 0)
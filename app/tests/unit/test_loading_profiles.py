@@ -0,0 +1,33 @@
+from unittest import TestCase
+from unittest.mock import AsyncMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.repos import UserRepo, TelegramAccountRepo, LoadingProfile
+
+
+def _compile(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+class TestLoadingProfiles(TestCase):
+    def setUp(self):
+        self.user_repo = UserRepo(AsyncMock(), AsyncMock())
+        self.tg_repo = TelegramAccountRepo(AsyncMock(), AsyncMock())
+
+    def test_auth_minimal_selects_only_auth_columns(self):
+        sql = _compile(self.user_repo._select(LoadingProfile.AUTH_MINIMAL))
+
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("registered_at", sql)
+        self.assertIn("token_version", sql)
+
+    def test_full_joins_accounts(self):
+        sql = _compile(self.user_repo._select(LoadingProfile.FULL))
+
+        self.assertIn("JOIN telegram_auth", sql)
+        self.assertIn("JOIN email_auth", sql)
+
+    def test_account_profile_joins_user(self):
+        self.assertNotIn("JOIN", _compile(self.tg_repo._select(LoadingProfile.AUTH_MINIMAL)))
+        self.assertIn("JOIN users", _compile(self.tg_repo._select(LoadingProfile.PROFILE)))
@@ -0,0 +1,225 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, AsyncMock, Mock
+
+import aiosmtplib
+
+from app.core.models import EmailOutboxMessage
+from app.core.repos import EmailOutboxRepo, UnitOfWork
+from app.core.email import EmailService
+from app.mail_outbox import EmailOutboxWorker
+from app.tests.unit.mocks import get_mock_config
+
+
+class FakeOutbox:
+    """
+    Outbox table with row locks held until the end of the locking transaction.
+    """
+
+    def __init__(self):
+        self.rows: dict[int, EmailOutboxMessage] = {}
+        self.locked: set[int] = set()
+
+    def add(self, id_: int, created_ago: float = 0, next_attempt_in: float = 0, attempts: int = 0):
+        now = datetime.utcnow()
+        self.rows[id_] = EmailOutboxMessage(
+            id=id_,
+            kind=EmailOutboxMessage.KIND_VERIFICATION,
+            email=f"user{id_}@example.com",
+            token="token",
+            created_at=now - timedelta(seconds=created_ago),
+            attempts=attempts,
+            next_attempt_at=now + timedelta(seconds=next_attempt_in)
+        )
+
+
+class FakeSession:
+    def __init__(self, outbox: FakeOutbox):
+        self.outbox = outbox
+        self.held_locks: set[int] = set()
+
+    @asynccontextmanager
+    async def begin(self):
+        try:
+            yield
+        finally:
+            self.outbox.locked -= self.held_locks
+            self.held_locks = set()
+
+    async def delete(self, message: EmailOutboxMessage):
+        del self.outbox.rows[message.id]
+
+
+class FakeOutboxRepo:
+    def __init__(self, session: FakeSession):
+        self.session = session
+        self.outbox = session.outbox
+
+    async def lock_due_batch(self, limit: int) -> list[EmailOutboxMessage]:
+        now = datetime.utcnow()
+        batch = [
+            message for id_, message in sorted(self.outbox.rows.items())
+            if id_ not in self.outbox.locked and message.next_attempt_at is not None and message.next_attempt_at <= now
+        ][:limit]
+
+        ids = {message.id for message in batch}
+        self.outbox.locked |= ids
+        self.session.held_locks |= ids
+        return batch
+
+    async def get_pending_stats(self) -> tuple[int, datetime | None]:
+        pending = [message for message in self.outbox.rows.values() if message.next_attempt_at is not None]
+        return len(pending), min((message.created_at for message in pending), default=None)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.sent: list[str] = []
+        self.fail_for: set[str] = set()
+
+    async def send(self, message):
+        # Lets the other worker run while batch is being sent.
+        await asyncio.sleep(0.001)
+        if message["To"] in self.fail_for:
+            raise aiosmtplib.SMTPRecipientsRefused([])
+
+        self.sent.append(message["To"])
+
+
+class TestEmailOutboxWorker(IsolatedAsyncioTestCase):
+    def setUp(self):
+        patch("app.mail_outbox.EmailOutboxRepo", FakeOutboxRepo).start()
+
+        self.outbox = FakeOutbox()
+        self.transport = FakeTransport()
+        self.config = get_mock_config(
+            email={"smtp_from": "no-reply@localhost", "verify_url": "http://localhost/verify"},
+            email_outbox={
+                "batch_size": 3,
+                "poll_interval": 1,
+                "max_attempts": 3,
+                "retry_backoff": 10,
+                "max_retry_backoff": 15
+            }
+        )
+
+    def tearDown(self):
+        patch.stopall()
+
+    def _worker(self) -> EmailOutboxWorker:
+        @asynccontextmanager
+        async def session_maker():
+            yield FakeSession(self.outbox)
+
+        return EmailOutboxWorker(session_maker, self.transport, self.config)
+
+    async def test_batches(self):
+        for i in range(5):
+            self.outbox.add(i)
+        worker = self._worker()
+
+        self.assertEqual(await worker.drain_batch(), 3)
+        self.assertEqual(await worker.drain_batch(), 2)
+        self.assertEqual(await worker.drain_batch(), 0)
+
+        self.assertEqual(len(self.transport.sent), 5)
+        self.assertEqual(self.outbox.rows, {})
+        self.assertEqual(worker.stats.sent, 5)
+        self.assertEqual(self.outbox.locked, set())
+
+    async def test_locked_rows_skipped_by_other_workers(self):
+        for i in range(6):
+            self.outbox.add(i)
+
+        processed = await asyncio.gather(self._worker().drain_batch(), self._worker().drain_batch())
+
+        self.assertEqual(processed, [3, 3])
+        # Every message is sent once.
+        self.assertEqual(sorted(self.transport.sent), sorted(f"user{i}@example.com" for i in range(6)))
+
+    async def test_not_due_skipped(self):
+        self.outbox.add(1, next_attempt_in=60)
+
+        self.assertEqual(await self._worker().drain_batch(), 0)
+        self.assertEqual(self.transport.sent, [])
+
+    async def test_retry_backoff(self):
+        self.outbox.add(1)
+        self.transport.fail_for.add("user1@example.com")
+        worker = self._worker()
+
+        await worker.drain_batch()
+        message = self.outbox.rows[1]
+        self.assertEqual(message.attempts, 1)
+        self.assertAlmostEqual((message.next_attempt_at - datetime.utcnow()).total_seconds(), 10, delta=1)
+        self.assertIsNotNone(message.last_error)
+
+        # Due again, next delay is doubled and capped by max_retry_backoff.
+        message.next_attempt_at = datetime.utcnow()
+        await worker.drain_batch()
+        self.assertEqual(message.attempts, 2)
+        self.assertAlmostEqual((message.next_attempt_at - datetime.utcnow()).total_seconds(), 15, delta=1)
+        self.assertEqual(worker.stats.failed_attempts, 2)
+
+    async def test_dropped_after_max_attempts(self):
+        self.outbox.add(1, attempts=2)
+        self.outbox.add(2)
+        self.transport.fail_for.add("user1@example.com")
+        worker = self._worker()
+
+        with self.assertLogs("app.mail_outbox", "ERROR"):
+            await worker.drain_batch()
+
+        message = self.outbox.rows[1]
+        self.assertEqual(message.attempts, 3)
+        self.assertIsNone(message.next_attempt_at)
+        self.assertEqual(worker.stats.dropped, 1)
+
+        # Other messages of the batch are sent, dropped one is not pending anymore.
+        self.assertEqual(self.transport.sent, ["user2@example.com"])
+        self.assertEqual(worker.stats.pending, 0)
+        self.assertEqual(await worker.drain_batch(), 0)
+
+    async def test_lag_stats(self):
+        self.outbox.add(1, created_ago=30, next_attempt_in=60)
+        self.outbox.add(2, created_ago=5)
+        worker = self._worker()
+
+        await worker.drain_batch()
+
+        self.assertEqual(worker.stats.pending, 1)
+        self.assertAlmostEqual(worker.stats.lag, 30, delta=1)
+
+
+class TestEmailServiceOutbox(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.session = AsyncMock()
+        self.session.add = Mock()
+        self.session.info = {}
+
+        self.email_repo = AsyncMock()
+        self.email_repo.get_by_email_or_fail.return_value = Mock(email="user@example.com", is_verified=False)
+
+        config = get_mock_config(email={"verify_token_secret": "secret", "verify_token_expire": 60})
+        self.service = EmailService(EmailOutboxRepo(self.session), self.email_repo, UnitOfWork(self.session), config)
+
+    async def test_mail_committed_by_itself(self):
+        await self.service.request_verify_token("user@example.com")
+
+        message = self.session.add.call_args.args[0]
+        self.assertEqual(message.kind, EmailOutboxMessage.KIND_VERIFICATION)
+        self.session.commit.assert_awaited_once()
+
+    async def test_mail_written_in_caller_transaction(self):
+        with self.assertRaises(ValueError):
+            async with UnitOfWork(self.session):
+                await self.service.request_verify_token("user@example.com")
+                self.session.commit.assert_not_awaited()
+                raise ValueError()
+
+        # Caller's rollback discards the mail.
+        self.session.add.assert_called_once()
+        self.session.commit.assert_not_awaited()
+        self.session.rollback.assert_awaited_once()
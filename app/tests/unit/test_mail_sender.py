@@ -0,0 +1,195 @@
+import asyncio
+from email.message import EmailMessage
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import aiosmtplib
+
+from app.core import exc
+from app.mail_sender import SMTPSettings, SMTPConnection, SMTPConnectionPool, MailTransport
+
+
+class FakeSMTP:
+    """
+    aiosmtplib.SMTP replacement that records sent messages.
+    """
+
+    instances: list["FakeSMTP"] = []
+    fail_with: list[BaseException] = []
+    """ Errors raised by the next send_message() calls, one per call. """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.is_connected = False
+        self.logged_in = None
+        self.sent: list[EmailMessage] = []
+        FakeSMTP.instances.append(self)
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def login(self, user: str, password: str):
+        self.logged_in = user
+
+    async def send_message(self, message: EmailMessage):
+        if FakeSMTP.fail_with:
+            raise FakeSMTP.fail_with.pop(0)
+
+        # Lets other workers run, as the real network call does.
+        await asyncio.sleep(0)
+        self.sent.append(message)
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+def _settings(user: str = "") -> SMTPSettings:
+    return SMTPSettings(host="localhost", port=25, user=user, password="pwd", tls=False, timeout=5)
+
+
+def _message(i: int) -> EmailMessage:
+    message = EmailMessage()
+    message["To"] = f"user{i}@example.com"
+    message.set_content("text")
+    return message
+
+
+class SMTPTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        FakeSMTP.instances = []
+        FakeSMTP.fail_with = []
+        patch("app.mail_sender.aiosmtplib.SMTP", FakeSMTP).start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    @staticmethod
+    def sent() -> list[EmailMessage]:
+        return [message for smtp in FakeSMTP.instances for message in smtp.sent]
+
+
+class TestSMTPConnection(SMTPTestCase):
+    async def test_connection_reused(self):
+        connection = SMTPConnection(_settings(user="mailer"))
+
+        await connection.send(_message(1))
+        await connection.send(_message(2))
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].logged_in, "mailer")
+        self.assertEqual(len(self.sent()), 2)
+
+    async def test_reconnects_once_when_disconnected(self):
+        connection = SMTPConnection(_settings())
+        await connection.send(_message(1))
+
+        FakeSMTP.fail_with = [aiosmtplib.SMTPServerDisconnected("idle timeout")]
+        await connection.send(_message(2))
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(len(self.sent()), 2)
+
+        # Second failure in a row is not retried.
+        FakeSMTP.fail_with = [ConnectionError(), ConnectionError()]
+        with self.assertRaises(ConnectionError):
+            await connection.send(_message(3))
+
+    async def test_close(self):
+        connection = SMTPConnection(_settings())
+        await connection.send(_message(1))
+        smtp = FakeSMTP.instances[0]
+
+        await connection.close()
+
+        self.assertFalse(smtp.is_connected)
+
+        # Connected again on demand.
+        await connection.send(_message(2))
+        self.assertEqual(len(FakeSMTP.instances), 2)
+
+
+class TestSMTPConnectionPool(SMTPTestCase):
+    async def test_connections_limited_and_returned(self):
+        pool = SMTPConnectionPool(_settings(), 2)
+
+        async with pool.connection() as first, pool.connection() as second:
+            self.assertIsNot(first, second)
+
+            # No idle connections left.
+            with self.assertRaises(asyncio.TimeoutError):
+                async with asyncio.timeout(0.01):
+                    async with pool.connection():
+                        pass
+
+        async with pool.connection() as connection:
+            self.assertIn(connection, (first, second))
+
+    async def test_broken_connection_closed_and_returned(self):
+        pool = SMTPConnectionPool(_settings(), 1)
+
+        with self.assertRaises(aiosmtplib.SMTPException):
+            async with pool.connection() as connection:
+                await connection.send(_message(1))
+                raise aiosmtplib.SMTPException("broken")
+
+        self.assertFalse(FakeSMTP.instances[0].is_connected)
+
+        async with pool.connection() as same:
+            self.assertIs(same, connection)
+
+
+class TestMailTransport(SMTPTestCase):
+    async def asyncSetUp(self):
+        self.transport = MailTransport(SMTPConnectionPool(_settings(), 2), workers=2, queue_size=10)
+        self.transport.start()
+
+    async def asyncTearDown(self):
+        await self.transport.stop(timeout=1)
+
+    async def test_queued_mails_sent(self):
+        for i in range(5):
+            self.transport.enqueue(_message(i))
+
+        await asyncio.wait_for(self.transport._queue.join(), 1)
+
+        self.assertEqual(self.transport.stats.sent, 5)
+        self.assertEqual(self.transport.stats.queued, 0)
+        # Workers drain the queue over their connections without reconnecting.
+        self.assertLessEqual(len(FakeSMTP.instances), 2)
+
+    async def test_queue_full(self):
+        transport = MailTransport(SMTPConnectionPool(_settings(), 1), workers=1, queue_size=1)
+        transport.enqueue(_message(1))
+
+        with self.assertRaises(exc.Overloaded):
+            transport.enqueue(_message(2))
+
+    async def test_worker_survives_unexpected_error(self):
+        FakeSMTP.fail_with = [aiosmtplib.SMTPRecipientsRefused([]), RuntimeError("bug")]
+
+        with self.assertLogs("app.mail_sender", "ERROR") as logs:
+            for i in range(4):
+                self.transport.enqueue(_message(i))
+
+            await asyncio.wait_for(self.transport._queue.join(), 1)
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(self.transport.stats.failed, 2)
+        self.assertEqual(self.transport.stats.sent, 2)
+
+        # Queue is still drained.
+        self.transport.enqueue(_message(5))
+        await asyncio.wait_for(self.transport._queue.join(), 1)
+        self.assertEqual(self.transport.stats.sent, 3)
+
+    async def test_stop_drains_queue(self):
+        for i in range(3):
+            self.transport.enqueue(_message(i))
+
+        await self.transport.stop(timeout=1)
+
+        self.assertEqual(len(self.sent()), 3)
+        self.assertTrue(all(not smtp.is_connected for smtp in FakeSMTP.instances))
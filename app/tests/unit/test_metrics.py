@@ -0,0 +1,55 @@
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.middleware import MetricsMiddleware
+from app.core.metrics import Counter, Histogram, REQUEST_SECONDS, render_metrics, Registry
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        # Test metrics are not rendered by /metrics.
+        self.registry: Registry = []
+
+    def test_histogram(self):
+        histogram = Histogram(
+            "test_histogram_seconds", "Test", ("operation",), buckets=(0.1, 1), registry=self.registry
+        )
+        histogram.observe(0.1, "op")
+        histogram.observe(0.5, "op")
+        histogram.observe(5, "op")
+
+        lines = list(histogram.render())
+
+        self.assertIn('test_histogram_seconds_bucket{operation="op",le="0.1"} 1', lines)
+        self.assertIn('test_histogram_seconds_bucket{operation="op",le="1.0"} 2', lines)
+        self.assertIn('test_histogram_seconds_bucket{operation="op",le="+Inf"} 3', lines)
+        self.assertIn('test_histogram_seconds_count{operation="op"} 3', lines)
+        self.assertIn('test_histogram_seconds_sum{operation="op"} 5.6', lines)
+
+    def test_counter(self):
+        counter = Counter("test_outcomes_total", "Test", ("outcome",), registry=self.registry)
+        counter.inc("ok")
+        counter.inc("ok")
+
+        self.assertIn('test_outcomes_total{outcome="ok"} 2.0', render_metrics(self.registry))
+        self.assertNotIn("test_outcomes_total", render_metrics())
+
+
+class TestMetricsMiddleware(IsolatedAsyncioTestCase):
+    async def test_route_template_label(self):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/items/1")
+            await client.get("/items/2")
+            await client.get("/missing")
+
+        self.assertEqual(REQUEST_SECONDS.get_count("GET", "/items/{item_id}", "200"), 2)
+        self.assertEqual(REQUEST_SECONDS.get_count("GET", "unmatched", "404"), 1)
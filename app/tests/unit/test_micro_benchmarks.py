@@ -0,0 +1,47 @@
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.benchmarks.micro import get_cases, save_baseline, compare, run_cases
+from app.core.crypto import configure_jwt_cache, get_jwt_cache_size
+
+
+class TestMicroBenchmarks(TestCase):
+    def test_cases_run(self):
+        for name, func in get_cases().items():
+            with self.subTest(name):
+                func()
+
+    def test_jwt_cache_is_restored(self):
+        cache_sizes = []
+
+        def measure(func, repeat):
+            cache_sizes.append(get_jwt_cache_size())
+            return 1
+
+        configure_jwt_cache(100)
+        try:
+            with patch("app.benchmarks.micro.measure", measure), redirect_stdout(io.StringIO()):
+                run_cases("jwt.decode", repeat=1)
+
+            # Disabled only while measuring.
+            self.assertEqual(cache_sizes, [0, 0])
+            self.assertEqual(get_jwt_cache_size(), 100)
+        finally:
+            configure_jwt_cache(0)
+
+    def test_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "micro.json")
+            save_baseline({"fast": 100, "slow": 100}, path)
+
+            self.assertTrue(compare({"fast": 110, "slow": 100}, path, threshold=0.15))
+            self.assertFalse(compare({"fast": 100, "slow": 120}, path, threshold=0.15))
+
+            save_baseline({"slow": 120}, path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["results"], {"fast": 100, "slow": 120})
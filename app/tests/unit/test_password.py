@@ -0,0 +1,41 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from app.core.crypto import (
+    hash_password_async,
+    verify_password_async,
+    init_password_hashing,
+    shutdown_password_hashing,
+    get_password_hashing_stats
+)
+
+
+class TestAsyncPasswordHashing(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        init_password_hashing(workers=1, max_concurrency=1)
+
+    async def asyncTearDown(self):
+        shutdown_password_hashing()
+
+    async def test_hash_and_verify(self):
+        hash_ = await hash_password_async("password")
+
+        self.assertTrue(await verify_password_async("password", hash_))
+        self.assertFalse(await verify_password_async("wrong password", hash_))
+
+    async def test_concurrency_is_capped(self):
+        stats = get_password_hashing_stats()
+        completed = stats.completed
+
+        tasks = [asyncio.create_task(hash_password_async("password")) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        # Only one call is submitted to the pool, others are queued.
+        self.assertEqual(stats.running, 1)
+        self.assertEqual(stats.waiting, 2)
+
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(stats.running, 0)
+        self.assertEqual(stats.waiting, 0)
+        self.assertEqual(stats.completed, completed + 3)
@@ -0,0 +1,70 @@
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from app.api.middleware import QueryStatsMiddleware
+from app.query_stats import install_query_stats, assert_max_queries, configure_query_budget
+
+
+def _create_engine():
+    engine = create_engine("sqlite://")
+    install_query_stats(engine)
+    return engine
+
+
+class TestAssertMaxQueries(TestCase):
+    def setUp(self):
+        self.engine = _create_engine()
+
+    def test_within_budget(self):
+        with assert_max_queries(2) as stats:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT 2"))
+
+        self.assertEqual(stats.statements, 2)
+
+    def test_over_budget(self):
+        with self.assertRaises(AssertionError) as context:
+            with assert_max_queries(1):
+                with self.engine.connect() as connection:
+                    for i in range(3):
+                        connection.execute(text("SELECT :i"), {"i": i})
+
+        self.assertIn("3 x SELECT ?", str(context.exception))
+
+    def test_failed_statement_counted(self):
+        with assert_max_queries(1) as stats:
+            with self.engine.connect() as connection:
+                with self.assertRaises(Exception):
+                    connection.execute(text("SELECT * FROM missing"))
+
+        self.assertEqual(stats.statements, 1)
+
+
+class TestQueryStatsMiddleware(IsolatedAsyncioTestCase):
+    def tearDown(self):
+        configure_query_budget(5, 3, 0)
+
+    async def test_over_budget_logged(self):
+        configure_query_budget(2, 3, 1)
+        engine = _create_engine()
+
+        app = FastAPI()
+        app.add_middleware(QueryStatsMiddleware)
+
+        @app.get("/users")
+        async def get_users():
+            with engine.connect() as connection:
+                for i in range(4):
+                    connection.execute(text("SELECT :i"), {"i": i})
+            return {}
+
+        with self.assertLogs("app.api.middleware") as logs:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                await client.get("/users")
+
+        self.assertIn('"statements": 4', logs.output[0])
+        self.assertIn('"SELECT ?": 4', logs.output[0])
@@ -0,0 +1,58 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import httpx
+from fastapi import FastAPI, Depends
+
+from app import db
+from app.db import get_session, get_read_session
+
+
+def _session_maker(name: str) -> MagicMock:
+    """
+    :return: session maker that counts opened sessions, sessions are named "<name><number>".
+    """
+
+    maker = MagicMock()
+
+    def open_session():
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=f"{name}{maker.call_count}")
+        context.__aexit__ = AsyncMock(return_value=False)
+        return context
+
+    maker.side_effect = open_session
+    return maker
+
+
+class TestGetReadSession(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.primary = patch.object(db, "AsyncSessionLocal", _session_maker("primary"), create=True).start()
+
+        self.app = FastAPI()
+
+        @self.app.get("/sessions")
+        async def sessions(session=Depends(get_session), read_session=Depends(get_read_session)):
+            return {"session": session, "read_session": read_session}
+
+    async def asyncTearDown(self):
+        patch.stopall()
+
+    async def _get_sessions(self) -> dict:
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/sessions")).json()
+
+    async def test_request_session_reused_without_replicas(self):
+        patch.object(db, "ReplicaSessionLocals", []).start()
+
+        self.assertEqual(await self._get_sessions(), {"session": "primary1", "read_session": "primary1"})
+        self.assertEqual(self.primary.call_count, 1)
+
+    async def test_replica_session(self):
+        replica = _session_maker("replica")
+        patch.object(db, "ReplicaSessionLocals", [replica]).start()
+        patch.object(db, "_choose_replica", return_value=replica).start()
+
+        self.assertEqual(await self._get_sessions(), {"session": "primary1", "read_session": "replica1"})
+        self.assertEqual(self.primary.call_count, 1)
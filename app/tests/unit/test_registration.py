@@ -0,0 +1,134 @@
+import asyncio
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.core import exc, register
+from app.core.bloom import BloomFilter
+from app.core.invalidation import dispatch_reset
+from app.core.register import RegistrationService
+from app.core.repos import UnitOfWork
+from app.core.repos.base import IN_UNIT_OF_WORK
+from .mocks import get_mock_config
+from ..fake import get_faker
+
+
+class TestBloomFilter(TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        names = [f"user{i}" for i in range(1000)]
+        for name in names:
+            bloom.add(name)
+
+        self.assertTrue(all(name in bloom for name in names))
+
+        false_positives = sum(f"other{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TestRegistrationService(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.faker = get_faker()
+        self.config = get_mock_config(user_default={"scopes": []})
+
+        self.user_repo = Mock()
+        self.user_repo.get_by_name = AsyncMock(return_value=None)
+        self.user_repo.insert_if_not_exists = AsyncMock(side_effect=lambda user: user)
+
+        self.strategy = Mock()
+        self.strategy.add_auth_account_to_user = AsyncMock(side_effect=lambda user, data: user)
+
+        self.session = AsyncMock()
+        self.session.info = {}
+
+        self.taken_names = BloomFilter(100, 0.01)
+        self.service = RegistrationService(self.config, self.user_repo, self.taken_names, UnitOfWork(self.session))
+
+    async def test_register(self):
+        name = self.faker.pystr()
+
+        user = await self.service.register(name, self.strategy, Mock())
+
+        self.assertEqual(user.name, name)
+        # Name is not in the filter, so it is not checked in DB.
+        self.user_repo.get_by_name.assert_not_called()
+        self.assertIn(name, self.taken_names)
+        self.session.commit.assert_awaited_once()
+
+    async def test_register_in_callers_unit_of_work(self):
+        async def insert_if_not_exists(user):
+            self.assertEqual(self.session.info[IN_UNIT_OF_WORK], 2)
+            return user
+
+        self.user_repo.insert_if_not_exists.side_effect = insert_if_not_exists
+
+        async with UnitOfWork(self.session):
+            await self.service.register(self.faker.pystr(), self.strategy, Mock())
+            self.session.commit.assert_not_awaited()
+
+        self.session.commit.assert_awaited_once()
+
+    async def test_taken_name_is_rejected_before_strategy(self):
+        name = self.faker.pystr()
+        self.taken_names.add(name)
+        self.user_repo.get_by_name.return_value = self.faker.user_model()
+
+        with self.assertRaises(exc.AlreadyExists):
+            await self.service.register(name, self.strategy, Mock())
+
+        self.strategy.add_auth_account_to_user.assert_not_called()
+        self.user_repo.insert_if_not_exists.assert_not_called()
+
+    async def test_name_taken_concurrently(self):
+        self.user_repo.insert_if_not_exists.side_effect = None
+        self.user_repo.insert_if_not_exists.return_value = None
+
+        with self.assertRaises(exc.AlreadyExists):
+            await self.service.register(self.faker.pystr(), self.strategy, Mock())
+
+        self.session.commit.assert_not_awaited()
+        self.session.rollback.assert_awaited_once()
+
+    async def test_name_not_in_filter_is_checked_in_db(self):
+        # Inserted by import tool or while notifications were missed.
+        self.user_repo.get_by_name.return_value = self.faker.user_model()
+
+        self.assertFalse(await self.service.is_name_available(self.faker.pystr()))
+        self.user_repo.get_by_name.assert_called_once()
+
+    async def test_available_name(self):
+        self.assertTrue(await self.service.is_name_available(self.faker.pystr()))
+
+
+class TestTakenNamesFilterReload(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.names = ["user1"]
+
+        async def stream_names(repo):
+            for name in self.names:
+                yield name
+
+        patch.object(register.db, "AsyncSessionLocal", Mock(return_value=AsyncMock()), create=True).start()
+        patch.object(register.UserRepo, "stream_names", stream_names).start()
+
+    async def asyncTearDown(self):
+        patch.stopall()
+        await register.load_taken_names_filter(0, 0.01)
+
+    async def test_reloaded_on_reset(self):
+        await register.load_taken_names_filter(100, 0.01)
+        self.assertIn("user1", register.get_taken_names_filter())
+
+        # Inserted while listener was reconnecting.
+        self.names.append("user2")
+        dispatch_reset()
+        await asyncio.sleep(0)
+
+        self.assertIn("user2", register.get_taken_names_filter())
+
+    async def test_disabled_filter_is_not_loaded_on_reset(self):
+        await register.load_taken_names_filter(0, 0.01)
+
+        dispatch_reset()
+        await asyncio.sleep(0)
+
+        self.assertIsNone(register.get_taken_names_filter())
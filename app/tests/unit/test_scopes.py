@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from app.core import exc
+from app.core.scopes import ScopeRegistry, scope_registry
+from app.core.security import UserAuthInfo, AuthenticatedUser, get_valid_scopes, check_scopes_valid
+
+
+def _auth_info(scopes: list[str]) -> UserAuthInfo:
+    return UserAuthInfo(
+        id=1,
+        name="user",
+        is_disabled=False,
+        scopes=tuple(scopes),
+        scopes_mask=scope_registry.compile(scopes),
+        token_version=0
+    )
+
+
+class TestScopeRegistry(TestCase):
+    def test_permitted(self):
+        registry = ScopeRegistry()
+        mask = registry.compile(["a", "b"])
+
+        self.assertTrue(registry.is_permitted(mask, registry.compile(["b"])))
+        self.assertTrue(registry.is_permitted(mask, 0))
+        self.assertFalse(registry.is_permitted(mask, registry.compile(["b", "c"])))
+        self.assertTrue(registry.is_permitted(registry.compile(["admin"]), registry.compile(["c"])))
+
+    def test_parse_is_cached(self):
+        registry = ScopeRegistry()
+
+        parsed = registry.parse("a  b")
+
+        self.assertEqual(parsed.names, ("a", "b"))
+        self.assertIs(registry.parse("a  b"), parsed)
+        self.assertEqual(registry.get_names(parsed.mask), ["a", "b"])
+
+
+class TestScopesSecurity(TestCase):
+    def test_get_valid_scopes(self):
+        user = _auth_info(["read", "write"])
+
+        self.assertEqual(get_valid_scopes(["write", "unknown scope"], user), ["write"])
+        self.assertEqual(get_valid_scopes(["all"], user), ["read", "write"])
+        self.assertEqual(get_valid_scopes(["anything"], _auth_info(["admin"])), ["anything"])
+        self.assertEqual(scope_registry.get_bit("unknown scope"), 0)
+
+    def test_check_scopes_valid(self):
+        user = _auth_info(["read"])
+
+        check_scopes_valid(scope_registry.parse("read"), user)
+        with self.assertRaises(exc.AccessDenied):
+            check_scopes_valid(scope_registry.parse("read write"), user)
+
+    def test_authenticated_user(self):
+        scopes = scope_registry.parse("read")
+        auth_user = AuthenticatedUser(
+            name="user",
+            scopes=list(scopes.names),
+            scopes_mask=scopes.mask,
+            user=_auth_info(["read"])
+        )
+
+        self.assertTrue(auth_user.is_permitted(["read"]))
+        self.assertFalse(auth_user.is_permitted(["read", "write"]))
+        with self.assertRaises(exc.AccessDenied):
+            auth_user.authorize(["write"])
@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt import PyJWKSet
+
+from app.core import exc
+from app.core.crypto import encode_jwt, decode_jwt, SigningKey, KeyRing
+
+
+class TestKeyRing(TestCase):
+    def setUp(self):
+        self.old_key = SigningKey.from_private_key("EdDSA", ed25519.Ed25519PrivateKey.generate())
+        self.new_key = SigningKey.from_private_key("EdDSA", ed25519.Ed25519PrivateKey.generate())
+        self.ring = KeyRing([self.new_key, self.old_key])
+
+    def test_signed_by_active_key(self):
+        token = encode_jwt("sub", self.ring, 100)
+
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], self.new_key.kid)
+        self.assertEqual(decode_jwt(token, [], self.ring)["sub"], "sub")
+
+    def test_rotated_key_verifies(self):
+        token = encode_jwt("sub", KeyRing([self.old_key]), 100)
+
+        self.assertEqual(decode_jwt(token, [], self.ring)["sub"], "sub")
+
+    def test_unknown_kid(self):
+        token = encode_jwt("sub", self.ring, 100)
+
+        with self.assertRaises(exc.InvalidToken):
+            decode_jwt(token, [], KeyRing([self.old_key]))
+
+    def test_shared_secret_token_rejected(self):
+        token = encode_jwt("sub", "secret", 100)
+
+        with self.assertRaises(exc.InvalidToken):
+            decode_jwt(token, [], self.ring)
+
+    def test_jwks_verifies_offline(self):
+        ring = KeyRing([SigningKey.from_private_key("ES256", ec.generate_private_key(ec.SECP256R1())), self.old_key])
+        token = encode_jwt("sub", ring, 100)
+
+        jwks = PyJWKSet.from_json(ring.jwks_json.decode())
+        key = jwks[jwt.get_unverified_header(token)["kid"]]
+
+        self.assertEqual(jwt.decode(token, key.key, ["ES256"])["sub"], "sub")
+
+    def test_key_must_match_algorithm(self):
+        with self.assertRaises(ValueError):
+            SigningKey.from_private_key("ES256", ed25519.Ed25519PrivateKey.generate())
@@ -5,6 +5,7 @@ from unittest.mock import patch, Mock, AsyncMock
 from app.core import exc
 from app.core.auth_strategies import TelegramAuthStrategy, TelegramAddAccountData, TelegramCredentials
 from app.core.models import TelegramAccount
+from app.core.repos import LoadingProfile
 from .mocks import get_mock_config
 from ..fake import get_faker
 from ..utils import assert_user_eq, assert_tg_account_eq, tg_token_payload_from_data
@@ -19,7 +20,7 @@ class TestTelegramAuthStrategy(IsolatedAsyncioTestCase):
         self.repo = Mock()
 
         # Strategy.
-        self.strategy = TelegramAuthStrategy(self.repo, self.config)
+        self.strategy = TelegramAuthStrategy(self.repo, self.config, None)
 
         # Fake data.
         self.account_data = self.faker.tg_account_data()
@@ -54,7 +55,7 @@ class TestTelegramAuthStrategy(IsolatedAsyncioTestCase):
     async def test_add_account(self):
         self.set_decode_jwt_patch_normal()
 
-        result = self.strategy.add_auth_account_to_user(
+        result = await self.strategy.add_auth_account_to_user(
             copy(self.user),
             TelegramAddAccountData(token=self.token)
         )
@@ -67,7 +68,7 @@ class TestTelegramAuthStrategy(IsolatedAsyncioTestCase):
         self.set_decode_jwt_patch_raises()
 
         with self.assertRaises(exc.InvalidAuthData):
-            self.strategy.add_auth_account_to_user(
+            await self.strategy.add_auth_account_to_user(
                 self.user,
                 TelegramAddAccountData(token=self.token)
             )
@@ -84,13 +85,16 @@ class TestTelegramAuthStrategy(IsolatedAsyncioTestCase):
 
     async def test_login_for_non_existing_user(self):
         self.set_decode_jwt_patch_normal()
-        self.repo.get_by_tg_user_id = AsyncMock(return_value=None)
+        self.repo.get_current_by_tg_user_id = AsyncMock(return_value=None)
 
         with self.assertRaises(exc.InvalidAuthData):
             await self.strategy.login_for_user(TelegramCredentials(token=self.token))
 
         self.assert_decode_jwt_called_once(self.token)
-        self.repo.get_by_tg_user_id.assert_called_once_with(self.account_data["tg_user_id"])
+        self.repo.get_current_by_tg_user_id.assert_called_once_with(
+            self.account_data["tg_user_id"],
+            profile=LoadingProfile.PROFILE
+        )
 
     async def test_login(self):
         self.set_decode_jwt_patch_normal()
@@ -100,8 +104,8 @@ class TestTelegramAuthStrategy(IsolatedAsyncioTestCase):
             user=self.user
         )
 
-        self.repo.get_by_tg_user_id = AsyncMock(return_value=account)
-        self.repo.update = AsyncMock(side_effect=lambda v: v)
+        self.repo.get_current_by_tg_user_id = AsyncMock(return_value=account)
+        self.repo.update_profiles = AsyncMock()
 
         result = await self.strategy.login_for_user(TelegramCredentials(token=self.token))
 
@@ -109,5 +113,36 @@ class TestTelegramAuthStrategy(IsolatedAsyncioTestCase):
         assert_tg_account_eq(result.telegram_account, account)
 
         self.assert_decode_jwt_called_once(self.token)
-        self.repo.get_by_tg_user_id.assert_called_once_with(self.account_data["tg_user_id"])
-        self.repo.update.assert_called_once_with(account)
+        self.repo.get_current_by_tg_user_id.assert_called_once_with(
+            self.account_data["tg_user_id"],
+            profile=LoadingProfile.PROFILE
+        )
+        # Profile is not changed.
+        self.repo.update_profiles.assert_not_called()
+
+    async def test_login_with_changed_profile(self):
+        # Strategy modifies decoded payload, login is done twice.
+        self.decode_jwt.side_effect = lambda *args: copy(self.token_data)
+
+        account = TelegramAccount(
+            **{**self.account_data, "tg_username": self.faker.pystr()},
+            user=self.user
+        )
+        account.id = 1
+
+        self.repo.get_current_by_tg_user_id = AsyncMock(return_value=account)
+        self.repo.update_profiles = AsyncMock()
+
+        await self.strategy.login_for_user(TelegramCredentials(token=self.token))
+
+        profile = {key: value for key, value in self.account_data.items() if key != "tg_user_id"}
+        self.repo.update_profiles.assert_called_once_with([{"id": 1, **profile}])
+
+        # Write-behind.
+        self.repo.update_profiles.reset_mock()
+        self.strategy.profile_sync = Mock()
+
+        await self.strategy.login_for_user(TelegramCredentials(token=self.token))
+
+        self.strategy.profile_sync.add.assert_called_once_with(1, profile)
+        self.repo.update_profiles.assert_not_called()
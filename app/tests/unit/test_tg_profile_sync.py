@@ -0,0 +1,50 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.core.tg_profile_sync import TelegramProfileSync
+
+
+class TestTelegramProfileSync(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.session_maker = MagicMock()
+        self.session_maker.return_value.__aenter__ = AsyncMock()
+        self.session_maker.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        self.repo_class = patch("app.core.tg_profile_sync.TelegramAccountRepo").start()
+        self.repo = self.repo_class.return_value
+        self.repo.update_profiles = AsyncMock()
+
+        self.sync = TelegramProfileSync(self.session_maker, 1, 10)
+
+    async def asyncTearDown(self):
+        patch.stopall()
+
+    async def test_coalesced(self):
+        self.sync.add(1, {"tg_username": "a"})
+        self.sync.add(2, {"tg_username": "b"})
+        self.sync.add(1, {"tg_username": "c"})
+
+        self.assertEqual(await self.sync.flush(), 2)
+        self.repo.update_profiles.assert_called_once_with([
+            {"id": 1, "tg_username": "c"},
+            {"id": 2, "tg_username": "b"}
+        ])
+        self.assertEqual(self.sync.stats.coalesced, 1)
+
+        session = self.session_maker.return_value.__aenter__.return_value
+        self.repo_class.assert_called_once_with(session, session)
+
+        # Nothing is left.
+        self.assertEqual(await self.sync.flush(), 0)
+        self.repo.update_profiles.assert_called_once()
+
+    async def test_failed_flush_keeps_changes(self):
+        self.repo.update_profiles.side_effect = ConnectionError()
+        self.sync.add(1, {"tg_username": "a"})
+
+        with self.assertRaises(ConnectionError):
+            await self.sync.flush()
+
+        self.repo.update_profiles.side_effect = None
+        self.assertEqual(await self.sync.flush(), 1)
+        self.assertEqual(self.sync.stats.failed_flushes, 1)
@@ -0,0 +1,73 @@
+import asyncio
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import Mock
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.middleware import ServerTimingMiddleware
+from app.core.repos.base import BaseRepo
+from app.core.timing import span, configure_server_timing, get_request_timing
+
+
+class _Repo(BaseRepo):
+    def __init__(self):
+        super().__init__(Mock(), Mock())
+
+    async def get_something(self):
+        await asyncio.sleep(0)
+        return await self.get_nested()
+
+    async def get_nested(self):
+        return 1
+
+
+class TestSpan(TestCase):
+    def test_noop_without_request(self):
+        with span("phase"):
+            pass
+
+        self.assertIsNone(get_request_timing())
+
+
+class TestServerTimingMiddleware(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.app = FastAPI()
+        self.app.add_middleware(ServerTimingMiddleware)
+
+        @self.app.get("/login")
+        async def login():
+            with span("token_decode"):
+                pass
+            await _Repo().get_something()
+            return {}
+
+    def tearDown(self):
+        configure_server_timing(False, 0)
+
+    async def _get_login(self) -> httpx.Response:
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/login")
+
+    async def test_header(self):
+        configure_server_timing(True, 0)
+
+        header = (await self._get_login()).headers["Server-Timing"]
+        names = [entry.split(";")[0] for entry in header.split(", ")]
+
+        # Nested repo call is a part of the outer one.
+        self.assertEqual(names, ["token_decode", "_Repo.get_something", "app"])
+
+    async def test_disabled(self):
+        self.assertNotIn("Server-Timing", (await self._get_login()).headers)
+
+    async def test_sampled_log(self):
+        configure_server_timing(False, 1)
+
+        # Default level of not configured loggers.
+        with self.assertLogs("app.api.middleware", "WARNING") as logs:
+            response = await self._get_login()
+
+        self.assertNotIn("Server-Timing", response.headers)
+        self.assertIn('"_Repo.get_something"', logs.output[0])
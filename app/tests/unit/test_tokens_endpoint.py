@@ -0,0 +1,52 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.endpoints.tokens import tokens_router
+from app.config import get_config
+from app.core import exc
+from app.core.auth_tokens import AuthTokensService
+from app.core.security import AuthenticatedUser
+from .mocks import get_mock_config
+
+
+class TestIntrospectTokens(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.auth_service = Mock()
+        self.auth_service.introspect_access_tokens = AsyncMock()
+
+        self.app = FastAPI()
+        self.app.include_router(tokens_router)
+        self.app.dependency_overrides[get_config] = lambda: get_mock_config(oauth={"introspect_max_tokens": 3})
+        self.app.dependency_overrides[AuthTokensService] = lambda: self.auth_service
+
+    async def _introspect(self, tokens: list[str]) -> httpx.Response:
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/tokens/introspect", json={"tokens": tokens})
+
+    async def test_results_in_order(self):
+        self.auth_service.introspect_access_tokens.return_value = [
+            AuthenticatedUser(name="user1", scopes=["scope1"], scopes_mask=0, user=Mock()),
+            exc.InvalidToken("access"),
+            exc.AccessDenied("disabled user")
+        ]
+
+        resp = await self._introspect(["token1", "token2", "token3"])
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), [
+            {"active": True, "name": "user1", "scopes": ["scope1"], "error": None},
+            {"active": False, "name": None, "scopes": None, "error": "Invalid access token"},
+            {"active": False, "name": None, "scopes": None, "error": "Access denied for disabled user"}
+        ])
+        self.auth_service.introspect_access_tokens.assert_awaited_once_with(["token1", "token2", "token3"])
+
+    async def test_too_many_tokens(self):
+        resp = await self._introspect(["token"] * 4)
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {"detail": "at most 3 tokens are allowed"})
+        self.auth_service.introspect_access_tokens.assert_not_called()
@@ -0,0 +1,81 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core import exc
+from app.core.repos import UnitOfWork, EmailOutboxRepo, TelegramAccountRepo
+
+
+class TestUnitOfWork(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.session = AsyncMock()
+        self.session.add = Mock()
+        self.session.info = {}
+        self.repo = EmailOutboxRepo(self.session)
+
+    async def test_writes_are_committed_once(self):
+        async with UnitOfWork(self.session):
+            await self.repo.create(Mock())
+            await self.repo.create(Mock())
+
+        self.assertEqual(self.session.flush.await_count, 2)
+        self.session.commit.assert_awaited_once()
+        self.assertEqual(self.session.info, {})
+
+    async def test_rollback_on_error(self):
+        with self.assertRaises(ValueError):
+            async with UnitOfWork(self.session):
+                await self.repo.create(Mock())
+                raise ValueError()
+
+        self.session.commit.assert_not_awaited()
+        self.session.rollback.assert_awaited_once()
+
+    async def test_integrity_error_is_rolled_back_by_unit_of_work(self):
+        self.session.flush.side_effect = [None, IntegrityError("INSERT", {}, Exception())]
+
+        with self.assertRaises(exc.AlreadyExists):
+            async with UnitOfWork(self.session):
+                await self.repo.create(Mock())
+
+                try:
+                    await self.repo.create(Mock())
+                finally:
+                    # Repo doesn't discard the write flushed before.
+                    self.session.rollback.assert_not_awaited()
+
+        self.session.commit.assert_not_awaited()
+        self.session.rollback.assert_awaited_once()
+
+    async def test_integrity_error_without_unit_of_work(self):
+        self.session.commit.side_effect = IntegrityError("INSERT", {}, Exception())
+
+        with self.assertRaises(exc.AlreadyExists):
+            await self.repo.create(Mock())
+
+        self.session.rollback.assert_awaited_once()
+
+    async def test_commit_without_unit_of_work(self):
+        await self.repo.create(Mock())
+
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_awaited()
+
+    async def test_batch_update_is_committed_once(self):
+        async with UnitOfWork(self.session):
+            await TelegramAccountRepo(self.session, self.session).update_profiles([{"id": 1, "tg_username": "a"}])
+            self.session.commit.assert_not_awaited()
+
+        self.session.commit.assert_awaited_once()
+
+    async def test_nested_joins_outer(self):
+        async with UnitOfWork(self.session):
+            async with UnitOfWork(self.session):
+                await self.repo.create(Mock())
+
+            self.session.commit.assert_not_awaited()
+            await self.repo.create(Mock())
+
+        self.session.commit.assert_awaited_once()
+        self.assertEqual(self.session.info, {})
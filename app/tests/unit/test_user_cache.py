@@ -0,0 +1,231 @@
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import patch, AsyncMock, Mock
+
+from pydantic import EmailStr
+
+from app.core.auth_strategies import EmailAuthStrategy, EmailCredentials
+from app.core.cache import TTLCache
+from app.core.models import TelegramAccount
+from app.core.models.email import EmailAccount
+from app.core.repos import (
+    UserRepo,
+    TelegramAccountRepo,
+    EmailAccountRepo,
+    LoadingProfile,
+    configure_user_cache,
+    configure_recent_changes,
+    get_user_cache_stats
+)
+from ..fake import get_faker
+
+
+class TestTTLCache(TestCase):
+    def setUp(self):
+        self.time = patch("app.core.cache.time.monotonic", return_value=0).start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_get(self):
+        cache = TTLCache(2, 10)
+        cache.set("key", "value")
+
+        self.assertEqual(cache.get("key"), "value")
+        self.assertIsNone(cache.get("another key"))
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1))
+
+    def test_expiration(self):
+        cache = TTLCache(2, 10)
+        cache.set("key", "value")
+        cache.set("short", "value", ttl=1)
+
+        self.time.return_value = 5
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("key"), "value")
+
+        self.time.return_value = 10
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats.expirations, 2)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(2, None)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_disabled(self):
+        cache = TTLCache(0, 10)
+        cache.set("key", "value")
+
+        self.assertIsNone(cache.get("key"))
+
+
+class TestUserRepoCache(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.faker = get_faker()
+        configure_user_cache(10, 10)
+        configure_recent_changes(10, 5)
+
+        self.user = self.faker.user_model()
+        self.user.id = 1
+
+        self.session = AsyncMock()
+        self.session.info = {}
+        self.repo = UserRepo(self.session)
+        self.repo.get_by_name = AsyncMock(return_value=self.user)
+
+    async def asyncTearDown(self):
+        configure_user_cache(0, 0)
+        configure_recent_changes(0, 0)
+
+    async def test_get_auth_info_is_cached(self):
+        first = await self.repo.get_auth_info_by_name(self.user.name)
+        second = await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.assertIs(first, second)
+        self.assertEqual(first.scopes, tuple(self.user.scopes))
+        self.repo.get_by_name.assert_called_once_with(self.user.name, False)
+        self.assertEqual(get_user_cache_stats().hits, 1)
+
+    async def test_update_invalidates(self):
+        await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.user.is_disabled = not self.user.is_disabled
+        await self.repo.update(self.user)
+
+        auth_info = await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.assertEqual(auth_info.is_disabled, self.user.is_disabled)
+        self.assertEqual(self.repo.get_by_name.call_count, 2)
+
+    async def test_changed_user_is_read_from_primary(self):
+        self.user.is_disabled = not self.user.is_disabled
+        await self.repo.update(self.user)
+
+        await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.repo.get_by_name.assert_called_once_with(self.user.name, True)
+
+    async def test_changed_user_is_read_from_primary_without_cache(self):
+        configure_user_cache(0, 0)
+
+        self.user.is_disabled = not self.user.is_disabled
+        await self.repo.update(self.user)
+
+        await self.repo.get_auth_info_by_name(self.user.name)
+
+        self.repo.get_by_name.assert_called_once_with(self.user.name, True)
+
+
+class TestTelegramAccountRepoReplicaLag(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.faker = get_faker()
+        # Changes are tracked with user cache disabled.
+        configure_recent_changes(10, 5)
+
+        self.user = self.faker.user_model()
+        self.account = TelegramAccount(**self.faker.tg_account_data(), user=self.user)
+
+        self.session = AsyncMock()
+        self.session.info = {}
+        self.repo = TelegramAccountRepo(self.session, AsyncMock())
+        self.repo.get_by_tg_user_id = AsyncMock(return_value=self.account)
+
+    async def asyncTearDown(self):
+        configure_user_cache(0, 0)
+        configure_recent_changes(0, 0)
+
+    async def test_read_from_replica(self):
+        account = await self.repo.get_current_by_tg_user_id("1")
+
+        self.assertIs(account, self.account)
+        self.repo.get_by_tg_user_id.assert_called_once_with("1", profile=LoadingProfile.PROFILE)
+
+    async def test_missing_in_replica_read_from_primary(self):
+        self.repo.get_by_tg_user_id.side_effect = [None, self.account]
+
+        account = await self.repo.get_current_by_tg_user_id("1")
+
+        self.assertIs(account, self.account)
+        self.repo.get_by_tg_user_id.assert_called_with("1", primary=True, profile=LoadingProfile.PROFILE)
+
+    async def test_changed_user_read_from_primary(self):
+        # Disabled by this process (or other one, via invalidation).
+        self.user.id = 1
+        self.user.is_disabled = not self.user.is_disabled
+        await UserRepo(self.session).update(self.user)
+
+        await self.repo.get_current_by_tg_user_id("1")
+
+        self.assertEqual(self.repo.get_by_tg_user_id.call_count, 2)
+        self.repo.get_by_tg_user_id.assert_called_with("1", primary=True, profile=LoadingProfile.PROFILE)
+
+    async def test_without_replicas(self):
+        repo = TelegramAccountRepo(self.session, None)
+        repo.get_by_tg_user_id = AsyncMock(return_value=None)
+
+        self.assertIsNone(await repo.get_current_by_tg_user_id("1"))
+        repo.get_by_tg_user_id.assert_called_once()
+
+
+class TestEmailLoginReplicaLag(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.faker = get_faker()
+        configure_recent_changes(10, 5)
+
+        self.user = self.faker.user_model()
+        self.user.id = 1
+        self.account = EmailAccount(email="user@example.com", is_verified=True, password_hash="", user=self.user)
+
+        self.session = AsyncMock()
+        self.session.info = {}
+        self.email_repo = EmailAccountRepo(self.session, AsyncMock())
+        self.email_repo.get_by_email = AsyncMock(return_value=self.account)
+        self.user_repo = UserRepo(self.session, AsyncMock())
+        self.user_repo.get_by_name = AsyncMock(return_value=self.user)
+
+        self.strategy = EmailAuthStrategy(self.email_repo, self.user_repo, Mock())
+        patch("app.core.auth_strategies.email.verify_password_async", AsyncMock(return_value=True)).start()
+
+    async def asyncTearDown(self):
+        patch.stopall()
+        configure_recent_changes(0, 0)
+
+    async def _disable_user(self):
+        # Disabled by this process (or other one, via invalidation).
+        self.user.is_disabled = True
+        await self.user_repo.update(self.user)
+
+    async def test_read_from_replica(self):
+        account = await self.email_repo.get_current_by_email("user@example.com")
+
+        self.assertIs(account, self.account)
+        self.email_repo.get_by_email.assert_called_once_with("user@example.com", profile=LoadingProfile.PROFILE)
+
+    async def test_changed_user_read_from_primary(self):
+        await self._disable_user()
+
+        await self.strategy.login_for_user(EmailCredentials(
+            name_or_email=EmailStr("user@example.com"),
+            password="password"
+        ))
+
+        self.email_repo.get_by_email.assert_called_with(
+            "user@example.com",
+            primary=True,
+            profile=LoadingProfile.PROFILE
+        )
+
+    async def test_changed_user_by_name_read_from_primary(self):
+        self.user.email_account = self.account
+        await self._disable_user()
+
+        await self.strategy.login_for_user(EmailCredentials(name_or_email=self.user.name, password="password"))
+
+        self.user_repo.get_by_name.assert_called_once_with(self.user.name, primary=True, profile=LoadingProfile.FULL)
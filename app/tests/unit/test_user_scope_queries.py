@@ -0,0 +1,63 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.models import User
+from app.core.repos import UserRepo
+
+
+def _compile(query):
+    return query.compile(dialect=postgresql.asyncpg.dialect())
+
+
+class TestUserRepoScopeQueries(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.session = AsyncMock()
+        self.read_session = AsyncMock()
+        self.read_session.scalars.return_value = Mock(all=Mock(return_value=[]))
+        self.read_session.execute.return_value = Mock(scalar_one=Mock(return_value=3))
+
+        self.repo = UserRepo(self.session, self.read_session)
+
+    def _find_query(self):
+        return _compile(self.read_session.scalars.call_args.args[0])
+
+    async def test_find_by_scope_matches_containment(self):
+        await self.repo.find_by_scope("admin", 10)
+
+        query = self._find_query()
+        # Array containment is served by the GIN index, the scope is one element, not a substring.
+        self.assertIn("users.scopes @> $1::TEXT[]", str(query))
+        self.assertNotIn("LIKE", str(query))
+        self.assertEqual(query.params["scopes_1"], ["admin"])
+        self.assertIn("ORDER BY users.id", str(query))
+        self.assertEqual(query.params["param_1"], 10)
+        self.session.scalars.assert_not_called()
+
+    async def test_find_by_scope_keyset(self):
+        await self.repo.find_by_scope("service:read", 10, after_id=42)
+
+        query = self._find_query()
+        self.assertIn("users.id > $2::INTEGER", str(query))
+        self.assertEqual(query.params["id_1"], 42)
+        self.assertNotIn("OFFSET", str(query))
+
+    async def test_scope_is_not_split(self):
+        await self.repo.find_by_scope("scope with spaces", 10)
+
+        self.assertEqual(self._find_query().params["scopes_1"], ["scope with spaces"])
+
+    async def test_count_by_scope(self):
+        self.assertEqual(await self.repo.count_by_scope("admin"), 3)
+
+        query = _compile(self.read_session.execute.call_args.args[0])
+        self.assertIn("count(*)", str(query))
+        self.assertIn("users.scopes @> $1::TEXT[]", str(query))
+        self.assertEqual(query.params["scopes_1"], ["admin"])
+
+    def test_gin_index(self):
+        index = next(index for index in User.__table__.indexes if index.name == "ix_users_scopes")
+
+        self.assertEqual([column.name for column in index.columns], ["scopes"])
+        self.assertEqual(index.dialect_options["postgresql"]["using"], "gin")
@@ -0,0 +1,35 @@
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.api.endpoints.users import _users_to_ndjson
+from ..fake import get_faker
+
+
+class TestUsersNdjson(IsolatedAsyncioTestCase):
+    async def test_stream(self):
+        faker = get_faker()
+        users = [faker.user_model() for _ in range(3)]
+        for i, user in enumerate(users):
+            user.id = i + 1
+
+        async def stream_many():
+            for user in users:
+                yield user
+
+        session_maker = MagicMock()
+        session = AsyncMock()
+        session_maker.return_value.__aenter__ = AsyncMock(return_value=session)
+        session_maker.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        with patch("app.api.endpoints.users.UserRepo") as repo_class:
+            repo_class.return_value.stream_many = stream_many
+            lines = [line async for line in _users_to_ndjson(session_maker)]
+
+        self.assertTrue(all(line.endswith("\n") for line in lines))
+        self.assertEqual([json.loads(line)["id"] for line in lines], [1, 2, 3])
+
+        # Session is opened by the generator and closed when the stream ends.
+        session_maker.assert_called_once()
+        session_maker.return_value.__aexit__.assert_awaited_once()
+        repo_class.assert_called_once_with(session, session)
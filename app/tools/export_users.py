@@ -0,0 +1,247 @@
+"""
+Export of users and their auth accounts for analytics. Password hashes and tokens are not exported.
+
+    python -m app.tools.export_users snapshot/ --format csv --gzip
+
+Every table is written to its own file (users, telegram_auth, email_auth). Tables are read in one read only
+REPEATABLE READ transaction, so files are consistent with each other. Rows are fetched from the server side
+cursor and written by chunks, so memory use doesn't depend on tables size. ORM models are not used.
+
+Parquet format requires pyarrow to be installed.
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Sequence, Mapping
+
+import asyncpg
+from sqlalchemy import types
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.config import load_config
+from app.core import models
+from app.db import get_asyncpg_dsn
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORTED_TABLES = (models.User.__table__, models.TelegramAccount.__table__, models.EmailAccount.__table__)
+EXCLUDED_COLUMNS = {
+    "email_auth": {"password_hash", "password_updated_with_token"}
+}
+FORMATS = ("csv", "ndjson", "parquet")
+
+
+def get_exported_columns(table) -> list[str]:
+    excluded = EXCLUDED_COLUMNS.get(table.name, set())
+    return [column.name for column in table.columns if column.name not in excluded]
+
+
+def get_parquet_type(type_: types.TypeEngine) -> "pyarrow.DataType":
+    if isinstance(type_, types.TypeDecorator):
+        type_ = type_.impl_instance
+
+    if isinstance(type_, ARRAY):
+        return pyarrow.list_(get_parquet_type(type_.item_type))
+    if isinstance(type_, types.Boolean):
+        return pyarrow.bool_()
+    if isinstance(type_, types.BigInteger):
+        return pyarrow.int64()
+    if isinstance(type_, types.Integer):
+        return pyarrow.int32()
+    if isinstance(type_, types.DateTime):
+        return pyarrow.timestamp("us", tz="UTC" if type_.timezone else None)
+    if isinstance(type_, types.String):
+        return pyarrow.string()
+
+    raise ValueError(f"Column type {type_!r} is not supported by parquet export")
+
+
+class ChunkWriter(ABC):
+    extension: str
+
+    def __init__(self, path: str, columns: list[str], compress: bool):
+        self.path = path
+        self.columns = columns
+        self.compress = compress
+
+    @classmethod
+    def for_table(cls, path: str, table, compress: bool) -> "ChunkWriter":
+        return cls(path, get_exported_columns(table), compress)
+
+    @abstractmethod
+    def write(self, rows: Sequence[Mapping]):
+        """
+        :param rows: chunk of rows with (at least) exported columns.
+        """
+
+    @abstractmethod
+    def close(self):
+        """
+        Finishes the file.
+        """
+
+
+class _TextChunkWriter(ChunkWriter):
+    def __init__(self, path: str, columns: list[str], compress: bool):
+        super().__init__(path, columns, compress)
+        if compress:
+            self._file = io.TextIOWrapper(gzip.open(path, "wb"), encoding="utf-8", newline="")
+        else:
+            self._file = open(path, "w", encoding="utf-8", newline="")
+
+    def close(self):
+        self._file.close()
+
+
+class CsvChunkWriter(_TextChunkWriter):
+    """
+    Arrays (scopes) are written space separated.
+    """
+
+    extension = "csv"
+
+    def __init__(self, path: str, columns: list[str], compress: bool):
+        super().__init__(path, columns, compress)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    @staticmethod
+    def _to_csv_value(value):
+        return " ".join(value) if isinstance(value, list) else value
+
+    def write(self, rows: Sequence[Mapping]):
+        self._writer.writerows([self._to_csv_value(row[column]) for column in self.columns] for row in rows)
+
+
+class NdjsonChunkWriter(_TextChunkWriter):
+    extension = "ndjson"
+
+    def write(self, rows: Sequence[Mapping]):
+        self._file.write("".join(
+            json.dumps({column: row[column] for column in self.columns}, default=str) + "\n" for row in rows
+        ))
+
+
+class ParquetChunkWriter(ChunkWriter):
+    """
+    Every chunk is written as a row group. Schema is built from column types of the table,
+    not inferred from values (column may be NULL in the whole first chunk). File is not created for empty table.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, path: str, columns: list[str], compress: bool, schema: "pyarrow.Schema"):
+        super().__init__(path, columns, compress)
+        self.schema = schema
+        self._writer = None
+
+    @classmethod
+    def for_table(cls, path: str, table, compress: bool) -> "ParquetChunkWriter":
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is required for parquet export")
+
+        columns = get_exported_columns(table)
+        schema = pyarrow.schema([(column, get_parquet_type(table.columns[column].type)) for column in columns])
+        return cls(path, columns, compress, schema)
+
+    def write(self, rows: Sequence[Mapping]):
+        table = pyarrow.Table.from_pylist(
+            [{column: row[column] for column in self.columns} for row in rows],
+            schema=self.schema
+        )
+
+        if self._writer is None:
+            self._writer = pyarrow.parquet.ParquetWriter(
+                self.path, self.schema, compression="gzip" if self.compress else "snappy"
+            )
+
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+_WRITERS: dict[str, type[ChunkWriter]] = {
+    "csv": CsvChunkWriter,
+    "ndjson": NdjsonChunkWriter,
+    "parquet": ParquetChunkWriter
+}
+
+
+def get_export_path(directory: str, table_name: str, format_: str, compress: bool) -> str:
+    path = os.path.join(directory, f"{table_name}.{_WRITERS[format_].extension}")
+    # Parquet is compressed internally.
+    if compress and format_ != "parquet":
+        path += ".gz"
+    return path
+
+
+async def export_table(connection: asyncpg.Connection,
+                       table,
+                       writer: ChunkWriter,
+                       chunk_size: int
+                       ) -> int:
+    """
+    Must be called in transaction.
+
+    :return: number of exported rows.
+    """
+
+    query = f"SELECT {', '.join(writer.columns)} FROM {table.name} ORDER BY id"
+    cursor = await connection.cursor(query)
+
+    exported = 0
+    while rows := await cursor.fetch(chunk_size):
+        writer.write(rows)
+        exported += len(rows)
+
+    return exported
+
+
+async def export_users(directory: str, format_: str, compress: bool, chunk_size: int):
+    os.makedirs(directory, exist_ok=True)
+
+    connection = await asyncpg.connect(get_asyncpg_dsn())
+    try:
+        async with connection.transaction(isolation="repeatable_read", readonly=True):
+            for table in EXPORTED_TABLES:
+                start = time.perf_counter()
+                path = get_export_path(directory, table.name, format_, compress)
+
+                writer = _WRITERS[format_].for_table(path, table, compress)
+                try:
+                    exported = await export_table(connection, table, writer, chunk_size)
+                finally:
+                    writer.close()
+
+                print(f"{table.name}: {exported} rows to {path}, {time.perf_counter() - start:.3f}s")
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export users and auth accounts.")
+    parser.add_argument("directory")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--gzip", action="store_true", help="compress files")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    load_config()
+    asyncio.run(export_users(args.directory, args.format, args.gzip, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Generation of private key for access tokens signing (see oauth.access_token_algorithm).
+
+    python -m app.tools.generate_signing_key keys/access-2023-05.pem --algorithm EdDSA
+
+Prints "kid" of the key, it is the same in tokens headers and JWKS.
+"""
+
+import argparse
+import os
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from app.core.crypto import SigningKey
+from app.core.crypto.keys import ASYMMETRIC_ALGORITHMS
+
+
+def generate_private_key(algorithm: str) -> ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey:
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate access tokens signing key.")
+    parser.add_argument("path", help="PEM file to write, must not exist")
+    parser.add_argument("--algorithm", choices=ASYMMETRIC_ALGORITHMS, default="EdDSA")
+    args = parser.parse_args()
+
+    private_key = generate_private_key(args.algorithm)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+    # Readable by owner only.
+    fd = os.open(args.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+
+    print(f"kid: {SigningKey.from_private_key(args.algorithm, private_key).kid}")
+
+
+if __name__ == "__main__":
+    main()
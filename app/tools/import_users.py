@@ -0,0 +1,203 @@
+"""
+Bulk import of users with Telegram accounts from CSV (with header) or NDJSON.
+
+    python -m app.tools.import_users users.csv --batch-size 5000
+
+Fields: name, tg_user_id, tg_username, tg_first_name, tg_last_name (optional), tg_photo_url (optional)
+and scopes (optional, space separated, default scopes of new users if empty).
+
+Every batch is copied into a temporary staging table with COPY and inserted with a few set based statements
+in one transaction. Rows conflicting with existing users (by name or Telegram user id) or with previous rows
+are skipped, so import can be safely restarted.
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import time
+from dataclasses import dataclass
+from typing import Iterator, Iterable, TextIO
+
+import asyncpg
+from pydantic import ValidationError, parse_obj_as
+
+from app.api.schemas import username_constr
+from app.config import load_config, get_config
+from app.db import get_asyncpg_dsn
+
+STAGING_TABLE = "import_users_staging"
+COLUMNS = ("name", "tg_user_id", "tg_username", "tg_first_name", "tg_last_name", "tg_photo_url", "scopes")
+REQUIRED_COLUMNS = ("name", "tg_user_id", "tg_username", "tg_first_name")
+
+_CREATE_STAGING = f"""
+CREATE TEMPORARY TABLE {STAGING_TABLE} (
+    name text,
+    tg_user_id text,
+    tg_username text,
+    tg_first_name text,
+    tg_last_name text,
+    tg_photo_url text,
+    scopes text[]
+) ON COMMIT DELETE ROWS
+"""
+
+# Rows conflicting with existing data or with previous rows of the batch.
+_DELETE_CONFLICTS = f"""
+DELETE FROM {STAGING_TABLE} s
+WHERE EXISTS (SELECT 1 FROM users u WHERE u.name = s.name)
+   OR EXISTS (SELECT 1 FROM telegram_auth t WHERE t.tg_user_id = s.tg_user_id)
+   OR s.ctid IN (
+       SELECT ctid FROM (
+           SELECT ctid,
+                  row_number() OVER (PARTITION BY name ORDER BY ctid) AS name_n,
+                  row_number() OVER (PARTITION BY tg_user_id ORDER BY ctid) AS tg_user_id_n
+           FROM {STAGING_TABLE}
+       ) numbered
+       WHERE name_n > 1 OR tg_user_id_n > 1
+   )
+"""
+
+# Conflicts with rows inserted concurrently after the cleanup fail the batch, so no user is left without account.
+_INSERT = f"""
+WITH new_users AS (
+    INSERT INTO users (name, is_disabled, scopes, registered_at, token_version)
+    SELECT name, false, scopes, now() AT TIME ZONE 'utc', 0 FROM {STAGING_TABLE}
+    RETURNING id, name
+)
+INSERT INTO telegram_auth (tg_user_id, tg_username, tg_first_name, tg_last_name, tg_photo_url, user_id)
+SELECT s.tg_user_id, s.tg_username, s.tg_first_name, s.tg_last_name, s.tg_photo_url, u.id
+FROM new_users u JOIN {STAGING_TABLE} s ON s.name = u.name
+"""
+
+
+@dataclass(kw_only=True)
+class BatchResult:
+    read: int = 0
+    invalid: int = 0
+    imported: int = 0
+    skipped: int = 0
+    """ Conflicting rows. """
+    seconds: float = 0
+
+
+def read_rows(file: TextIO, format_: str) -> Iterator[dict]:
+    if format_ == "csv":
+        yield from csv.DictReader(file)
+    elif format_ == "ndjson":
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"unknown format '{format_}'")
+
+
+def to_record(row: dict, default_scopes: list[str]) -> tuple | None:
+    """
+    :return: record of the staging table or None if row is invalid.
+    """
+
+    values = {}
+    for column in COLUMNS:
+        value = row.get(column)
+        if isinstance(value, list):
+            value = " ".join(value)
+        values[column] = str(value) if value not in (None, "") else None
+
+    if any(values[column] is None for column in REQUIRED_COLUMNS):
+        return None
+
+    try:
+        parse_obj_as(username_constr, values["name"])
+    except ValidationError:
+        return None
+
+    values["scopes"] = values["scopes"].split() if values["scopes"] is not None else default_scopes
+
+    return tuple(values[column] for column in COLUMNS)
+
+
+def _get_default_scopes() -> list[str]:
+    return [scope for scope in get_config().user_default.scopes if scope.strip()]
+
+
+async def import_batch(connection: asyncpg.Connection, rows: list[dict], default_scopes: list[str]) -> BatchResult:
+    start = time.perf_counter()
+
+    records = [record for row in rows if (record := to_record(row, default_scopes)) is not None]
+    result = BatchResult(read=len(rows), invalid=len(rows) - len(records))
+
+    async with connection.transaction():
+        await connection.copy_records_to_table(STAGING_TABLE, records=records, columns=COLUMNS)
+        await connection.execute(_DELETE_CONFLICTS)
+        status = await connection.execute(_INSERT)
+
+    # Status is "INSERT 0 <rows>".
+    result.imported = int(status.split()[-1])
+    result.skipped = len(records) - result.imported
+    result.seconds = time.perf_counter() - start
+
+    return result
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _report(title: str, result: BatchResult):
+    rate = result.read / result.seconds if result.seconds else 0
+    print(
+        f"{title}: read {result.read}, imported {result.imported}, skipped {result.skipped}, "
+        f"invalid {result.invalid}, {result.seconds:.3f}s, {rate:.0f} rows/s"
+    )
+
+
+async def import_users(file: TextIO, format_: str, batch_size: int) -> BatchResult:
+    default_scopes = _get_default_scopes()
+    total = BatchResult()
+
+    connection = await asyncpg.connect(get_asyncpg_dsn())
+    try:
+        await connection.execute(_CREATE_STAGING)
+
+        for i, batch in enumerate(_batches(read_rows(file, format_), batch_size), start=1):
+            try:
+                result = await import_batch(connection, batch, default_scopes)
+            except asyncpg.UniqueViolationError as e:
+                # Rows were inserted concurrently, they are skipped on restart.
+                print(f"batch {i}: failed, {len(batch)} rows are not imported: {e}")
+                continue
+
+            _report(f"batch {i}", result)
+
+            total.read += result.read
+            total.invalid += result.invalid
+            total.imported += result.imported
+            total.skipped += result.skipped
+            total.seconds += result.seconds
+    finally:
+        await connection.close()
+
+    _report("total", total)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import users with Telegram accounts.")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="by default detected by file extension")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    format_ = args.format or ("csv" if args.file.endswith(".csv") else "ndjson")
+
+    load_config()
+    with open(args.file, newline="") as file:
+        asyncio.run(import_users(file, format_, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Standalone email outbox worker, for use instead of (or with) workers running in app processes.
+
+    python -m app.tools.outbox_worker
+"""
+
+import asyncio
+import logging
+
+from app import db
+from app.config import load_config, get_config
+from app.mail_outbox import EmailOutboxWorker
+from app.mail_sender import start_mail_transport, stop_mail_transport, get_mail_transport
+
+
+async def main():
+    load_config()
+    db.connect_to_db()
+
+    config = get_config()
+    start_mail_transport(config)
+
+    worker = EmailOutboxWorker(db.AsyncSessionLocal, get_mail_transport(), config)
+    try:
+        await worker.run()
+    finally:
+        await stop_mail_transport()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass